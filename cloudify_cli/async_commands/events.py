@@ -0,0 +1,201 @@
+import asyncio
+import json
+
+import aiohttp.client_exceptions
+
+from cloudify_async_client import CloudifyAsyncClient
+from cloudify_rest_client.executions import Execution
+
+from cloudify_cli.exceptions import CloudifyCliError
+from cloudify_cli.execution_events_fetcher import (
+    EventsCursor,
+    ExecutionEventsFetcher,
+    MAX_POLL_INTERVAL,
+    WORKFLOW_END_TYPES,
+)
+
+STREAM_URL = 'events/stream'
+# the manager responds with these if it can't stream events
+UNSUPPORTED_STATUS_CODES = (404, 405, 501)
+MAX_RECONNECT_ATTEMPTS = 10
+RECONNECT_DELAY = 0.5
+# after a workflow-end event, the execution status is updated shortly
+END_STATUS_CHECK_INTERVAL = 1
+
+
+def tail_events(client,
+                record,
+                events_handler,
+                include_logs=False,
+                from_datetime=None,
+                execution_id=None,
+                execution_group_id=None):
+    """Stream the events of an execution or a group, until it ends.
+
+    If the connection is lost, it's restored, and the events are resumed
+    after the last event received. If the manager doesn't have the events
+    stream endpoint, or can't be reached, this returns None right away.
+
+    :param record: the execution, or execution group
+    :return: the ended execution or execution group, or None if the
+        manager can't stream events, and they need to be polled instead
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(_tail_events(
+            client, record, events_handler, include_logs, from_datetime,
+            execution_id, execution_group_id))
+    finally:
+        loop.close()
+
+
+async def _tail_events(client,
+                       record,
+                       events_handler,
+                       include_logs,
+                       from_datetime,
+                       execution_id,
+                       execution_group_id):
+    if execution_id is not None:
+        selection = {'execution_id': execution_id}
+        get_record = client.executions.get
+        watch_end_events = True
+    else:
+        selection = {'execution_group_id': execution_group_id}
+        get_record = client.execution_groups.get
+        # in a group, a single execution ending doesn't mean much
+        watch_end_events = False
+    if record.status in Execution.END_STATES:
+        return record
+
+    # only used to map the events, like when they're polled
+    events_fetcher = ExecutionEventsFetcher(
+        client, execution=record, **selection)
+    cursor = EventsCursor()
+    async_client = _async_client(client)
+    failed_attempts = 0
+    connected = False
+    try:
+        while True:
+            cursor.resume()
+            params = dict(selection,
+                          include_logs=include_logs,
+                          since=cursor.timestamp or from_datetime)
+            try:
+                response = await async_client.get(
+                    STREAM_URL, params=params,
+                    timeout=aiohttp.ClientTimeout(
+                        total=None, sock_connect=MAX_POLL_INTERVAL))
+            except (aiohttp.client_exceptions.ClientError,
+                    asyncio.TimeoutError):
+                response = None
+            if not connected and (
+                    response is None or
+                    response.status in UNSUPPORTED_STATUS_CODES):
+                # the stream is not available, as opposed to lost
+                if response is not None:
+                    response.release()
+                return None
+            if response is not None and response.status in (401, 403):
+                response.release()
+                raise CloudifyCliError(
+                    'Error streaming events: {0}'.format(response.reason))
+
+            received = 0
+            if response is not None and response.status == 200:
+                connected = True
+                try:
+                    ended, received = await _read_events(
+                        response, cursor, events_fetcher, events_handler,
+                        lambda: get_record(record.id), watch_end_events)
+                finally:
+                    response.release()
+                if ended is not None:
+                    return ended
+            elif response is not None:
+                response.release()
+
+            # the stream ended before the execution did
+            record = get_record(record.id)
+            if record.status in Execution.END_STATES:
+                return record
+            if received:
+                # reconnect right away
+                failed_attempts = 0
+                continue
+            failed_attempts += 1
+            if failed_attempts > MAX_RECONNECT_ATTEMPTS:
+                raise CloudifyCliError(
+                    'Lost the events stream of {0}, and could not '
+                    'reconnect'.format(record.id))
+            await asyncio.sleep(min(RECONNECT_DELAY * 2 ** failed_attempts,
+                                    MAX_POLL_INTERVAL))
+    finally:
+        await async_client.close_session()
+
+
+async def _read_events(response,
+                       cursor,
+                       events_fetcher,
+                       events_handler,
+                       get_record,
+                       watch_end_events):
+    """Pass on the streamed events, until the stream or the execution ends.
+
+    While no events arrive, the execution's status is checked every now
+    and then, because not every ending emits an event.
+
+    :return: the ended execution or group (or None if the stream ended
+        first), and the number of events received
+    """
+    received = 0
+    end_event_seen = False
+    while True:
+        try:
+            line = await asyncio.wait_for(
+                response.content.readline(),
+                END_STATUS_CHECK_INTERVAL if end_event_seen
+                else MAX_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            record = get_record()
+            if record.status in Execution.END_STATES:
+                return record, received
+            continue
+        except aiohttp.client_exceptions.ClientError:
+            return None, received
+        if not line:
+            return None, received
+        line = line.strip().decode(errors='ignore')
+        if not line:
+            # a keep-alive
+            continue
+        events = cursor.new_events([json.loads(line)])
+        cursor.advance(events)
+        received += len(events)
+        if watch_end_events and any(
+                event.get('event_type') in WORKFLOW_END_TYPES
+                for event in events):
+            end_event_seen = True
+        if events and events_handler:
+            # each line is a single event, which is passed on as received
+            events_handler([
+                events_fetcher._map_api_event_to_internal_event(event, line)
+                for event in events
+            ])
+
+
+def _async_client(client):
+    api = client._client
+    headers = api.headers.copy()
+    headers.update({'Content-type': 'text/event-stream'})
+    async_client = CloudifyAsyncClient(
+        host=api.host,
+        port=api.port,
+        protocol=api.protocol,
+        cert=api.cert,
+        headers=headers,
+    )
+    if api.trust_all:
+        # like the sync client with trust_all: don't verify the certificate
+        async_client.ssl = False
+    return async_client
@@ -3,7 +3,6 @@ import os
 import difflib
 import warnings
 import traceback
-import pkg_resources
 import datetime
 import re
 import subprocess
@@ -23,7 +22,7 @@ from cloudify_rest_client.exceptions import CloudifyClientError
 from cloudify_rest_client.exceptions import MaintenanceModeActiveError
 from cloudify_rest_client.exceptions import MaintenanceModeActivatingError
 
-from cloudify_cli import env, logger
+from cloudify_cli import env, logger, timings
 from cloudify_cli.cli import helptexts
 from cloudify_cli.constants import DEFAULT_BLUEPRINT_PATH
 from cloudify_cli.exceptions import (
@@ -65,8 +64,9 @@ class MutuallyExclusiveOption(click.Option):
     """
 
     def __init__(self, *args, **kwargs):
-        self.mutually_exclusive = set(kwargs.pop('mutually_exclusive', []))
-        self.mutuality_string = ', '.join(self.mutually_exclusive)
+        mutually_exclusive = kwargs.pop('mutually_exclusive', [])
+        self.mutually_exclusive = set(mutually_exclusive)
+        self.mutuality_string = ', '.join(mutually_exclusive)
         if self.mutually_exclusive:
             help = kwargs.get('help', '')
             kwargs['help'] = (
@@ -168,6 +168,8 @@ def show_version(ctx, param, value):
     if not value or ctx.resilient_parsing:
         return
 
+    # pkg_resources is slow to import, and only needed here
+    import pkg_resources
     cli_version_output = _format_version_data(
         {'version': pkg_resources.require('cloudify')[0].version},
         prefix='Cloudify CLI ',
@@ -394,13 +396,23 @@ def set_json(ctx, param, value):
 
 
 def set_format(ctx, param, value):
-    if value == 'json':
-        set_global_json_output(True)
+    if value in ('json', 'ndjson', 'csv'):
+        set_global_json_output(True, value)
     elif value == 'extended':
         set_global_extended_view(True)
     return value
 
 
+def set_timings(ctx, param, value):
+    if not value or ctx.resilient_parsing:
+        return
+    if param.name == 'timings':
+        timings.start(print_report=True)
+    else:
+        timings.start(trace_path=value)
+    ctx.call_on_close(timings.stop)
+
+
 def set_extended_view(ctx, param, value):
     if value is not None:
         set_global_extended_view(value)
@@ -594,7 +606,7 @@ class CommandMixin(object):
         # click command/group that validate if the environment is
         # good for unicode on Python 3 or not.
         self.set_locale_env()
-        super(CommandMixin, self).main(
+        return super(CommandMixin, self).main(
             args=args,
             prog_name=prog_name,
             complete_var=complete_var,
@@ -751,9 +763,10 @@ class Options(object):
 
         self.format = click.option(
             '--format',
-            type=click.Choice(['plain', 'json']),
+            type=click.Choice(['plain', 'json', 'ndjson', 'csv']),
             expose_value=False,
-            callback=set_format
+            callback=set_format,
+            help=helptexts.FORMAT
         )
 
         self.json = click.option(
@@ -763,6 +776,20 @@ class Options(object):
             default=None,
             callback=set_json)
 
+        self.timings = click.option(
+            '--timings',
+            is_flag=True,
+            expose_value=False,
+            callback=set_timings,
+            help=helptexts.TIMINGS)
+
+        self.timings_file = click.option(
+            '--timings-file',
+            type=click.Path(dir_okay=False, writable=True),
+            expose_value=False,
+            callback=set_timings,
+            help=helptexts.TIMINGS_FILE)
+
         self.inputs = click.option(
             '-i',
             '--inputs',
@@ -1056,6 +1083,11 @@ class Options(object):
             help=helptexts.KERBEROS_ENV
         )
 
+        self.session_tokens = click.option(
+            '--session-tokens/--no-session-tokens',
+            default=None,
+            help=helptexts.SESSION_TOKENS)
+
         self.kerberos_env_flag = click.option(
             '--kerberos-env',
             required=False,
@@ -1369,6 +1401,32 @@ class Options(object):
             callback=validate_nonnegative_integer,
             help=helptexts.PAGINATION_SIZE)
 
+        self.all_pages = click.option(
+            '--all',
+            'all_pages',
+            is_flag=True,
+            default=False,
+            help=helptexts.ALL_PAGES)
+
+        self.per_tenant = click.option(
+            '--per-tenant',
+            is_flag=True,
+            default=False,
+            help=helptexts.SUMMARY_PER_TENANT)
+
+        self.percentages = click.option(
+            '--percentages',
+            is_flag=True,
+            default=False,
+            help=helptexts.SUMMARY_PERCENTAGES)
+
+        self.columns = click.option(
+            '--columns',
+            multiple=True,
+            required=False,
+            callback=self.parse_comma_separated,
+            help=helptexts.COLUMNS)
+
         self.manager_ip = click.option(
             '--manager-ip',
             required=False,
@@ -1935,6 +1993,13 @@ class Options(object):
             help=helptexts.RECURSIVE_DELETE,
         )
 
+        self.idle_timeout = click.option(
+            '--idle-timeout',
+            type=click.IntRange(min=1),
+            default=None,
+            help=helptexts.DAEMON_IDLE_TIMEOUT,
+        )
+
     def common_options(self, f):
         """A shorthand for applying commonly used arguments.
 
@@ -1,11 +1,24 @@
 VERBOSE = \
     "Show verbose output. You can supply this up to three times (i.e. -vvv)"
 QUIET = "Show only critical logs"
+TIMINGS = (
+    "Show the REST requests the command made when it ends: their status, "
+    "size, latency and the manager that answered them, and a summary of "
+    "the requests to each endpoint"
+)
+TIMINGS_FILE = (
+    "Write the REST requests the command made to this file, as a Chrome "
+    "trace (see chrome://tracing)"
+)
 VERSION = (
     "Display the version and exit (if a manager is used, its version will "
     "also show)"
 )
 EXTENDED_VIEW = "Display results in a vertical table format"
+FORMAT = (
+    "Output format: a table (plain), a JSON array (json, like --json), "
+    "a JSON object per line (ndjson), or CSV (csv)"
+)
 
 INPUTS_PARAMS_USAGE = (
     '(Can be provided as wildcard based paths '
@@ -212,6 +225,11 @@ SSL_REST = "Connect to REST server using SSL"
 REST_CERT = "The REST server's external certificate file location (implies " \
     "--ssl)"
 KERBEROS_ENV = "Whether or not to use kerberos while connecting to the manager"
+SESSION_TOKENS = (
+    "Whether or not to exchange the manager username and password for "
+    "short-lived session tokens, instead of sending the password with "
+    "every request"
+)
 
 EXPORT_SSH_KEYS = 'Include ssh key files in archive'
 IMPORT_SSH_KEYS = 'WARNING: Import exported keys to their original locations'
@@ -367,6 +385,11 @@ PAGINATION_SIZE = 'The max number of results to retrieve per page ' \
                   '[default: 1000]'
 PAGINATION_OFFSET = 'The number of resources to skip; --pagination-offset=1 ' \
                     'skips the first resource [default: 0]'
+ALL_PAGES = 'List all the resources, instead of a single page. The ' \
+            'pages of --pagination-size resources are fetched concurrently'
+COLUMNS = 'The columns to show, comma-separated (e.g. id,created_at). ' \
+          'Only these fields are fetched from the manager ' \
+          '[default: the columns of the table]'
 DRY_RUN = 'If set, no actual operations will be performed. This ' \
           'only prints the executed tasks, without side effects'
 
@@ -612,13 +635,22 @@ WAIT_FOR_STATUS = "Whether to wait for snapshot status [default: False]."
 SUMMARY_HELP = """
     Retrieve summary of {type}, e.g. a count of each {example}.
 
-    `TARGET_FIELD` is the field to summarize {type} on. `SUB_FIELD` is an
-    optional second field to summarize {type} on. Both can be chosen from
+    `TARGET_FIELD` is the field to summarize {type} on. `SUB_FIELDS` are
+    optional further fields to summarize {type} on. All can be chosen from
     [{fields}].
 
     E.g. `cfy {type} summary tenant_name visibility` will summarize
     {type} by tenant_name with a secondary grouping by visibility.
+
+    With more than two fields, {type} are counted for each combination of
+    the values of all the fields. The manager is asked for a summary for
+    each combination of the values of all but the last two fields, so list
+    the fields with the fewest values first.
     """
+SUMMARY_PER_TENANT = 'Summarize each tenant separately, concurrently, and ' \
+                     'merge the results, with the tenant as the first column'
+SUMMARY_PERCENTAGES = 'Also show the percentage of all the counted ' \
+                      'resources in each row'
 SECRETS_PROVIDER_NAME = "Secrets Provider's name"
 SECRETS_PROVIDER_NAME_MULTIPLE = "Secrets Provider's name list"
 SECRETS_PROVIDER_SKIP_CHECK = "Do not check connectivity to secrets provider."
@@ -632,3 +664,22 @@ SECRETS_PROVIDER_OPTIONS = """
 EVALUATE_FUNCTIONS = "Evaluate functions in returned nodes and node instances"
 RECURSIVE_DELETE = 'Recursively delete all service deployments contained in ' \
                    'this deployment'
+DAEMON_IDLE_TIMEOUT = 'Stop the daemon after it has been idle for this ' \
+                      'many seconds'
+BATCH_CONTINUE_ON_ERROR = 'Keep running the rest of the commands after a ' \
+                          'command fails'
+BATCH_PARALLEL = 'Run up to this many commands at the same time. Use this ' \
+                 'only if the commands are independent of each other'
+EVENTS_EXPORT_EXECUTION_ID = 'Export the events of this execution. Can be ' \
+                             'passed multiple times'
+EVENTS_EXPORT_WORKFLOW_ID = 'Only export the events of executions of this ' \
+                            'workflow'
+EVENTS_EXPORT_COMPRESSION = 'Compress the exported events'
+EVENTS_EXPORT_PARALLEL = 'Fetch the events of up to this many executions ' \
+                         'at the same time'
+EVENTS_EXPORT_CHECKPOINT = 'Keep track of the export progress in this ' \
+                           'file, to resume it if it\'s interrupted ' \
+                           '[default: OUTPUT_PATH.checkpoint]'
+EVENTS_CACHE_MAX_SIZE = 'Evict events until the cache is no larger than ' \
+                        'this many MB [default: the cache\'s size limit]'
+EVENTS_CACHE_PRUNE_ALL = 'Remove all the cached events'
@@ -0,0 +1,457 @@
+"""Precompiled description of the cfy command tree.
+
+`cfy --help`, usage errors and shell completion only need the names, help
+texts and parameters of the commands, but building the real command objects
+means importing every `cloudify_cli.commands` module and the whole option
+machinery in `cloudify_cli.cli.cfy`. Instead, this module serves those
+from a JSON manifest generated from the real commands, so the command modules
+are only imported when a command actually runs.
+
+The manifest is regenerated by running:
+
+    python -m cloudify_cli.cli.manifest
+
+and checked, without writing it, with `--check`.
+
+Only `click` and the stdlib may be imported here.
+"""
+
+import os
+import sys
+import json
+import difflib
+import hashlib
+
+import click
+
+
+MANIFEST_FORMAT = 1
+MANIFEST_PATH = os.path.join(os.path.dirname(__file__),
+                             'commands_manifest.json')
+ROOT_SPEC = ('cloudify_cli.main', '_cfy')
+
+# stored in ctx.meta: whether this invocation is served from the manifest
+SERVED_FROM_MANIFEST = 'cloudify_cli.manifest.served'
+
+# modules, besides the ones commands are imported from, that define how the
+# commands look
+_EXTRA_MODULES = ['cloudify_cli.main',
+                  'cloudify_cli.cli.cfy',
+                  'cloudify_cli.cli.helptexts']
+_PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_manifest = None
+
+
+def spec_key(import_spec):
+    return '{0}:{1}'.format(*import_spec)
+
+
+def fingerprint(modules):
+    """A fingerprint of the sources the manifest was generated from.
+
+    This is the SHA-1 of the contents of the module files: if the sources
+    changed since the manifest was generated, the manifest is considered
+    stale and the real commands are used instead. The mtimes can't be
+    used, because installing the package changes them. Hashing all the
+    command modules takes about a millisecond.
+    """
+    digest = hashlib.sha1()
+    for module_name in modules:
+        path = os.path.join(_PACKAGE_DIR, *module_name.split('.')[1:])
+        with open(path + '.py', 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def load():
+    """Load the manifest, or return None if it's missing or stale"""
+    global _manifest
+    if _manifest is None:
+        _manifest = _read_manifest(MANIFEST_PATH) or {}
+    return _manifest or None
+
+
+def _read_manifest(path):
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest.get('format') != MANIFEST_FORMAT:
+            return None
+        if manifest['fingerprint'] != fingerprint(manifest['modules']):
+            return None
+    except (IOError, OSError, ValueError, KeyError):
+        return None
+    return manifest
+
+
+def get_command(import_spec, name, commands=None):
+    """Build a manifest-backed command for the command at import_spec.
+
+    :param commands: for the root group only - the mapping of subcommands,
+        which are not part of the manifest entry
+    :return: a ManifestCommand or a ManifestGroup, or None if the command
+        is not in the manifest
+    """
+    manifest = load()
+    if not manifest:
+        return None
+    data = manifest['commands'].get(spec_key(import_spec))
+    if data is None:
+        return None
+    return _make_command(name, data, commands)
+
+
+def _make_command(name, data, commands=None):
+    data = dict(_COMMAND_DEFAULTS, **data)
+    data['params'] = [dict(_PARAM_DEFAULTS, **_manifest['params'][index])
+                      for index in data['params']]
+    if 'commands' in data or commands is not None:
+        return ManifestGroup(name, data, commands)
+    return ManifestCommand(name, data)
+
+
+def serves(command, args, info_name=None, parent=None):
+    """Check if the invocation can be answered from the manifest alone.
+
+    This is the case when the arguments end up requesting a help page, or
+    when they are going to fail with a usage error: a missing subcommand or
+    argument, or an unknown subcommand. The arguments are parsed without
+    running any callbacks.
+
+    :param command: the manifest command for the current level
+    :param args: the arguments for this level
+    """
+    if command is None:
+        return False
+    ctx = click.Context(command, info_name=info_name, parent=parent,
+                        resilient_parsing=True, **command.context_settings)
+    values, rest, _ = command.make_parser(ctx).parse_args(list(args))
+    if values.get('help'):
+        return True
+    if any(param.required and values.get(param.name) in (None, ())
+           for param in command.params):
+        return True
+    if not isinstance(command, click.MultiCommand):
+        return False
+    if not rest:
+        return command.no_args_is_help
+    try:
+        subcommand = command.get_command(ctx, rest[0])
+    except click.UsageError:
+        return True
+    if subcommand is None:
+        return True
+    return serves(_manifest_view(subcommand), rest[1:], rest[0], ctx)
+
+
+def _manifest_view(command):
+    if isinstance(command, (ManifestCommand, ManifestGroup)):
+        return command
+    get_manifest_command = getattr(command, 'get_manifest_command', None)
+    if get_manifest_command is None:
+        return None
+    return get_manifest_command()
+
+
+class _ManifestOption(click.Option):
+    def __init__(self, data):
+        opts, secondary_opts = data['opts'], data['secondary_opts']
+        decls = [data['name']] + opts[len(secondary_opts):] + [
+            '{0}/{1}'.format(opt, secondary_opt)
+            for opt, secondary_opt in zip(opts, secondary_opts)]
+        super(_ManifestOption, self).__init__(
+            decls,
+            is_flag=data['is_flag'] or None,
+            count=data['count'],
+            multiple=data['multiple'],
+            nargs=data['nargs'],
+            hidden=data['hidden'],
+            required=data['required'],
+            type=_param_type(data),
+        )
+        self._help_record = data['help_record']
+
+    def get_help_record(self, ctx):
+        if self._help_record:
+            return tuple(self._help_record)
+
+
+class _ManifestArgument(click.Argument):
+    def __init__(self, data):
+        super(_ManifestArgument, self).__init__(
+            [data['name']],
+            nargs=data['nargs'],
+            required=data['required'],
+            type=_param_type(data),
+        )
+        self._metavar = data['metavar']
+
+    def make_metavar(self, *args, **kwargs):
+        return self._metavar
+
+
+def _param_type(data):
+    if data.get('choices'):
+        return click.Choice(data['choices'],
+                            case_sensitive=data['case_sensitive'])
+    return None
+
+
+def _make_params(data):
+    return [
+        _ManifestOption(param) if param['kind'] == 'option'
+        else _ManifestArgument(param)
+        for param in data['params']
+    ]
+
+
+def _command_kwargs(data):
+    return {
+        'help': data['help'],
+        'short_help': data['short_help'],
+        'epilog': data['epilog'],
+        'hidden': data['hidden'],
+        'deprecated': data['deprecated'],
+        'options_metavar': data['options_metavar'],
+        'add_help_option': data['add_help_option'],
+        'no_args_is_help': data['no_args_is_help'],
+        'context_settings': data.get('context_settings'),
+        'params': _make_params(data),
+    }
+
+
+class ManifestCommand(click.Command):
+    """A command built from the manifest.
+
+    It can render help and usage, and parse arguments for shell completion,
+    but it can't run: the invocation is only served from the manifest when
+    it's known to end in a help page or a usage error.
+    """
+    def __init__(self, name, data):
+        super(ManifestCommand, self).__init__(name, **_command_kwargs(data))
+
+    def invoke(self, ctx):
+        raise click.UsageError(
+            'The command description is out of date, please run the '
+            'command again without --help', ctx)
+
+
+class ManifestGroup(click.Group):
+    """A group built from the manifest, see ManifestCommand.
+
+    Like the `AliasedGroup` used for the real groups, subcommands can be
+    abbreviated to any unique prefix.
+    """
+    def __init__(self, name, data, commands=None):
+        kwargs = _command_kwargs(data)
+        kwargs['subcommand_metavar'] = data.get('subcommand_metavar')
+        super(ManifestGroup, self).__init__(name, **kwargs)
+        self._commands_data = data.get('commands', {})
+        self._subcommands = commands
+
+    def list_commands(self, ctx):
+        if self._subcommands is not None:
+            return sorted(self._subcommands)
+        return sorted(self._commands_data)
+
+    def get_command(self, ctx, cmd_name):
+        matches = [cmd_name] if self._has_command(cmd_name) else \
+            [name for name in self.list_commands(ctx)
+             if name.startswith(cmd_name)]
+        if not matches:
+            return None
+        elif len(matches) > 1:
+            ctx.fail('Too many matches: {0}'.format(', '.join(matches)))
+        if self._subcommands is not None:
+            return self._subcommands[matches[0]]
+        return _make_command(matches[0], self._commands_data[matches[0]])
+
+    def _has_command(self, cmd_name):
+        if self._subcommands is not None:
+            return cmd_name in self._subcommands
+        return cmd_name in self._commands_data
+
+    def resolve_command(self, ctx, args):
+        try:
+            return super(ManifestGroup, self).resolve_command(ctx, args)
+        except click.exceptions.UsageError as error:
+            error_msg = str(error)
+            matches = difflib.get_close_matches(
+                click.utils.make_str(args[0]), self.list_commands(ctx), 3, 0.5)
+            if matches:
+                error_msg += '\n\nDid you mean one of these?\n    {0}'.format(
+                    '\n    '.join(matches))
+            raise click.exceptions.UsageError(error_msg, error.ctx)
+
+
+_COMMAND_DEFAULTS = {
+    'help': None,
+    'short_help': None,
+    'epilog': None,
+    'hidden': False,
+    'deprecated': False,
+    'options_metavar': '[OPTIONS]',
+    'add_help_option': True,
+    'no_args_is_help': False,
+    'params': [],
+}
+_PARAM_DEFAULTS = {
+    'nargs': 1,
+    'required': False,
+    'secondary_opts': [],
+    'is_flag': False,
+    'count': False,
+    'multiple': False,
+    'hidden': False,
+    'help_record': None,
+}
+
+
+def _without_defaults(data, defaults):
+    return {k: v for k, v in data.items()
+            if k not in defaults or defaults[k] != v}
+
+
+def _describe_param(param, ctx):
+    data = {
+        'name': param.name,
+        'nargs': param.nargs,
+        'required': bool(param.required and param.default is None),
+    }
+    if isinstance(param.type, click.Choice):
+        data['choices'] = list(param.type.choices)
+        data['case_sensitive'] = param.type.case_sensitive
+    if isinstance(param, click.Option):
+        record = param.get_help_record(ctx)
+        data.update({
+            'kind': 'option',
+            'opts': param.opts,
+            'secondary_opts': param.secondary_opts,
+            'is_flag': param.is_flag,
+            'count': param.count,
+            'multiple': param.multiple,
+            'hidden': param.hidden,
+            'help_record': list(record) if record else None,
+        })
+    else:
+        data.update({
+            'kind': 'argument',
+            'metavar': param.get_usage_pieces(ctx)[0],
+        })
+    return _without_defaults(data, _PARAM_DEFAULTS)
+
+
+class _Describer(object):
+    """Describe commands, storing each distinct parameter only once.
+
+    Most commands share the same common options, so the commands refer to
+    their parameters by index in the shared parameters list.
+    """
+    def __init__(self):
+        self.params = []
+        self._param_indexes = {}
+
+    def _param_index(self, param, ctx):
+        data = _describe_param(param, ctx)
+        key = json.dumps(data, sort_keys=True)
+        if key not in self._param_indexes:
+            self._param_indexes[key] = len(self.params)
+            self.params.append(data)
+        return self._param_indexes[key]
+
+    def describe(self, command, ctx, subcommands=True):
+        data = {
+            'help': command.help,
+            'short_help': command.short_help,
+            'epilog': command.epilog,
+            'hidden': command.hidden,
+            'deprecated': command.deprecated,
+            'options_metavar': command.options_metavar,
+            'add_help_option': command.add_help_option,
+            'no_args_is_help': command.no_args_is_help,
+            'params': [self._param_index(param, ctx)
+                       for param in command.params],
+        }
+        help_option_names = command.context_settings.get('help_option_names')
+        if help_option_names:
+            data['context_settings'] = {
+                'help_option_names': help_option_names}
+        if isinstance(command, click.MultiCommand):
+            data['subcommand_metavar'] = command.subcommand_metavar
+        if isinstance(command, click.MultiCommand) and subcommands:
+            data['commands'] = {}
+            for name in command.list_commands(ctx):
+                subcommand = command.get_command(ctx, name)
+                data['commands'][name] = self.describe(
+                    subcommand,
+                    click.Context(subcommand, info_name=name, parent=ctx))
+        return _without_defaults(data, _COMMAND_DEFAULTS)
+
+
+def generate():
+    """Describe the real command tree.
+
+    This imports all the command modules.
+    """
+    from cloudify_cli import main
+
+    describer = _Describer()
+    root = main._make_cfy()
+    root_ctx = click.Context(root, info_name='cfy',
+                             **root.context_settings)
+    # the root's subcommands depend on the active profile, they're
+    # described separately, by their import spec
+    root_data = describer.describe(root, root_ctx, subcommands=False)
+    commands = {spec_key(ROOT_SPEC): root_data}
+    modules = set(_EXTRA_MODULES)
+    for lazy_command in main.LAZY_COMMANDS:
+        command = lazy_command.load()
+        commands[spec_key(lazy_command.import_spec)] = describer.describe(
+            command,
+            click.Context(command, info_name=lazy_command.name,
+                          parent=root_ctx))
+        modules.add(lazy_command.import_spec[0])
+
+    modules = sorted(modules)
+    return {
+        'format': MANIFEST_FORMAT,
+        'fingerprint': fingerprint(modules),
+        'modules': modules,
+        'params': describer.params,
+        'commands': commands,
+    }
+
+
+def write(path=MANIFEST_PATH):
+    with open(path, 'w') as f:
+        json.dump(generate(), f, indent=0, sort_keys=True,
+                  separators=(',', ':'))
+        f.write('\n')
+
+
+def is_up_to_date(path=MANIFEST_PATH):
+    try:
+        with open(path) as f:
+            shipped = json.load(f)
+    except (IOError, ValueError):
+        return False
+    return json.loads(json.dumps(generate())) == shipped
+
+
+def main(args):
+    """Usage: python -m cloudify_cli.cli.manifest [--check] [PATH]"""
+    check = '--check' in args
+    args = [arg for arg in args if arg != '--check']
+    if len(args) > 1 or any(arg.startswith('-') for arg in args):
+        sys.exit(main.__doc__)
+    path = args[0] if args else MANIFEST_PATH
+    if not check:
+        write(path)
+    elif not is_up_to_date(path):
+        sys.exit('{0} is out of date, regenerate it using '
+                 '`python -m cloudify_cli.cli.manifest`'.format(path))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,487 @@
+"""The rest client used for profiles of a Cloudify Manager cluster.
+
+This is kept apart from env, so that the rest client only gets imported
+when a client is actually made.
+"""
+import os
+import json
+import time
+import types
+import socket
+import tempfile
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+
+import click
+import requests
+
+from cloudify.cluster_status import CloudifyNodeType
+from cloudify.utils import ipv6_url_compat
+from cloudify_rest_client import CloudifyClient
+from cloudify_rest_client.client import HTTPClient
+from cloudify_rest_client.exceptions import CloudifyClientError
+
+from cloudify_cli import constants, env
+from cloudify_cli.compression import CompressionMixin
+from cloudify_cli.metadata_cache import MetadataCacheMixin
+from cloudify_cli.session_tokens import SessionTokenMixin
+
+
+# attributes that can differ for each node in a cluster. Those will be updated
+# in the profile when we switch to a new master.
+# Dicts with these keys live in profile.cluster, and are added there during
+# either `cfy cluster update-profile` (in which case some of them might be
+# missing, eg. ssh_*), or during a `cfy cluster join`.
+# If a value is missing, we will use the value from the last active manager.
+# Only the IP is required.
+# Note that not all attributes are allowed - username/password will be
+# the same for every node in the cluster.
+CLUSTER_NODE_ATTRS = ['host_ip', 'host_type', 'rest_port', 'rest_protocol',
+                      'ssh_port', 'ssh_user', 'ssh_key']
+_TRY_NEXT_NODE = object()
+
+# how the other nodes are tried, when a request to a node fails:
+# all of them are probed at once, and tried in the order they answered,
+# or they are tried one by one, in the order of the profile
+FAILOVER_PARALLEL = 'parallel'
+FAILOVER_SEQUENTIAL = 'sequential'
+FAILOVER_MODES = [FAILOVER_PARALLEL, FAILOVER_SEQUENTIAL]
+HEALTH_FILENAME = 'cluster_health.json'
+# for how long (in seconds) the health of a node is trusted
+HEALTH_TTL = 60
+# a latency that changed by less than this (in seconds, or relatively)
+# isn't worth saving
+LATENCY_CHANGE = 0.01
+LATENCY_RELATIVE_CHANGE = 0.2
+PROBE_TIMEOUT = 5
+# a request body that is sent to more than one manager is kept in memory
+# up to this size, and in a temporary file above it
+SPOOL_MEMORY_SIZE = 8 * 1024 * 1024
+# a body larger than this (if set) isn't kept at all, so it can't be sent
+# to another manager. By default, all of it is kept, in the temporary file
+SPOOL_MAX_SIZE = None
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+# a manager the client can send requests to. node is its entry in
+# profile.cluster, or None for the profile's manager_ip
+_Candidate = namedtuple('_Candidate', ['host', 'port', 'node'])
+_persist_lock = threading.Lock()
+
+
+class NodesHealth(object):
+    """The last known health and latency of the nodes of a cluster.
+
+    This is kept in a file next to the profile, so that the next cfy
+    command doesn't wait for a manager that was found to be offline.
+    """
+    def __init__(self, path, ttl=HEALTH_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.changed = False
+        self._lock = threading.Lock()
+        self._nodes = None
+
+    def _load(self):
+        if self._nodes is None:
+            self._nodes = {}
+            if self.path:
+                try:
+                    with open(self.path) as f:
+                        self._nodes = json.load(f)
+                except (IOError, OSError, ValueError):
+                    pass
+        return self._nodes
+
+    def get(self, host):
+        """The health of the node, or None if it isn't known anymore"""
+        with self._lock:
+            health = self._load().get(host)
+        if health and time.time() - health['checked'] < self.ttl:
+            return health
+        return None
+
+    def update(self, host, healthy, latency=None):
+        """Record the health of the node.
+
+        It's only marked as changed, to be saved, if the health flipped,
+        the latency changed materially, or the health saved before is
+        halfway to expiring. Otherwise, the health saved before is kept.
+        """
+        with self._lock:
+            nodes = self._load()
+            previous = nodes.get(host)
+            if latency is None and healthy:
+                latency = (previous or {}).get('latency')
+            if previous and not self._changed(previous, healthy, latency):
+                return
+            nodes[host] = {'healthy': healthy, 'latency': latency,
+                           'checked': time.time()}
+            self.changed = True
+
+    def _changed(self, previous, healthy, latency):
+        if previous['healthy'] != healthy:
+            return True
+        if time.time() - previous['checked'] > self.ttl / 2.0:
+            return True
+        old_latency = previous.get('latency')
+        if (old_latency is None) != (latency is None):
+            return True
+        if latency is None:
+            return False
+        change = abs(latency - old_latency)
+        return change > LATENCY_CHANGE and \
+            change > LATENCY_RELATIVE_CHANGE * old_latency
+
+    def sort(self, candidates):
+        """Order the candidates: the healthy ones by their latency first,
+        then the ones of unknown health, then the offline ones.
+        """
+        def _key(candidate):
+            health = self.get(candidate.host)
+            if health is None:
+                return 1, 0
+            if not health['healthy']:
+                return 2, 0
+            return 0, health['latency'] or 0
+        return sorted(candidates, key=_key)
+
+    def save(self):
+        if not self.path or not os.path.isdir(os.path.dirname(self.path)):
+            return
+        with self._lock:
+            nodes = dict(self._load())
+            self.changed = False
+        env._write_atomic(self.path, partial(json.dump, nodes))
+
+
+class ReplayableBody(object):
+    """A request body that can be sent again, to another manager.
+
+    A seekable file is seeked back to where it was. A generator, or a file
+    that can't be seeked, is copied to a temporary file while it's sent
+    the first time, and sent again from that file. Only max_memory of it
+    is kept in memory, so that retrying a large upload doesn't need the
+    whole upload in memory. If max_size is set, at most that much is kept
+    at all: the copy of a larger body is dropped, and then it can't be
+    sent again.
+
+    :param replay: whether the body might be sent again; if not, it's
+        never copied
+    """
+    def __init__(self, data, replay=True, max_memory=None, max_size=None):
+        self._data = data
+        self._position = None
+        self._source = None
+        self._spool = None
+        self._spooled = 0
+        self._max_size = max_size or SPOOL_MAX_SIZE
+        self._sent = False
+        if _is_seekable(data):
+            self._position = data.tell()
+        elif replay and (isinstance(data, types.GeneratorType) or
+                         hasattr(data, 'read')):
+            if hasattr(data, 'read'):
+                self._source = iter(partial(data.read, SPOOL_CHUNK_SIZE), b'')
+            else:
+                self._source = data
+            self._spool = tempfile.SpooledTemporaryFile(
+                max_size=max_memory or SPOOL_MEMORY_SIZE)
+
+    def data(self):
+        """The body to send, from its start"""
+        if self._position is not None:
+            self._data.seek(self._position)
+            return self._data
+        if self._source is None:
+            return self._data
+        if not self._sent:
+            self._sent = True
+            return self._spooling()
+        if self._spool is None:
+            raise CloudifyClientError(
+                'The request body is larger than {0} bytes, so it was not '
+                'kept, and it cannot be sent to another manager'
+                .format(self._max_size))
+        # the previous request might have failed before sending all of it
+        for chunk in self._source:
+            self._spool_chunk(chunk)
+        return self._replay()
+
+    def _spooling(self):
+        for chunk in self._source:
+            self._spool_chunk(chunk)
+            yield chunk
+
+    def _spool_chunk(self, chunk):
+        if self._spool is None:
+            return
+        self._spooled += len(chunk)
+        if self._max_size is not None and self._spooled > self._max_size:
+            self.close()
+            return
+        self._spool.write(chunk)
+
+    def _replay(self):
+        self._spool.seek(0)
+        while True:
+            chunk = self._spool.read(SPOOL_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
+
+def _is_seekable(data):
+    try:
+        return data.seekable()
+    except (AttributeError, ValueError):
+        return False
+
+
+def probe_node(host, port, timeout=PROBE_TIMEOUT):
+    """Connect to the node, and return how long it took.
+
+    :return: the latency in seconds, or None if the node is unreachable
+    """
+    started = time.time()
+    try:
+        socket.create_connection((host, port), timeout=timeout).close()
+    except (socket.error, OSError):
+        return None
+    return time.time() - started
+
+
+class ClusterHTTPClient(HTTPClient):
+
+    def __init__(self, *args, **kwargs):
+        profile = kwargs.pop('profile')
+        super(ClusterHTTPClient, self).__init__(*args, **kwargs)
+        if not profile.cluster:
+            raise ValueError('Cluster client invoked for an empty cluster!')
+        self._cluster = list(profile.cluster.get(CloudifyNodeType.MANAGER))
+        self._profile = profile
+        first_node = self._cluster[0]
+        self.cert = first_node.get('cert') or self.cert
+        self.trust_all = first_node.get('trust_all') or self.trust_all
+        self.default_timeout_sec = self.default_timeout_sec or (5, None)
+        self.failover = os.environ.get(
+            constants.CLOUDIFY_CLUSTER_FAILOVER, FAILOVER_PARALLEL)
+        if self.failover not in FAILOVER_MODES:
+            raise ValueError('Unknown cluster failover mode: {0} '
+                             '(expected one of: {1})'.format(
+                                 self.failover, ', '.join(FAILOVER_MODES)))
+        spool_max_size = os.environ.get(
+            constants.CLOUDIFY_CLUSTER_SPOOL_MAX_SIZE)
+        try:
+            self.spool_max_size = int(spool_max_size) \
+                if spool_max_size else None
+        except ValueError:
+            raise ValueError('Invalid cluster spool max size: {0} '
+                             '(expected a number of bytes)'
+                             .format(spool_max_size))
+        profile_dir = env.get_profile_dir(profile.profile_name)
+        self._health = NodesHealth(
+            os.path.join(profile_dir, HEALTH_FILENAME)
+            if profile_dir else None)
+        self._profile_changed = False
+        self._persisting = None
+
+    def do_request(self, *args, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.default_timeout_sec
+
+        manager_host = env.get_target_manager()
+        if manager_host:
+            self.host = ipv6_url_compat(manager_host)
+            return super(ClusterHTTPClient, self).do_request(*args, **kwargs)
+
+        # this request can be retried for each manager, so the body must
+        # be one that can be sent more than once
+        body = ReplayableBody(kwargs.pop('data', None),
+                              replay=bool(self._other_nodes()),
+                              max_size=self.spool_max_size)
+        try:
+            for candidate in self._candidates():
+                self._use_candidate(candidate)
+                kwargs['data'] = body.data()
+                response = self._try_do_request(*args, **kwargs)
+                if response is _TRY_NEXT_NODE:
+                    if self.failover == FAILOVER_PARALLEL:
+                        self._health.update(candidate.host, healthy=False)
+                    continue
+                if self.failover == FAILOVER_PARALLEL:
+                    self._health.update(candidate.host, healthy=True)
+                return response
+        finally:
+            body.close()
+            self._persist()
+
+        raise CloudifyClientError('All cluster nodes are offline')
+
+    def _candidates(self):
+        """The managers to try the request with, in order.
+
+        The first one is the profile's manager, or, in the parallel mode,
+        the node that is known to be the healthiest. When that fails, the
+        other nodes are probed all at once, and tried in the order they
+        answered; the ones that didn't answer are still tried, last.
+        """
+        primary = _Candidate(self._profile.manager_ip, self.port, None)
+        candidates = [primary] + [
+            _Candidate(node['host_ip'], node.get('rest_port') or self.port,
+                       node)
+            for node in self._other_nodes()
+        ]
+        if self.failover == FAILOVER_SEQUENTIAL:
+            for candidate in candidates:
+                yield candidate
+            return
+
+        candidates = self._health.sort(candidates)
+        yield candidates[0]
+        for candidate in self._probe(candidates[1:]):
+            yield candidate
+
+    def _other_nodes(self):
+        """The cluster nodes, except for the profile's manager"""
+        return [
+            node for node in self._profile.cluster[CloudifyNodeType.MANAGER]
+            if self._profile.manager_ip not in [node['host_ip'],
+                                                node.get('hostname')]
+        ]
+
+    def _probe(self, candidates):
+        if not candidates:
+            return
+        executor = ThreadPoolExecutor(max_workers=len(candidates))
+        try:
+            probes = {
+                executor.submit(probe_node, candidate.host, candidate.port):
+                candidate for candidate in candidates
+            }
+            offline = []
+            for probe in as_completed(probes):
+                candidate = probes[probe]
+                latency = probe.result()
+                self._health.update(
+                    candidate.host, latency is not None, latency)
+                if latency is None:
+                    offline.append(candidate)
+                else:
+                    yield candidate
+            # a node might still serve http, even if it couldn't be probed
+            for candidate in offline:
+                yield candidate
+        finally:
+            executor.shutdown(wait=False)
+
+    def _try_do_request(self, *args, **kwargs):
+        try:
+            return super(ClusterHTTPClient, self).do_request(*args,
+                                                             **kwargs)
+        except (requests.exceptions.ConnectionError,
+                CloudifyClientError) as e:
+            if isinstance(e, CloudifyClientError) and e.status_code != 502:
+                raise
+            self.logger.warning('Could not connect to manager %s on port %s',
+                                self.host, self.port)
+            self.logger.debug(str(e))
+        return _TRY_NEXT_NODE
+
+    def _use_candidate(self, candidate):
+        if candidate.node is not None:
+            self._use_node(candidate.node)
+        else:
+            self.host = ipv6_url_compat(candidate.host)
+
+    def _use_node(self, node):
+        if ipv6_url_compat(node['host_ip']) == self.host:
+            return
+        self.host = ipv6_url_compat(node['host_ip'])
+        for attr in ['rest_port', 'rest_protocol', 'trust_all', 'cert']:
+            new_value = node.get(attr)
+            if new_value:
+                setattr(self, attr, new_value)
+        self._update_profile(node)
+
+    def _update_profile(self, node):
+        """
+        Put the node at the start of the cluster list in profile.
+
+        The client tries nodes in the order of the cluster list, so putting
+        the node first will make the client try it first next time. This makes
+        the client always try the last-known-active-manager first.
+        The profile is saved once the request is done.
+        """
+        self._profile.cluster[CloudifyNodeType.MANAGER].remove(node)
+        self._profile.cluster[CloudifyNodeType.MANAGER] = (
+            [node] + self._profile.cluster[CloudifyNodeType.MANAGER])
+        for node_attr in CLUSTER_NODE_ATTRS:
+            if node_attr in node:
+                setattr(self._profile, node_attr, node[node_attr])
+        self._profile_changed = True
+
+    def _persist(self):
+        """Save the profile and the nodes health, in the background.
+
+        The request doesn't wait for the files to be written, but the
+        command waits for it when it ends: the thread isn't a daemon, so
+        the interpreter waits for it on exit, but a command run by the cfy
+        daemon ends with os._exit, which wouldn't. Outside of a command,
+        there's no end to wait for, so they're written right away.
+        """
+        writes = []
+        if self._profile_changed:
+            self._profile_changed = False
+            writes.append(self._profile.save)
+        if self._health.changed:
+            writes.append(self._health.save)
+        if not writes:
+            return
+
+        def _write():
+            with _persist_lock:
+                for write in writes:
+                    try:
+                        write()
+                    except Exception as e:
+                        self.logger.debug(
+                            'Could not save the cluster profile: %s', e)
+        ctx = click.get_current_context(silent=True)
+        if ctx is None:
+            _write()
+            return
+        self._persisting = threading.Thread(
+            target=_write, name='cfy-cluster-profile')
+        self._persisting.start()
+        ctx.find_root().call_on_close(self._persisting.join)
+
+
+class CliClusterHTTPClient(SessionTokenMixin, MetadataCacheMixin,
+                           CompressionMixin, ClusterHTTPClient):
+    pass
+
+
+class CloudifyClusterClient(CloudifyClient):
+    """
+    A CloudifyClient that will retry the queries with the current manager.
+
+    When a request fails with a connection error, this will keep trying with
+    every node in the cluster, until it finds an active manager.
+
+    When an active manager is found, the profile will be updated with its
+    address.
+    """
+    def __init__(self, profile, *args, **kwargs):
+        self._profile = profile
+        super(CloudifyClusterClient, self).__init__(*args, **kwargs)
+
+    def client_class(self, *args, **kwargs):
+        kwargs.setdefault('profile', self._profile)
+        return CliClusterHTTPClient(*args, **kwargs)
@@ -15,22 +15,17 @@
 ############
 
 import os.path
-import threading
-import time
-
-try:
-    import queue    # Python 3.x
-except ImportError:
-    import Queue as queue
 
 from cloudify.logs import create_event_message_prefix
+from cloudify_rest_client.executions import Execution
 
 from cloudify_cli import env, utils
 from cloudify_cli.cli import cfy
 from cloudify_cli.exceptions import CloudifyCliError
 from cloudify_cli.execution_events_fetcher import (
-    wait_for_execution,
-    WAIT_FOR_EXECUTION_SLEEP_INTERVAL)
+    ExecutionEventsFetcher,
+    PollingScheduler,
+)
 from cloudify_cli.table import print_data
 
 
@@ -38,7 +33,11 @@ _NODE_INSTANCE_STATE_STARTED = 'started'
 AGENT_COLUMNS = ['id', 'ip', 'deployment', 'state', 'node', 'system',
                  'version', 'install_method', 'tenant_name']
 
-MAX_TRACKER_THREADS = 20
+# the status of this many executions is fetched in a single request
+TRACKER_BATCH_SIZE = 100
+# stop tracking executions after their status failed to be fetched this
+# many times in a row
+TRACKER_MAX_POLL_FAILURES = 5
 
 
 @cfy.group(name='agents')
@@ -226,7 +225,8 @@ def get_filters_map(
         # We skip this check if specific deployment ID's were requested.
         if not requested_deployment_ids:
             for tenant_name in list(tenants_to_deployments):
-                tenant_client = env.get_rest_client(tenant_name=tenant_name)
+                tenant_client = env.get_rest_client(
+                    tenant_name=tenant_name, pooled=True)
                 deps_to_execute = tenants_to_deployments[tenant_name]
                 offset = 0
                 while True:
@@ -277,7 +277,8 @@ def get_deployments_and_run_workers(
     started_executions = []
     requested_install_methods = agent_filters[cfy.AGENT_FILTER_INSTALL_METHODS]
     for tenant_name, deployments in tenants_to_deployments.items():
-        tenant_client = env.get_rest_client(tenant_name=tenant_name)
+        tenant_client = env.get_rest_client(
+            tenant_name=tenant_name, pooled=True)
         for deployment_id, dep_filters in deployments.items():
             execution_params = dep_filters.copy()   # Shallow is fine.
             if requested_install_methods:
@@ -299,73 +300,160 @@ def get_deployments_and_run_workers(
                     "view the events associated with these executions.")
         return
 
-    executions_queue = queue.Queue()
-    for execution_info in started_executions:
-        executions_queue.put(execution_info)
+    tracker = ExecutionsTracker(started_executions, workflow_id, logger)
+    tracker.run()
+    if tracker.errors:
+        raise CloudifyCliError("At least one execution ended with an error:\n"
+                               "{0}".format('\n'.join(tracker.errors)))
+
+
+class ExecutionsTracker(object):
+    """Wait for many executions to end, in a single thread.
 
-    errors_summary = []
+    Every poll, the status of all the running executions is fetched using
+    a few list requests per tenant, and then the new events of each of
+    them. The polls back off while no new events arrive.
+    """
 
-    def _events_handler(events):
+    def __init__(self, executions, workflow_id, logger):
+        """
+        :param executions: a list of (tenant name, execution) pairs
+        """
+        self._workflow_id = workflow_id
+        self._logger = logger
+        self._running = {(tenant_name, execution.id): execution
+                         for tenant_name, execution in executions}
+        self._events_fetchers = {}
+        # the number of polls in a row that failed, for each execution
+        self._poll_failures = {}
+        self._scheduler = PollingScheduler(watch_end_events=False)
+        self._events_handler = self._scheduler.events_handler(
+            self._log_events)
+        self.done = 0
+        self.failed = 0
+        self.errors = []
+
+    def run(self):
+        progress = None
+        while self._running:
+            self._poll()
+            if self.progress() != progress:
+                progress = self.progress()
+                self._logger.info(progress)
+            if self._running:
+                self._scheduler.wait()
+
+    def progress(self):
+        return 'Executions: {0} done, {1} failed, {2} running'.format(
+            self.done, self.failed, len(self._running))
+
+    def _client(self, tenant_name):
+        return env.get_rest_client(tenant_name=tenant_name, pooled=True)
+
+    def _poll(self):
+        execution_ids = {}
+        for tenant_name, execution_id in self._running:
+            execution_ids.setdefault(tenant_name, []).append(execution_id)
+        for tenant_name, ids in execution_ids.items():
+            for i in range(0, len(ids), TRACKER_BATCH_SIZE):
+                batch = ids[i:i + TRACKER_BATCH_SIZE]
+                try:
+                    executions = self._client(tenant_name).executions.list(
+                        id=batch,
+                        _include=['id', 'status', 'error', 'deployment_id'],
+                        _size=len(batch))
+                except Exception as ex:
+                    self._poll_failed(tenant_name, batch, ex)
+                    continue
+                for execution in executions:
+                    self._update(tenant_name, execution)
+                missing = set(batch) - {e.id for e in executions}
+                for execution_id in missing:
+                    self._tracking_failed(
+                        tenant_name, execution_id,
+                        CloudifyCliError('Execution not found'),
+                        traceback=False)
+
+    def _poll_failed(self, tenant_name, execution_ids, ex):
+        """Retry on the next poll, unless it failed too many times"""
+        self._logger.warning('Failed polling %d executions: %s',
+                             len(execution_ids), ex)
+        for execution_id in execution_ids:
+            key = tenant_name, execution_id
+            self._poll_failures[key] = self._poll_failures.get(key, 0) + 1
+            if self._poll_failures[key] >= TRACKER_MAX_POLL_FAILURES:
+                self._tracking_failed(tenant_name, execution_id, ex)
+
+    def _update(self, tenant_name, execution):
+        key = tenant_name, execution.id
+        # the events are fetched after the status, so that all the events
+        # of an execution that ended are shown
+        try:
+            self._fetch_events(tenant_name, execution)
+        except Exception as ex:
+            self._poll_failed(tenant_name, [execution.id], ex)
+            return
+        self._poll_failures.pop(key, None)
+        if execution.status == self._running[key].status:
+            return
+        self._running[key] = execution
+        if execution.status in Execution.END_STATES:
+            del self._running[key]
+            self._events_fetchers.pop(key, None)
+            self._finished(execution)
+
+    def _fetch_events(self, tenant_name, execution):
+        key = tenant_name, execution.id
+        if key not in self._events_fetchers:
+            self._events_fetchers[key] = ExecutionEventsFetcher(
+                self._client(tenant_name),
+                execution=execution,
+                execution_id=execution.id,
+                include_logs=True)
+        self._events_fetchers[key].fetch_and_process_events(
+            events_handler=self._events_handler, timeout=None)
+
+    def _log_events(self, events):
         for event in events:
             output = create_event_message_prefix(event)
             if output:
-                logger.info(output)
-
-    def _tracker_thread():
-        while True:
-            try:
-                tenant_name, execution = executions_queue.get_nowait()
-            except queue.Empty:
-                break
-
-            try:
-                tenant_client = env.get_rest_client(tenant_name=tenant_name)
-                execution = wait_for_execution(
-                    tenant_client, execution, events_handler=_events_handler,
-                    include_logs=True, timeout=None)
-
-                if execution.error:
-                    message = "Execution of workflow '{0}' for " \
-                              "deployment '{1}' failed. [error={2}]".format(
-                                  workflow_id, execution.deployment_id,
-                                  execution.error)
-                    logger.error(message)
-                    errors_summary.append(message)
-                else:
-                    logger.info("Finished executing workflow "
-                                "'{0}' on deployment"
-                                " '{1}'".format(workflow_id,
-                                                execution.deployment_id))
-            except Exception as ex:
-                # Log to the logger with a full traceback.
-                # Add to errors summary with only the exception message,
-                # to avoid clutter.
-                logger.exception("Failed waiting for execution {0} to "
-                                 "finish".format(execution.id))
-
-                errors_summary.append(
-                    "Failed waiting for execution {0} to finish; error "
-                    "message: %s" % str(ex)
-                )
-
-    threads = []
-    for i in range(MAX_TRACKER_THREADS):
-        thread = threading.Thread(target=_tracker_thread)
-        threads.append(thread)
-        thread.daemon = True
-        thread.start()
-
-    while True:
-        if all(not thread.is_alive() for thread in threads):
-            break
-        time.sleep(WAIT_FOR_EXECUTION_SLEEP_INTERVAL)
-
-    # No need to join any thread, because if we get to this point,
-    # all threads have already ended (see loop above).
-
-    if errors_summary:
-        raise CloudifyCliError("At least one execution ended with an error:\n"
-                               "{0}".format('\n'.join(errors_summary)))
+                self._logger.info(output)
+
+    def _finished(self, execution):
+        if execution.error:
+            self.failed += 1
+            message = "Execution of workflow '{0}' for " \
+                      "deployment '{1}' failed. [error={2}]".format(
+                          self._workflow_id, execution.deployment_id,
+                          execution.error)
+            self._logger.error(message)
+            self.errors.append(message)
+        else:
+            self.done += 1
+            self._logger.info("Finished executing workflow "
+                              "'{0}' on deployment"
+                              " '{1}'".format(self._workflow_id,
+                                              execution.deployment_id))
+
+    def _tracking_failed(self, tenant_name, execution_id, ex,
+                         traceback=True):
+        # Log to the logger with a full traceback, when called while
+        # handling the exception.
+        # Add to errors summary with only the exception message,
+        # to avoid clutter.
+        message = "Failed waiting for execution {0} to finish".format(
+            execution_id)
+        if traceback:
+            self._logger.exception(message)
+        else:
+            self._logger.error('%s: %s', message, ex)
+        self.errors.append(
+            "Failed waiting for execution {0} to finish; error "
+            "message: {1}".format(execution_id, ex))
+        self.failed += 1
+        self._running.pop((tenant_name, execution_id), None)
+        self._events_fetchers.pop((tenant_name, execution_id), None)
+        self._poll_failures.pop((tenant_name, execution_id), None)
 
 
 @agents.command(name='validate',
@@ -3,6 +3,7 @@ from datetime import datetime, timedelta
 
 import click
 
+from cloudify_cli import pagination
 from cloudify_cli.cli import cfy, helptexts
 from cloudify_cli.exceptions import CloudifyCliError
 from cloudify_cli.logger import get_global_json_output
@@ -65,6 +66,7 @@ def auditlog():
 @cfy.options.descending
 @cfy.options.pagination_offset
 @cfy.options.pagination_size
+@cfy.options.all_pages
 @cfy.options.common_options
 @cfy.pass_logger
 @cfy.pass_client()
@@ -77,6 +79,7 @@ def list_logs(creator_name,
               descending,
               pagination_offset,
               pagination_size,
+              all_pages,
               logger,
               client,
               ):
@@ -96,6 +99,7 @@ def list_logs(creator_name,
                    descending,
                    pagination_offset,
                    pagination_size,
+                   all_pages,
                    logger,
                    client)
 
@@ -107,11 +111,16 @@ def _list_logs(creator_name,
                descending,
                pagination_offset,
                pagination_size,
+               all_pages,
                logger,
                client):
     """List audit_log entries"""
     logger.info('Listing audit log entries...')
-    logs = client.auditlog.list(
+    logs = pagination.list_items(
+        client.auditlog.list,
+        all_pages,
+        offset_param='offset',
+        size_param='size',
         creator_name=creator_name,
         execution_id=execution_id,
         since=since,
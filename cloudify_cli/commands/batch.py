@@ -0,0 +1,301 @@
+import io
+import sys
+import json
+import shlex
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+
+from cloudify_cli import env
+from cloudify_cli import logger as cli_logger
+from cloudify_cli.cli import cfy, helptexts
+from cloudify_cli.exceptions import (
+    CloudifyCliError,
+    SuppressedCloudifyCliError,
+)
+from cloudify_cli.table import print_data
+
+BATCH_COLUMNS = ['line', 'command', 'exit_code']
+# the options that change the output settings and the loggers, which are
+# global to the process
+OUTPUT_OPTIONS = ['--json', '--format', '--verbose', '--quiet',
+                  '--extended-view']
+OUTPUT_SHORT_OPTIONS = 'vqx'
+
+
+def parse_batch(content):
+    """Parse a batch file into a list of (line number, args) pairs.
+
+    The batch is either a JSON or YAML list, or a script with one command
+    per line. Each command is either a string, or (in a list) a list of
+    arguments. The leading `cfy` is optional.
+    """
+    stripped = content.lstrip()
+    if stripped.startswith('['):
+        try:
+            commands = json.loads(content)
+        except ValueError as e:
+            raise CloudifyCliError('Invalid JSON batch: {0}'.format(e))
+        numbered = list(enumerate(commands, 1))
+    elif stripped.startswith('-'):
+        import yaml
+        try:
+            commands = yaml.safe_load(content)
+        except yaml.YAMLError as e:
+            raise CloudifyCliError('Invalid YAML batch: {0}'.format(e))
+        numbered = list(enumerate(commands, 1))
+    else:
+        numbered = list(enumerate(content.splitlines(), 1))
+
+    parsed = []
+    for line_number, command in numbered:
+        if isinstance(command, list):
+            args = [str(arg) for arg in command]
+        elif isinstance(command, str):
+            try:
+                args = shlex.split(command, comments=True)
+            except ValueError as e:
+                raise CloudifyCliError(
+                    'Invalid command in line {0}: {1}'.format(
+                        line_number, e))
+        else:
+            raise CloudifyCliError(
+                'Invalid command in item {0}: expected a string or a list, '
+                'got {1!r}'.format(line_number, command))
+        if args and args[0] == 'cfy':
+            args = args[1:]
+        if args:
+            parsed.append((line_number, args))
+    return parsed
+
+
+def run_command(args):
+    """Run a single cfy command in this process, and return its exit code"""
+    # options like --json set global state, which must not leak into the
+    # following commands
+    json_output = cli_logger.get_global_json_output()
+    json_output_format = cli_logger.get_global_json_output_format()
+    extended_view = cli_logger.get_global_extended_view()
+    verbosity = cli_logger.get_global_verbosity()
+    try:
+        return _invoke(args)
+    finally:
+        cli_logger.set_global_json_output(json_output, json_output_format)
+        cli_logger.set_global_extended_view(extended_view)
+        cli_logger.set_global_verbosity_level(verbosity)
+
+
+def _invoke(args):
+    from cloudify_cli import main
+    # make the app object for each command, because a command might change
+    # the active profile, and with it, the available commands
+    cli = main._make_cfy()
+    try:
+        rv = cli.main(args=args, prog_name='cfy', standalone_mode=False)
+    except click.ClickException as e:
+        e.show()
+        return e.exit_code
+    except click.exceptions.Exit as e:
+        return e.exit_code
+    except click.Abort:
+        click.echo('Aborted!', err=True)
+        return 1
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        click.echo(e.code, err=True)
+        return 1
+    except Exception:
+        sys.excepthook(*sys.exc_info())
+        return 1
+    # with standalone_mode=False, click returns the code given to ctx.exit
+    if isinstance(rv, int) and not isinstance(rv, bool):
+        return rv
+    return 0
+
+
+class _ThreadOutput(object):
+    """A stream that writes to a per-thread buffer, if the thread has one.
+
+    This is used as sys.stdout and sys.stderr when running commands in
+    parallel, so that the output of each command can be shown in one piece.
+    """
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    def capture(self, buf):
+        self._local.buf = buf
+
+    def _target(self):
+        buf = getattr(self._local, 'buf', None)
+        return self._stream if buf is None else buf
+
+    def write(self, data):
+        return self._target().write(data)
+
+    def flush(self):
+        return self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def sets_output_options(args):
+    """Whether the command sets one of the global output options.
+
+    Short options might be combined, eg. `-vx`, so any short option with
+    one of these letters counts; it's fine to be wrong about some.
+    """
+    for arg in args:
+        if arg == '--':
+            break
+        if arg.startswith('--'):
+            if arg.split('=', 1)[0] in OUTPUT_OPTIONS:
+                return True
+        elif arg.startswith('-') and \
+                set(arg[1:]) & set(OUTPUT_SHORT_OPTIONS):
+            return True
+    return False
+
+
+class _OutputLock(object):
+    """Held shared by the commands that use the global output settings,
+    and exclusively by the ones that change them.
+
+    A command waiting for it exclusively goes before the commands that
+    want it shared later, so it isn't held up indefinitely.
+    """
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._shared = 0
+        self._exclusive = False
+        self._waiting_exclusive = 0
+
+    @contextmanager
+    def hold(self, exclusive):
+        with self._condition:
+            if exclusive:
+                self._waiting_exclusive += 1
+                self._condition.wait_for(
+                    lambda: not self._exclusive and not self._shared)
+                self._waiting_exclusive -= 1
+                self._exclusive = True
+            else:
+                self._condition.wait_for(
+                    lambda: not self._exclusive and
+                    not self._waiting_exclusive)
+                self._shared += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                if exclusive:
+                    self._exclusive = False
+                else:
+                    self._shared -= 1
+                self._condition.notify_all()
+
+
+def _run_sequentially(commands, continue_on_error):
+    results = []
+    for line_number, args in commands:
+        exit_code = run_command(args)
+        results.append((line_number, args, exit_code))
+        if exit_code and not continue_on_error:
+            break
+    return results
+
+
+def _run_in_parallel(commands, parallel, continue_on_error):
+    stdout = _ThreadOutput(sys.stdout)
+    stderr = _ThreadOutput(sys.stderr)
+    failed = threading.Event()
+    # the output settings, like --json, and the loggers, are global, so a
+    # command that changes them runs alone
+    output_lock = _OutputLock()
+
+    def _run(args):
+        if failed.is_set() and not continue_on_error:
+            return None, ''
+        buf = io.StringIO()
+        stdout.capture(buf)
+        stderr.capture(buf)
+        try:
+            with output_lock.hold(exclusive=sets_output_options(args)):
+                exit_code = run_command(args)
+        finally:
+            stdout.capture(None)
+            stderr.capture(None)
+        if exit_code:
+            failed.set()
+        return exit_code, buf.getvalue()
+
+    original = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = stdout, stderr
+    # the logger must be configured again, so that it writes to the
+    # per-thread buffers as well
+    cli_logger._lgr = None
+    results = []
+    try:
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            futures = [(line_number, args, executor.submit(_run, args))
+                       for line_number, args in commands]
+            for line_number, args, future in futures:
+                exit_code, output = future.result()
+                if exit_code is None:
+                    continue
+                original[0].write(output)
+                original[0].flush()
+                results.append((line_number, args, exit_code))
+    finally:
+        sys.stdout, sys.stderr = original
+        cli_logger._lgr = None
+    return results
+
+
+@cfy.command(name='batch',
+             short_help='Run a batch of cfy commands in a single process')
+@click.argument('batch-file', type=click.File('r'))
+@click.option('--continue-on-error',
+              is_flag=True,
+              default=False,
+              help=helptexts.BATCH_CONTINUE_ON_ERROR)
+@click.option('--parallel',
+              type=click.IntRange(min=1),
+              default=1,
+              show_default=True,
+              help=helptexts.BATCH_PARALLEL)
+@cfy.options.common_options
+@cfy.pass_logger
+def batch(batch_file, continue_on_error, parallel, logger):
+    """Run the cfy commands in BATCH_FILE, in a single process
+
+    `BATCH_FILE` is a file with one cfy command per line, or a JSON or YAML
+    list of commands. Use `-` to read the commands from stdin. Running the
+    commands in a single process saves the startup time of each command,
+    and lets them share REST clients and their connections.
+    """
+    commands = parse_batch(batch_file.read())
+    logger.info('Running %s commands...', len(commands))
+    with env.shared_rest_clients():
+        if parallel > 1:
+            results = _run_in_parallel(commands, parallel, continue_on_error)
+        else:
+            results = _run_sequentially(commands, continue_on_error)
+
+    print_data(BATCH_COLUMNS, [
+        {'line': line_number,
+         'command': ' '.join(shlex.quote(arg) for arg in args),
+         'exit_code': exit_code}
+        for line_number, args, exit_code in results
+    ], 'Batch results:')
+    failed = [result for result in results if result[2]]
+    skipped = len(commands) - len(results)
+    if skipped:
+        logger.info('Skipped %s commands after a failure', skipped)
+    if failed:
+        logger.error('%s of %s commands failed', len(failed), len(commands))
+        raise SuppressedCloudifyCliError()
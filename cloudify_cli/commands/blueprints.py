@@ -31,6 +31,7 @@ from cloudify_cli import (
     exceptions,
     filters_utils,
     local,
+    pagination,
     utils)
 from cloudify_cli.cli import cfy, helptexts
 from cloudify_cli.config import config
@@ -39,6 +40,7 @@ from cloudify_cli.labels_utils import (
     add_labels,
     delete_labels,
     list_labels,
+    serialize_labels,
     serialize_resource_labels)
 from cloudify_cli.logger import get_global_json_output
 from cloudify_cli.table import print_data, print_single
@@ -48,7 +50,7 @@ from cloudify_cli.utils import (
     validate_visibility)
 from cloudify_cli.commands.summary import (
     BASE_SUMMARY_FIELDS,
-    structure_summary_results)
+    summarize)
 
 
 DESCRIPTION_LIMIT = 20
@@ -239,6 +241,8 @@ def delete(blueprint_id, force, logger, client, tenant_name):
 @cfy.options.search
 @cfy.options.pagination_offset
 @cfy.options.pagination_size
+@cfy.options.all_pages
+@cfy.options.columns
 @cfy.assert_manager_active()
 @cfy.pass_client()
 @cfy.pass_logger
@@ -252,12 +256,14 @@ def manager_list(filter_id,
                  search,
                  pagination_offset,
                  pagination_size,
+                 all_pages,
+                 columns,
                  logger,
                  client):
     """List all blueprints
     """
     def trim_description(blueprint):
-        if blueprint['description'] is not None:
+        if blueprint.get('description') is not None:
             if len(blueprint['description']) >= DESCRIPTION_LIMIT:
                 blueprint['description'] = '{0}..'.format(
                     blueprint['description'][:DESCRIPTION_LIMIT - 2])
@@ -267,8 +273,11 @@ def manager_list(filter_id,
 
     utils.explicit_tenant_name_message(tenant_name, logger)
     logger.info('Listing all blueprints...')
+    columns = columns or BLUEPRINT_COLUMNS
 
-    blueprints_list = client.blueprints.list(
+    blueprints_list = pagination.list_items(
+        client.blueprints.list,
+        all_pages,
         sort=sort_by,
         is_descending=descending,
         _all_tenants=all_tenants,
@@ -276,11 +285,12 @@ def manager_list(filter_id,
         _offset=pagination_offset,
         _size=pagination_size,
         filter_rules=filter_rules,
-        filter_id=filter_id
+        filter_id=filter_id,
+        _include=columns,
     )
-    blueprints = [trim_description(b) for b in blueprints_list]
-    serialize_resource_labels(blueprints)
-    print_data(BLUEPRINT_COLUMNS, blueprints, 'Blueprints:')
+    blueprints = pagination.map_items(trim_description, blueprints_list)
+    blueprints = pagination.map_items(serialize_labels, blueprints)
+    print_data(columns, blueprints, 'Blueprints:')
 
     total = blueprints_list.metadata.pagination.total
     base_str = 'Showing {0} of {1} blueprints'.format(
@@ -502,30 +512,29 @@ def set_visibility(blueprint_id, visibility, logger, client):
                         example='blueprint with the same tenant name',
                         fields='|'.join(BLUEPRINTS_SUMMARY_FIELDS)))
 @cfy.argument('target_field', type=cfy.SummaryArgs(BLUEPRINTS_SUMMARY_FIELDS))
-@cfy.argument('sub_field', type=cfy.SummaryArgs(BLUEPRINTS_SUMMARY_FIELDS),
-              default=None, required=False)
+@cfy.argument('sub_fields', type=cfy.SummaryArgs(BLUEPRINTS_SUMMARY_FIELDS),
+              nargs=-1)
 @cfy.options.common_options
 @cfy.options.tenant_name(required=False, resource_name_for_help='summary')
 @cfy.options.all_tenants
+@cfy.options.per_tenant
+@cfy.options.percentages
 @cfy.pass_logger
 @cfy.pass_client()
-def summary(target_field, sub_field, logger, client, tenant_name,
-            all_tenants):
+def summary(target_field, sub_fields, logger, client, tenant_name, all_tenants,
+            per_tenant, percentages):
     utils.explicit_tenant_name_message(tenant_name, logger)
     logger.info('Retrieving summary of blueprints on field {field}'.format(
         field=target_field))
 
-    summary = client.summary.blueprints.get(
-        _target_field=target_field,
-        _sub_field=sub_field,
-        _all_tenants=all_tenants,
-    )
-
-    columns, items = structure_summary_results(
-        summary.items,
-        target_field,
-        sub_field,
+    columns, items = summarize(
+        client,
         'blueprints',
+        (target_field,) + sub_fields,
+        per_tenant=per_tenant,
+        percentages=percentages,
+        logger=logger,
+        _all_tenants=all_tenants,
     )
 
     print_data(
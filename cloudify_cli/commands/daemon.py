@@ -0,0 +1,51 @@
+from cloudify_cli import daemon as cfy_daemon
+from cloudify_cli.cli import cfy
+from cloudify_cli.table import print_details
+
+
+@cfy.group(name='daemon')
+@cfy.options.common_options
+def daemon():
+    """Handle the cfy daemon
+
+    The daemon keeps the CLI loaded in the background, so that each `cfy`
+    invocation doesn't have to start from scratch. While it's running,
+    commands are passed to it automatically. Set the CFY_NO_DAEMON
+    environment variable to run a command without the daemon.
+    """
+
+
+@daemon.command(name='start',
+                short_help='Start the cfy daemon')
+@cfy.options.idle_timeout
+@cfy.options.local_common_options
+@cfy.pass_logger
+def start(idle_timeout, logger):
+    logger.info('Starting the cfy daemon...')
+    details = cfy_daemon.start(idle_timeout=idle_timeout)
+    logger.info('The cfy daemon is running [pid=%s]', details['pid'])
+
+
+@daemon.command(name='stop',
+                short_help='Stop the cfy daemon')
+@cfy.options.local_common_options
+@cfy.pass_logger
+def stop(logger):
+    if cfy_daemon.stop():
+        logger.info('The cfy daemon was stopped')
+    else:
+        logger.info('The cfy daemon is not running')
+
+
+@daemon.command(name='status',
+                short_help='Show the status of the cfy daemon')
+@cfy.options.local_common_options
+@cfy.pass_logger
+def status(logger):
+    details = cfy_daemon.status()
+    if not details:
+        logger.info('The cfy daemon is not running')
+        return
+    details['up_to_date'] = \
+        details.pop('fingerprint') == cfy_daemon.fingerprint()
+    print_details(details, 'The cfy daemon is running:')
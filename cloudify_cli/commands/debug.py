@@ -0,0 +1,94 @@
+import subprocess
+import sys
+
+import click
+
+from cloudify_cli.cli import cfy
+from cloudify_cli.exceptions import CloudifyCliError
+from cloudify_cli.table import print_data
+
+IMPORT_TIMES_COLUMNS = ['module', 'cumulative_ms', 'self_ms']
+
+
+@cfy.group(name='debug')
+def debug():
+    """Troubleshoot the CLI itself"""
+
+
+def measure_import_times(module_name):
+    """Import module_name in a fresh interpreter, and time every import.
+
+    This uses the interpreter's own `-X importtime` instrumentation, so
+    the measurement includes everything that importing the module pulls in.
+
+    :return: a list of dicts with the module name, and the time it took to
+        import the module itself, and together with all its imports,
+        in milliseconds
+    """
+    proc = subprocess.Popen(
+        [sys.executable, '-X', 'importtime', '-c',
+         'import {0}'.format(module_name)],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True)
+    _, stderr = proc.communicate()
+    if proc.returncode:
+        raise CloudifyCliError(
+            'Could not import {0}:\n{1}'.format(module_name, stderr))
+    return parse_import_times(stderr, module_name)
+
+
+def parse_import_times(importtime_output, module_name=None):
+    """Parse the output of `python -X importtime`
+
+    :param module_name: if given, only return the times of the modules
+        that were imported while importing this module (and not eg. the
+        modules imported on interpreter startup)
+    """
+    import_times = []
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = \
+            line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            # the header line
+            continue
+        # the output is in post-order, with nested imports indented: a
+        # top-level module is listed after all the modules it imported
+        top_level = not name[1:].startswith(' ')
+        name = name.strip()
+        import_times.append({
+            'module': name,
+            'self_ms': round(int(self_us) / 1000.0, 1),
+            'cumulative_ms': round(int(cumulative_us) / 1000.0, 1),
+        })
+        if module_name is not None and top_level:
+            if name == module_name:
+                break
+            import_times = []
+    return import_times
+
+
+@debug.command(name='import-times',
+               short_help='Show the time spent importing modules')
+@click.argument('module-name', required=False, default='cloudify_cli.main')
+@click.option('-n', '--limit', type=int, default=25, show_default=True,
+              help='Show only this many of the slowest modules')
+@cfy.options.local_common_options
+@cfy.pass_logger
+def import_times(module_name, limit, logger):
+    """Show the time spent importing MODULE_NAME and each of its imports.
+
+    `MODULE_NAME` is the module to import (default: cloudify_cli.main,
+    which is what runs on every `cfy` invocation). Modules are sorted by
+    their cumulative import time, i.e. including the modules they import.
+    """
+    logger.info('Measuring the import time of %s...', module_name)
+    times = measure_import_times(module_name)
+    total = next((t['cumulative_ms'] for t in times
+                  if t['module'] == module_name), None)
+    times.sort(key=lambda t: t['cumulative_ms'], reverse=True)
+    print_data(IMPORT_TIMES_COLUMNS, times[:limit], 'Import times:')
+    if total is not None:
+        logger.info('Importing %s took %.1fms in total', module_name, total)
@@ -47,7 +47,8 @@ from cloudify_cli.logger import (
     output,
     get_global_extended_view
 )
-from cloudify_cli import env, execution_events_fetcher, filters_utils, utils
+from cloudify_cli import (env, execution_events_fetcher, filters_utils,
+                          pagination, utils)
 from cloudify_cli.constants import DEFAULT_BLUEPRINT_PATH, DELETE_DEP
 from cloudify_cli.exceptions import (
     CloudifyCliError,
@@ -59,7 +60,7 @@ from cloudify_cli.labels_utils import (
     get_output_resource_labels,
     get_printable_resource_labels,
     list_labels,
-    serialize_resource_labels)
+    serialize_labels)
 from cloudify_cli.utils import (
     prettify_client_error,
     get_visibility,
@@ -67,7 +68,8 @@ from cloudify_cli.utils import (
     get_deployment_environment_execution)
 from cloudify_cli.commands.summary import (
     BASE_SUMMARY_FIELDS,
-    structure_summary_results)
+    structure_summary_results,
+    summarize)
 
 
 DEPLOYMENT_COLUMNS = [
@@ -226,6 +228,8 @@ def deployments_list_base(
     dependencies_of,
     pagination_offset,
     pagination_size,
+    all_pages,
+    columns,
     logger,
     client,
     tenant_name,
@@ -241,37 +245,42 @@ def deployments_list_base(
     else:
         logger.info('Listing all deployments...')
 
-    deployments = client.deployments.list(sort=sort_by,
-                                          is_descending=descending,
-                                          filter_rules=filter_rules,
-                                          filter_id=filter_id,
-                                          _all_tenants=all_tenants,
-                                          _search=search,
-                                          _offset=pagination_offset,
-                                          _size=pagination_size,
-                                          _group_id=group_id,
-                                          blueprint_id=blueprint_id,
-                                          _search_name=search_name,
-                                          _dependencies_of=dependencies_of)
-    serialize_resource_labels(deployments)
+    # only the columns shown are fetched
+    if not columns:
+        if ctx.command.name == 'status-list':
+            columns = DEPLOYMENT_STATUS_LIST_COLUMNS
+        elif get_global_extended_view() or get_global_json_output():
+            columns = EXTENDED_DEPLOYMENT_COLUMNS
+        else:
+            columns = DEPLOYMENT_COLUMNS
+
+    deployments = pagination.list_items(client.deployments.list,
+                                        all_pages,
+                                        sort=sort_by,
+                                        is_descending=descending,
+                                        filter_rules=filter_rules,
+                                        filter_id=filter_id,
+                                        _all_tenants=all_tenants,
+                                        _search=search,
+                                        _offset=pagination_offset,
+                                        _size=pagination_size,
+                                        _group_id=group_id,
+                                        blueprint_id=blueprint_id,
+                                        _search_name=search_name,
+                                        _dependencies_of=dependencies_of,
+                                        _include=columns)
+    rows = pagination.map_items(serialize_labels, deployments)
     total = deployments.metadata.pagination.total
-
-    if ctx.command.name == 'status-list':
-        columns = DEPLOYMENT_STATUS_LIST_COLUMNS
-    elif get_global_extended_view() or get_global_json_output():
-        columns = EXTENDED_DEPLOYMENT_COLUMNS
-    else:
-        columns = DEPLOYMENT_COLUMNS
-    print_data(columns, deployments, 'Deployments:')
+    print_data(columns, rows, 'Deployments:')
 
     filtered = None
     if filter_rules or filter_id:
         filtered = deployments.metadata.get('filtered')
     if filtered:
         logger.info('Showing %d of %d deployments (%d hidden by filter)',
-                    len(deployments), total, filtered)
+                    len(rows), total, filtered)
     else:
-        logger.info('Showing %d of %d deployments', len(deployments), total)
+        logger.info('Showing %d of %d deployments', len(rows), total)
 
 
 # to have identical behaviour for both list and status-list, apply the same
@@ -295,6 +304,8 @@ deployments_list_decorators = [
     cfy.options.dependencies_of,
     cfy.options.pagination_offset,
     cfy.options.pagination_size,
+    cfy.options.all_pages,
+    cfy.options.columns,
     cfy.options.common_options,
     cfy.assert_manager_active(),
     cfy.pass_client(),
@@ -882,33 +893,32 @@ def manager_set_visibility(deployment_id, visibility, logger, client):
                          example='deployment with the same blueprint ID',
                          fields='|'.join(DEPLOYMENTS_SUMMARY_FIELDS)))
 @cfy.argument('target_field', type=cfy.SummaryArgs(DEPLOYMENTS_SUMMARY_FIELDS))
-@cfy.argument('sub_field', type=cfy.SummaryArgs(DEPLOYMENTS_SUMMARY_FIELDS),
-              default=None, required=False)
+@cfy.argument('sub_fields', type=cfy.SummaryArgs(DEPLOYMENTS_SUMMARY_FIELDS),
+              nargs=-1)
 @cfy.options.common_options
 @cfy.options.tenant_name(required=False, resource_name_for_help='summary')
 @cfy.options.group_id_filter
 @cfy.options.all_tenants
+@cfy.options.per_tenant
+@cfy.options.percentages
 @cfy.pass_logger
 @cfy.pass_client()
-def summary(target_field, sub_field, group_id, logger, client, tenant_name,
-            all_tenants):
+def summary(target_field, sub_fields, group_id, logger, client, tenant_name,
+            all_tenants, per_tenant, percentages):
     utils.explicit_tenant_name_message(tenant_name, logger)
     logger.info('Retrieving summary of deployments on field %s', target_field)
 
-    summary = client.summary.deployments.get(
-        _target_field=target_field,
-        _sub_field=sub_field,
+    columns, items = summarize(
+        client,
+        'deployments',
+        (target_field,) + sub_fields,
+        per_tenant=per_tenant,
+        percentages=percentages,
+        logger=logger,
         _all_tenants=all_tenants,
         deployment_group_id=group_id,
     )
 
-    columns, items = structure_summary_results(
-        summary.items,
-        target_field,
-        sub_field,
-        'deployments',
-    )
-
     print_data(
         columns,
         items,
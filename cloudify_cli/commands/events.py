@@ -14,23 +14,36 @@
 # limitations under the License.
 ############
 
-from cloudify_rest_client.exceptions import CloudifyClientError
+import os
 
-from cloudify import logs
+from cloudify_rest_client.exceptions import CloudifyClientError
 
 import click
 
 from cloudify_cli import utils
-from cloudify_cli.cli import cfy
+from cloudify_cli.cli import cfy, helptexts
 from cloudify_cli.logger import get_events_logger
 from cloudify_cli.exceptions import (
     CloudifyCliError,
     SuppressedCloudifyCliError)
+from cloudify_cli.events_cache import get_events_cache
+from cloudify_cli.events_export import (
+    COMPRESSIONS,
+    EXPORT_PARALLEL,
+    EventsExporter,
+    EventsOutput,
+    TextEventsFormat,
+    load_checkpoint,
+    new_checkpoint,
+    resume_offset,
+)
 from cloudify_cli.execution_events_fetcher import (
     ExecutionEventsFetcher,
     wait_for_execution,
     wait_for_execution_group)
 
+CHECKPOINT_SUFFIX = '.checkpoint'
+
 
 @cfy.group(name='events')
 @cfy.options.common_options
@@ -155,6 +168,8 @@ def list(execution_id,
     try:
         execution_events = ExecutionEventsFetcher(
             client,
+            execution=wait_for_record,
+            events_cache=get_events_cache(),
             include_logs=include_logs,
             from_datetime=from_datetime,
             to_datetime=to_datetime,
@@ -166,14 +181,25 @@ def list(execution_id,
         events_logger = get_events_logger(json_output, with_worker_names)
 
         if tail:
-            execution = wait_for_method(
+            from cloudify_cli.async_commands.events import tail_events
+            execution = tail_events(
                 client,
                 wait_for_record,
-                events_handler=events_logger,
+                events_logger,
                 include_logs=include_logs,
-                timeout=None,  # don't timeout ever
                 from_datetime=from_datetime,
+                **execution_selection
             )
+            if execution is None:
+                # the manager can't stream events, so poll for them
+                execution = wait_for_method(
+                    client,
+                    wait_for_record,
+                    events_handler=events_logger,
+                    include_logs=include_logs,
+                    timeout=None,  # don't timeout ever
+                    from_datetime=from_datetime,
+                )
             if hasattr(execution, 'error') and execution.error:
                 logger.info(
                     'Execution of workflow %s for deployment %s failed. '
@@ -262,32 +288,16 @@ def delete(deployment_id, include_logs, logger, client, tenant_name,
         exec_list = client.executions.list(deployment_id=deployment_id,
                                            include_system_workflows=True,
                                            _all_tenants=True)
-        with open(output_path, 'w') as output_file:
-            click.echo(
-                'Events for deployment id {0} [{1}]'.format(
-                    deployment_id, filter_description),
-                file=output_file,
-                nl=True)
-            events_logger = DeletedEventsLogger(output_file)
-            for execution in exec_list:
-                execution_events = ExecutionEventsFetcher(
-                    client,
-                    execution_id=execution.id,
-                    include_logs=include_logs,
-                    from_datetime=from_datetime,
-                    to_datetime=to_datetime)
-                output_file = open(output_path, 'a') if output_path else None
-                click.echo(
-                    '\nListing events for execution id {0}\n'.format(
-                        execution.id),
-                    file=output_file,
-                    nl=True)
-                total_events = execution_events.fetch_and_process_events(
-                    events_handler=events_logger.log)
-                click.echo(
-                    '\nListed {0} events'.format(total_events),
-                    file=output_file,
-                    nl=True)
+        with EventsOutput(output_path) as output:
+            output.write('Events for deployment id {0} [{1}]\n'.format(
+                deployment_id, filter_description))
+            exporter = EventsExporter(
+                client, output, events_format=TextEventsFormat())
+            exporter.export(new_checkpoint(
+                [execution.id for execution in exec_list],
+                {'include_logs': include_logs,
+                 'from_datetime': from_datetime,
+                 'to_datetime': to_datetime}))
 
     # Delete events
     delete_args = {}
@@ -298,12 +308,171 @@ def delete(deployment_id, include_logs, logger, client, tenant_name,
         from_datetime=from_datetime, to_datetime=to_datetime,
         **delete_args)
     deleted_events_count = deleted_events_count.items[0]
+    events_cache = get_events_cache()
+    if events_cache:
+        events_cache.remove(deployment_id=deployment_id)
     if deleted_events_count:
         logger.info('\nDeleted {0} events'.format(deleted_events_count))
     else:
         logger.info('\nNo events to delete')
 
 
+@events.command(name='export',
+                short_help='Export events to a compressed file '
+                           '[manager only]')
+@click.argument('output-path', type=click.Path(dir_okay=False))
+@cfy.options.deployment_id(required=False)
+@click.option('-e', '--execution-id', 'execution_ids',
+              multiple=True,
+              cls=cfy.MutuallyExclusiveOption,
+              mutually_exclusive=['deployment_id', 'workflow_id'],
+              help=helptexts.EVENTS_EXPORT_EXECUTION_ID)
+@click.option('-w', '--workflow-id',
+              help=helptexts.EVENTS_EXPORT_WORKFLOW_ID)
+@cfy.options.include_logs
+@cfy.options.from_datetime(
+    required=False,
+    help="Export events that occurred at this timestamp or after")
+@cfy.options.to_datetime(
+    required=False,
+    mutually_exclusive_with=['before'],
+    help="Export events that occurred at this timestamp or before")
+@cfy.options.before(
+    required=False,
+    mutually_exclusive_with=['to_datetime'],
+    help="Export events that occurred this long ago or earlier")
+@click.option('--compression',
+              type=click.Choice(COMPRESSIONS),
+              default='gzip',
+              show_default=True,
+              help=helptexts.EVENTS_EXPORT_COMPRESSION)
+@click.option('--parallel',
+              type=click.IntRange(min=1),
+              default=EXPORT_PARALLEL,
+              show_default=True,
+              help=helptexts.EVENTS_EXPORT_PARALLEL)
+@click.option('--checkpoint', 'checkpoint_path',
+              type=click.Path(dir_okay=False),
+              help=helptexts.EVENTS_EXPORT_CHECKPOINT)
+@cfy.options.common_options
+@cfy.options.tenant_name(required=False, resource_name_for_help='execution')
+@cfy.pass_client()
+@cfy.pass_logger
+def export(output_path,
+           deployment_id,
+           execution_ids,
+           workflow_id,
+           include_logs,
+           from_datetime,
+           to_datetime,
+           before,
+           compression,
+           parallel,
+           checkpoint_path,
+           tenant_name,
+           client,
+           logger):
+    """Export the events of many executions to a file
+
+    `OUTPUT_PATH` is the file to write the events to, one JSON object per
+    line. The events of all the executions are exported, unless they're
+    selected by deployment, workflow, or execution IDs.
+
+    If the export is interrupted, run the same command again to resume it.
+    """
+    if before:
+        to_datetime = before
+    checkpoint_path = checkpoint_path or output_path + CHECKPOINT_SUFFIX
+
+    utils.explicit_tenant_name_message(tenant_name, logger)
+    checkpoint = load_checkpoint(checkpoint_path)
+    if checkpoint:
+        # resume with the executions and filters that the export began with
+        logger.info('Resuming the export to %s, after %s events',
+                    output_path, checkpoint['events'])
+        offset = resume_offset(checkpoint)
+        compression = checkpoint['compression']
+    else:
+        if os.path.exists(output_path):
+            raise CloudifyCliError(
+                '{0} already exists'.format(output_path))
+        if not execution_ids:
+            selection = {}
+            if deployment_id:
+                selection['deployment_id'] = deployment_id
+            if workflow_id:
+                selection['workflow_id'] = workflow_id
+            execution_ids = [execution.id for execution in
+                             client.executions.list(
+                                 _include=['id'],
+                                 include_system_workflows=True,
+                                 sort='created_at',
+                                 _get_all_results=True,
+                                 **selection)]
+        checkpoint = new_checkpoint(
+            execution_ids,
+            {'include_logs': include_logs,
+             'from_datetime': from_datetime,
+             'to_datetime': to_datetime},
+            compression)
+        offset = None
+        logger.info('Exporting the events of %s executions to %s [%s]',
+                    len(execution_ids), output_path,
+                    _filter_description(include_logs, from_datetime,
+                                        to_datetime))
+
+    with EventsOutput(output_path, compression, offset) as output:
+        exporter = EventsExporter(client, output,
+                                  parallel=parallel,
+                                  checkpoint_path=checkpoint_path,
+                                  logger=logger)
+        events_count = exporter.export(checkpoint)
+    logger.info('Exported %s events to %s', events_count, output_path)
+
+
+@events.group(name='cache')
+@cfy.options.common_options
+def cache():
+    """Handle the local cache of the events of ended executions
+    """
+    pass
+
+
+@cache.command(name='prune',
+               short_help='Evict events from the local cache')
+@click.option('--max-size',
+              type=click.IntRange(min=0),
+              help=helptexts.EVENTS_CACHE_MAX_SIZE)
+@click.option('--all', 'prune_all',
+              is_flag=True,
+              default=False,
+              cls=cfy.MutuallyExclusiveOption,
+              mutually_exclusive=['max_size'],
+              help=helptexts.EVENTS_CACHE_PRUNE_ALL)
+@cfy.options.common_options
+@cfy.pass_logger
+def prune(max_size, prune_all, logger):
+    """Evict the least recently used events from the local cache
+
+    The events of ended executions are cached when they're listed, up to
+    a size limit. Use this to free up some of that space.
+    """
+    events_cache = get_events_cache()
+    if events_cache is None:
+        logger.info('No events are cached')
+        return
+    if prune_all:
+        events_cache.remove()
+        logger.info('Removed all the cached events')
+    else:
+        if max_size is not None:
+            max_size *= 1024 * 1024
+        evicted, freed = events_cache.prune(max_size)
+        logger.info('Evicted the events of %s executions (%s MB)',
+                    evicted, freed // (1024 * 1024))
+    events_cache.vacuum()
+
+
 def _filter_description(include_logs, from_datetime, to_datetime):
     filter_info = {'include_logs': u'{0}'.format(include_logs)}
     if from_datetime:
@@ -312,19 +481,3 @@ def _filter_description(include_logs, from_datetime, to_datetime):
         filter_info['to_datetime'] = u'{0}'.format(to_datetime)
     return u', '.join(u'{0}={1}'.format(k, v) for k, v in
                       filter_info.items())
-
-
-class DeletedEventsLogger(object):
-    def __init__(self, output_file=None):
-        self._output_file = output_file
-
-    def log(self, events):
-        """The default events logger prints events as short messages.
-
-        :param events: The events to print.
-        :return:
-        """
-        for event in events:
-            output = logs.create_event_message_prefix(event)
-            if output:
-                click.echo(output, file=self._output_file)
@@ -20,7 +20,7 @@ import time
 import click
 from cloudify_rest_client import exceptions
 
-from cloudify_cli import local, utils
+from cloudify_cli import local, pagination, utils
 from cloudify_cli.cli import cfy, helptexts
 from cloudify_cli.constants import (
     DEFAULT_UNINSTALL_WORKFLOW,
@@ -29,6 +29,7 @@ from cloudify_cli.exceptions import (
     CloudifyCliError,
     ExecutionTimeoutError,
     SuppressedCloudifyCliError)
+from cloudify_cli.events_cache import get_events_cache
 from cloudify_cli.execution_events_fetcher import (
     ExecutionEventsFetcher,
     wait_for_execution,
@@ -42,7 +43,7 @@ from cloudify_cli.utils import get_deployment_environment_execution
 
 from cloudify_cli.commands.summary import (
     BASE_SUMMARY_FIELDS,
-    structure_summary_results)
+    summarize)
 
 _STATUS_CANCELING_MESSAGE = (
     'NOTE: Executions currently in a "canceling/force-canceling" status '
@@ -120,6 +121,8 @@ def manager_get(execution_id, logger, client, tenant_name):
 @cfy.options.all_tenants
 @cfy.options.pagination_offset
 @cfy.options.pagination_size
+@cfy.options.all_pages
+@cfy.options.columns
 @cfy.options.common_options
 @cfy.assert_manager_active()
 @cfy.pass_client()
@@ -133,6 +136,8 @@ def manager_list(
         all_tenants,
         pagination_offset,
         pagination_size,
+        all_pages,
+        columns,
         logger,
         client,
         tenant_name):
@@ -142,13 +147,16 @@ def manager_list(
     Otherwise, list executions for all deployments.
     """
     utils.explicit_tenant_name_message(tenant_name, logger)
+    columns = columns or MINIMAL_EXECUTION_COLUMNS
     try:
         if deployment_id:
             logger.info('Listing executions for deployment {0}...'.format(
                 deployment_id))
         else:
             logger.info('Listing all executions...')
-        executions = client.executions.list(
+        executions = pagination.list_items(
+            client.executions.list,
+            all_pages,
             deployment_id=deployment_id,
             include_system_workflows=include_system_workflows,
             sort=sort_by,
@@ -156,7 +164,7 @@ def manager_list(
             _all_tenants=all_tenants,
             _offset=pagination_offset,
             _size=pagination_size,
-            _include=MINIMAL_EXECUTION_COLUMNS,
+            _include=columns,
         )
 
     except exceptions.CloudifyClientError as e:
@@ -165,14 +173,21 @@ def manager_list(
         raise CloudifyCliError('Deployment {0} does not exist'.format(
             deployment_id))
 
-    print_data(MINIMAL_EXECUTION_COLUMNS, executions, 'Executions:',
+    cancelling = []
+
+    def _check_cancelling(execution):
+        if execution.status in (
+                execution.CANCELLING, execution.FORCE_CANCELLING):
+            cancelling.append(execution.id)
+        return execution
+
+    rows = pagination.map_items(_check_cancelling, executions)
+    print_data(columns, rows, 'Executions:',
                labels=EXECUTION_TABLE_LABELS)
     total = executions.metadata.pagination.total
-    logger.info('Showing {0} of {1} executions'.format(len(executions), total))
+    logger.info('Showing {0} of {1} executions'.format(len(rows), total))
 
-    if any(execution.status in (
-            execution.CANCELLING, execution.FORCE_CANCELLING)
-            for execution in executions):
+    if cancelling:
         logger.info(_STATUS_CANCELING_MESSAGE)
 
 
@@ -400,34 +415,33 @@ def manager_resume(execution_id, reset_operations, logger, client,
                         example='execution with the same deployment ID',
                         fields='|'.join(EXECUTIONS_SUMMARY_FIELDS)))
 @cfy.argument('target_field', type=cfy.SummaryArgs(EXECUTIONS_SUMMARY_FIELDS))
-@cfy.argument('sub_field', type=cfy.SummaryArgs(EXECUTIONS_SUMMARY_FIELDS),
-              default=None, required=False)
+@cfy.argument('sub_fields', type=cfy.SummaryArgs(EXECUTIONS_SUMMARY_FIELDS),
+              nargs=-1)
 @cfy.options.common_options
 @cfy.options.tenant_name(required=False, resource_name_for_help='summary')
 @cfy.options.group_id_filter
 @cfy.options.all_tenants
+@cfy.options.per_tenant
+@cfy.options.percentages
 @cfy.pass_logger
 @cfy.pass_client()
-def summary(target_field, sub_field, group_id, logger, client, tenant_name,
-            all_tenants):
+def summary(target_field, sub_fields, group_id, logger, client, tenant_name,
+            all_tenants, per_tenant, percentages):
     utils.explicit_tenant_name_message(tenant_name, logger)
     logger.info('Retrieving summary of executions on field {field}'.format(
         field=target_field))
 
-    summary = client.summary.executions.get(
-        _target_field=target_field,
-        _sub_field=sub_field,
+    columns, items = summarize(
+        client,
+        'executions',
+        (target_field,) + sub_fields,
+        per_tenant=per_tenant,
+        percentages=percentages,
+        logger=logger,
         _all_tenants=all_tenants,
         execution_group_id=group_id,
     )
 
-    columns, items = structure_summary_results(
-        summary.items,
-        target_field,
-        sub_field,
-        'executions',
-    )
-
     print_data(
         columns,
         items,
@@ -608,14 +622,21 @@ def execution_groups_details(execution_group_id, client, logger):
                  'Execution group {0}:'.format(execution_group_id))
 
     # Let's find out the total number of events
-    events = client.events.list(
-        execution_group_id=execution_group_id,
-        include_logs=True, _size=1)
+    events_cache = get_events_cache()
+    list_kwargs = {'execution_group_id': execution_group_id,
+                   'include_logs': True}
+    events = None
+    if events_cache:
+        events = events_cache.get_events(
+            group, list_kwargs, offset=0, size=1)
+    if events is None:
+        events = client.events.list(_size=1, **list_kwargs)
     events_total = events.metadata.get('pagination', {}).get('total')
     execution_events = ExecutionEventsFetcher(
             client,
-            include_logs=True,
-            execution_group_id=execution_group_id
+            execution=group,
+            events_cache=events_cache,
+            **list_kwargs
     )
     events_logger = get_events_logger(json_output=False)
     pagination_size = 10 if events_total >= 10 else events_total
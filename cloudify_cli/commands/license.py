@@ -3,6 +3,7 @@ import os
 from cloudify_cli.cli import cfy
 from cloudify_cli.logger import output
 from cloudify_cli.table import print_data
+from cloudify_cli.metadata_cache import clear_metadata_cache
 from cloudify_cli.exceptions import CloudifyValidationError
 
 LICENSE_COLUMN = ['customer_id', 'expiration_date', 'license_edition', 'trial',
@@ -65,6 +66,7 @@ def upload(logger, client, license_path):
                                       'following path: `{0}`'.
                                       format(license_path))
     client.license.upload(license_path)
+    clear_metadata_cache()
     logger.info('Cloudify license successfully uploaded.')
 
 
@@ -78,6 +80,7 @@ def upload(logger, client, license_path):
 def remove(logger, client):
     logger.info('Removing Cloudify License from the Manager...')
     client.license.delete()
+    clear_metadata_cache()
     logger.info('Cloudify license successfully removed.')
 
 
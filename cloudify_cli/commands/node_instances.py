@@ -18,7 +18,7 @@ import json
 
 from cloudify_rest_client.exceptions import CloudifyClientError
 
-from cloudify_cli import utils
+from cloudify_cli import pagination, utils
 from cloudify_cli.cli import cfy, helptexts
 from cloudify_cli.exceptions import CloudifyCliError
 from cloudify_cli.local import load_env
@@ -27,7 +27,7 @@ from cloudify_cli.table import print_data, print_details, print_single
 from cloudify_cli.utils import deep_update_dict, deep_subtract_dict
 from cloudify_cli.commands.summary import (
     BASE_SUMMARY_FIELDS,
-    structure_summary_results)
+    summarize)
 
 
 NODE_INSTANCE_COLUMNS = ['id', 'deployment_id', 'host_id', 'node_id', 'state',
@@ -95,6 +95,8 @@ def get(node_instance_id, evaluate_functions, logger, client, tenant_name):
 @cfy.options.search
 @cfy.options.pagination_offset
 @cfy.options.pagination_size
+@cfy.options.all_pages
+@cfy.options.columns
 @cfy.options.common_options
 @cfy.pass_logger
 @cfy.pass_client()
@@ -107,6 +109,8 @@ def list(deployment_id,
          search,
          pagination_offset,
          pagination_size,
+         all_pages,
+         columns,
          logger,
          client,
          tenant_name):
@@ -116,13 +120,16 @@ def list(deployment_id,
     Otherwise, list node-instances for all deployments.
     """
     utils.explicit_tenant_name_message(tenant_name, logger)
+    columns = columns or NODE_INSTANCE_COLUMNS
     try:
         if deployment_id:
             logger.info('Listing instances for deployment {0}...'.format(
                 deployment_id))
         else:
             logger.info('Listing all instances...')
-        node_instances = client.node_instances.list(
+        node_instances = pagination.list_items(
+            client.node_instances.list,
+            all_pages,
             deployment_id=deployment_id,
             node_name=node_name,
             sort=sort_by,
@@ -130,14 +137,15 @@ def list(deployment_id,
             _all_tenants=all_tenants,
             _search=search,
             _offset=pagination_offset,
-            _size=pagination_size)
+            _size=pagination_size,
+            _include=columns)
     except CloudifyClientError as e:
         if e.status_code != 404:
             raise
         raise CloudifyCliError('Deployment {0} does not exist'.format(
             deployment_id))
 
-    print_data(NODE_INSTANCE_COLUMNS, node_instances, 'Node-instances:')
+    print_data(columns, node_instances, 'Node-instances:')
     total = node_instances.metadata.pagination.total
     logger.info('Showing {0} of {1} node-instances'
                 .format(len(node_instances), total))
@@ -153,16 +161,18 @@ def list(deployment_id,
                             fields='|'.join(NODE_INSTANCES_SUMMARY_FIELDS)))
 @cfy.argument('target_field',
               type=cfy.SummaryArgs(NODE_INSTANCES_SUMMARY_FIELDS))
-@cfy.argument('sub_field',
+@cfy.argument('sub_fields',
               type=cfy.SummaryArgs(NODE_INSTANCES_SUMMARY_FIELDS),
-              default=None, required=False)
+              nargs=-1)
 @cfy.options.common_options
 @cfy.options.tenant_name(required=False, resource_name_for_help='summary')
 @cfy.options.all_tenants
+@cfy.options.per_tenant
+@cfy.options.percentages
 @cfy.pass_logger
 @cfy.pass_client()
-def summary(target_field, sub_field, logger, client, tenant_name,
-            all_tenants):
+def summary(target_field, sub_fields, logger, client, tenant_name, all_tenants,
+            per_tenant, percentages):
     utils.explicit_tenant_name_message(tenant_name, logger)
     logger.info(
         'Retrieving summary of node instances on field {field}'.format(
@@ -170,17 +180,14 @@ def summary(target_field, sub_field, logger, client, tenant_name,
         )
     )
 
-    summary = client.summary.node_instances.get(
-        _target_field=target_field,
-        _sub_field=sub_field,
-        _all_tenants=all_tenants,
-    )
-
-    columns, items = structure_summary_results(
-        summary.items,
-        target_field,
-        sub_field,
+    columns, items = summarize(
+        client,
         'node_instances',
+        (target_field,) + sub_fields,
+        per_tenant=per_tenant,
+        percentages=percentages,
+        logger=logger,
+        _all_tenants=all_tenants,
     )
 
     print_data(
@@ -28,7 +28,7 @@ from cloudify_cli.logger import (
 from cloudify_cli.table import print_data, print_single, print_details
 from cloudify_cli.commands.summary import (
     BASE_SUMMARY_FIELDS,
-    structure_summary_results)
+    summarize)
 from cloudify_cli.execution_events_fetcher import wait_for_execution
 
 NODE_COLUMNS = ['id', 'deployment_id', 'blueprint_id', 'host_id', 'type',
@@ -168,6 +168,7 @@ def _run_node_checks(deployment_id, logger, client):
 @cfy.options.search
 @cfy.options.pagination_offset
 @cfy.options.pagination_size
+@cfy.options.columns
 @cfy.options.common_options
 @cfy.options.evaluate_functions
 @cfy.pass_logger
@@ -183,6 +184,7 @@ def nodes_list(
     search,
     pagination_offset,
     pagination_size,
+    columns,
     evaluate_functions,
     logger,
     client
@@ -198,6 +200,13 @@ def nodes_list(
             raise CloudifyCliError(
                 "deployment_id is required when --run-checks is set")
         _run_node_checks(deployment_id, logger, client)
+    if not columns:
+        columns = list(NODE_COLUMNS)
+        if (
+            (get_global_json_output() or get_global_extended_view())
+            and deployment_id
+        ):
+            columns = columns + ['drifted_instances', 'unavailable_instances']
     try:
         if deployment_id:
             logger.info('Listing nodes for deployment %s...', deployment_id)
@@ -215,6 +224,7 @@ def nodes_list(
             _offset=pagination_offset,
             _size=pagination_size,
             _instance_counts=instance_counts,
+            _include=columns,
         )
     except CloudifyClientError as e:
         if e.status_code != 404:
@@ -222,12 +232,6 @@ def nodes_list(
         raise CloudifyCliError('Deployment {0} does not exist'.format(
             deployment_id))
 
-    columns = list(NODE_COLUMNS)
-    if (
-        (get_global_json_output() or get_global_extended_view())
-        and deployment_id
-    ):
-        columns = columns + ['drifted_instances', 'unavailable_instances']
     print_data(columns, nodes, 'Nodes:', labels=NODE_TABLE_LABELS)
     total = nodes.metadata.pagination.total
     logger.info('Showing %d of %d nodes', len(nodes), total)
@@ -240,29 +244,29 @@ def nodes_list(
                    example='node with the same deployment ID',
                    fields='|'.join(NODES_SUMMARY_FIELDS)))
 @cfy.argument('target_field', type=cfy.SummaryArgs(NODES_SUMMARY_FIELDS))
-@cfy.argument('sub_field', type=cfy.SummaryArgs(NODES_SUMMARY_FIELDS),
-              default=None, required=False)
+@cfy.argument('sub_fields', type=cfy.SummaryArgs(NODES_SUMMARY_FIELDS),
+              nargs=-1)
 @cfy.options.common_options
 @cfy.options.tenant_name(required=False, resource_name_for_help='summary')
 @cfy.options.all_tenants
+@cfy.options.per_tenant
+@cfy.options.percentages
 @cfy.pass_logger
 @cfy.pass_client()
-def summary(target_field, sub_field, logger, client, tenant_name, all_tenants):
+def summary(target_field, sub_fields, logger, client, tenant_name, all_tenants,
+            per_tenant, percentages):
     utils.explicit_tenant_name_message(tenant_name, logger)
     logger.info('Retrieving summary of nodes on field {field}'.format(
         field=target_field))
 
-    summary = client.summary.nodes.get(
-        _target_field=target_field,
-        _sub_field=sub_field,
-        _all_tenants=all_tenants,
-    )
-
-    columns, items = structure_summary_results(
-        summary.items,
-        target_field,
-        sub_field,
+    columns, items = summarize(
+        client,
         'nodes',
+        (target_field,) + sub_fields,
+        per_tenant=per_tenant,
+        percentages=percentages,
+        logger=logger,
+        _all_tenants=all_tenants,
     )
 
     print_data(
@@ -262,6 +262,14 @@ def _format_installation_state(plugin):
     return ', '.join(parts)
 
 
+def _plugin_fields(columns):
+    """The fields of the plugins to fetch, for showing columns"""
+    fields = [col for col in columns if col != 'installed on']
+    if 'installed on' in columns and 'installation_state' not in fields:
+        fields.append('installation_state')
+    return fields
+
+
 @plugins.command(name='get',
                  short_help='Retrieve plugin information [manager only]')
 @cfy.argument('plugin-id')
@@ -312,6 +320,7 @@ def get(plugin_id, logger, client, tenant_name, get_data):
 @cfy.options.get_data
 @cfy.options.pagination_offset
 @cfy.options.pagination_size
+@cfy.options.columns
 @cfy.assert_manager_active()
 @cfy.pass_client()
 @cfy.pass_logger
@@ -323,6 +332,7 @@ def list(sort_by,
          search,
          pagination_offset,
          pagination_size,
+         columns,
          logger,
          client,
          get_data):
@@ -330,19 +340,21 @@ def list(sort_by,
     """
     utils.explicit_tenant_name_message(tenant_name, logger)
     logger.info('Listing all plugins...')
+    if not columns:
+        columns = PLUGIN_COLUMNS + GET_DATA_COLUMNS if get_data \
+            else PLUGIN_COLUMNS
+        if get_global_json_output():
+            columns += ['installation_state']
     plugins_list = client.plugins.list(sort=sort_by,
                                        is_descending=descending,
                                        _all_tenants=all_tenants,
                                        _search=search,
                                        _get_data=get_data,
                                        _offset=pagination_offset,
-                                       _size=pagination_size)
+                                       _size=pagination_size,
+                                       _include=_plugin_fields(columns))
     for plugin in plugins_list:
         plugin['installed on'] = _format_installation_state(plugin)
-    columns = PLUGIN_COLUMNS + GET_DATA_COLUMNS if get_data else PLUGIN_COLUMNS
-
-    if get_global_json_output():
-        columns += ['installation_state']
 
     print_data(columns, plugins_list, 'Plugins:')
     total = plugins_list.metadata.pagination.total
@@ -107,9 +107,8 @@ def profiles_list(logger):
     current_profile = env.get_active_profile()
 
     profiles = []
-    profile_names = env.get_profile_names()
-    for profile in profile_names:
-        profile_data = _get_profile(profile)
+    for profile, profile_data in env.get_profiles_summary(
+            PROFILE_COLUMNS).items():
         if profile == current_profile:
             # Show the currently active profile by appending *
             profile_data['name'] = '*' + profile_data['name']
@@ -119,7 +118,7 @@ def profiles_list(logger):
         logger.info('Listing all profiles...')
         print_data(PROFILE_COLUMNS, profiles, 'Profiles:')
 
-    if not profile_names:
+    if not profiles:
         logger.info(
             'No profiles found. You can create a new profile '
             'by using an existing manager via the `cfy profiles use` command')
@@ -342,6 +341,7 @@ def _set_profile_ssl(ssl, rest_port, logger):
 @cfy.options.rest_certificate
 @cfy.options.rest_port
 @cfy.options.kerberos_env
+@cfy.options.session_tokens
 @cfy.options.skip_credentials_validation
 @cfy.options.common_options
 @cfy.pass_logger
@@ -358,6 +358,7 @@ def set_cmd(profile_name,
             rest_certificate,
             rest_port,
             kerberos_env,
+            session_tokens,
             skip_credentials_validation,
             logger):
     """Set the profile name, manager username and/or password and/or tenant
@@ -366,11 +367,12 @@ def set_cmd(profile_name,
     if not any([profile_name, manager_ip, ssh_user, ssh_key, ssh_port,
                 manager_token, manager_username, manager_password,
                 manager_tenant, ssl is not None, rest_certificate,
-                kerberos_env is not None]):
+                kerberos_env is not None, session_tokens is not None]):
         raise CloudifyCliError(
             "You must supply at least one of the following:  "
             "profile name, username, password, token, tenant, "
-            "ssl, rest certificate, ssh user, ssh key, ssh port, kerberos env")
+            "ssl, rest certificate, ssh user, ssh key, ssh port, "
+            "kerberos env, session tokens")
     old_name = None
     if profile_name:
         if profile_name == 'local':
@@ -424,6 +426,9 @@ def set_cmd(profile_name,
         env.profile.manager_username = None
         env.profile.manager_password = None
         env.profile.manager_token = None
+    if session_tokens is not None:
+        logger.info('Setting session_tokens to `%s`', session_tokens)
+        env.profile.session_tokens = session_tokens
     if ssl is not None:
         _set_profile_ssl(ssl, rest_port, logger)
 
@@ -675,12 +680,7 @@ def _move_ssh_key(profile, logger, is_backup):
 
 
 def _get_profile(profile_name):
-    current_profile = env.get_active_profile()
-    env.set_active_profile(profile_name)
-    context = env.get_profile_context(profile_name)
-    env.set_active_profile(current_profile)
-
-    return context.to_dict()
+    return env.get_profile_context(profile_name).to_dict()
 
 
 def _assert_manager_available(client, profile_name):
@@ -4,7 +4,7 @@ import json
 import click
 from cloudify_rest_client.constants import VISIBILITY_EXCEPT_PRIVATE
 
-from cloudify_cli import env, utils
+from cloudify_cli import env, pagination, utils
 from cloudify_cli.cli import cfy
 from cloudify_cli.exceptions import CloudifyCliError
 from cloudify_cli.table import print_data, print_details
@@ -306,6 +306,7 @@ def update(key,
 @cfy.options.search
 @cfy.options.pagination_offset
 @cfy.options.pagination_size
+@cfy.options.all_pages
 @cfy.options.provider_multiple()
 @cfy.assert_manager_active()
 @cfy.pass_client()
@@ -319,6 +320,7 @@ def _list(
         search,
         pagination_offset,
         pagination_size,
+        all_pages,
         provider,
         logger,
         client,
@@ -339,7 +341,9 @@ def _list(
 
     utils.explicit_tenant_name_message(tenant_name, logger)
     logger.info('Listing all secrets...')
-    secrets_list = client.secrets.list(
+    secrets_list = pagination.list_items(
+        client.secrets.list,
+        all_pages,
         sort=sort_by,
         is_descending=descending,
         filter_rules=filter_rules,
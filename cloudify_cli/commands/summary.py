@@ -1,5 +1,12 @@
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+
+from cloudify_cli import env
 from cloudify_cli.logger import get_global_json_output
 
+# how many summaries are requested at the same time, in a pivot
+SUMMARY_WORKERS = 8
+PERCENT_COLUMN = 'percent'
 
 BASE_SUMMARY_FIELDS = [
     'tenant_name',
@@ -67,3 +74,143 @@ def structure_summary_results(results, target_field, sub_field,
         columns = [target_field, summary_type]
         structured_result = results
     return columns, structured_result
+
+
+def summarize(client, summary_type, fields, per_tenant=False,
+              percentages=False, logger=None, **kwargs):
+    """Summarize the resources of summary_type by fields.
+
+    By one or two fields, this is the manager's summary, with the totals
+    of the first field (see structure_summary_results). By more fields,
+    or per tenant, or with percentages, it's a pivot (see pivot_summary).
+
+    :param summary_type: eg. 'node_instances'
+    :param kwargs: the filters of the summary, eg. _all_tenants
+    :return: the columns, and the rows
+    """
+    if len(fields) <= 2 and not per_tenant and not percentages:
+        target_field = fields[0]
+        sub_field = fields[1] if len(fields) > 1 else None
+        summary = getattr(client.summary, summary_type).get(
+            _target_field=target_field,
+            _sub_field=sub_field,
+            **kwargs
+        )
+        return structure_summary_results(
+            summary.items, target_field, sub_field, summary_type)
+    return pivot_summary(client, summary_type, fields, per_tenant,
+                         percentages, logger, **kwargs)
+
+
+def pivot_summary(client, summary_type, fields, per_tenant=False,
+                  percentages=False, logger=None, **kwargs):
+    """Count the resources with each combination of the values of fields.
+
+    The manager counts by two fields at most, so the values of each of
+    the other fields are summarized first, and then the last two fields
+    are summarized for each combination of those values, filtered by it.
+    The summaries of each step are requested concurrently. Put the fields
+    with the fewest values first, for the fewest requests.
+
+    With per_tenant, each tenant is summarized separately, with a client
+    of that tenant, and the results are merged: the tenant is the first
+    column. This is for when the manager can't summarize all the tenants
+    at once, eg. when the user isn't allowed to list all the tenants'
+    resources together.
+
+    With percentages, each row also has its percentage of all the
+    resources counted.
+    """
+    fields = [field for field in fields
+              if not (per_tenant and field == 'tenant_name')]
+    columns = (['tenant_name'] if per_tenant else []) + fields
+    if per_tenant:
+        kwargs.pop('_all_tenants', None)
+        # when the tenant is the only field, each tenant counts itself
+        fields = fields or ['tenant_name']
+    pivot = _Pivot(summary_type, logger, kwargs)
+    with ThreadPoolExecutor(max_workers=SUMMARY_WORKERS) as executor:
+        if per_tenant:
+            queries = [
+                _Query(env.get_rest_client(tenant_name=tenant.name,
+                                           pooled=True),
+                       {}, {'tenant_name': tenant.name})
+                for tenant in client.tenants.list(
+                    _include=['name'], _get_all_results=True)
+            ]
+        else:
+            queries = [_Query(client, {}, {})]
+        for field in fields[:-2]:
+            queries = list(chain.from_iterable(executor.map(
+                lambda query: pivot.split(query, field), queries)))
+        rows = list(chain.from_iterable(executor.map(
+            lambda query: pivot.count(query, fields[-2:]), queries)))
+
+    columns.append(summary_type)
+    if percentages:
+        columns.append(PERCENT_COLUMN)
+        total = sum(row[summary_type] for row in rows)
+        for row in rows:
+            row[PERCENT_COLUMN] = \
+                round(100.0 * row[summary_type] / total, 1) if total else 0
+    return columns, rows
+
+
+class _Query(object):
+    """A summary to request: the client, filters, and the values so far"""
+    def __init__(self, client, filters, values):
+        self.client = client
+        self.filters = filters
+        self.values = values
+
+
+class _Pivot(object):
+    def __init__(self, summary_type, logger, kwargs):
+        self.summary_type = summary_type
+        self.logger = logger
+        self.kwargs = kwargs
+
+    def _get(self, query, target_field, sub_field=None):
+        summary_client = getattr(query.client.summary, self.summary_type)
+        params = dict(self.kwargs)
+        params.update(query.filters)
+        return summary_client.get(
+            _target_field=target_field, _sub_field=sub_field, **params)
+
+    def split(self, query, field):
+        """A query for each of the values of field, filtered by it"""
+        queries = []
+        for item in self._get(query, field):
+            value = item[field]
+            if value is None:
+                # the manager can't filter by a missing value
+                if self.logger:
+                    self.logger.warning(
+                        'Leaving out %d %s without %s',
+                        item[self.summary_type], self.summary_type, field)
+                continue
+            filters = dict(query.filters)
+            filters[field] = value
+            values = dict(query.values)
+            values[field] = value
+            queries.append(_Query(query.client, filters, values))
+        return queries
+
+    def count(self, query, fields):
+        """The rows of the counts by the (one or two) fields"""
+        target_field = fields[0]
+        sub_field = fields[1] if len(fields) > 1 else None
+        rows = []
+        for item in self._get(query, target_field, sub_field):
+            if sub_field:
+                sub_items = item['by ' + sub_field]
+            else:
+                sub_items = [item]
+            for sub_item in sub_items:
+                row = dict(query.values)
+                row[target_field] = item[target_field]
+                if sub_field:
+                    row[sub_field] = sub_item[sub_field]
+                row[self.summary_type] = sub_item[self.summary_type]
+                rows.append(row)
+        return rows
@@ -75,7 +75,7 @@ def manager(ctx,
 
     # before deleting the deployment, save its blueprint_id, so we will be able
     # to delete the blueprint after deleting the deployment
-    client = env.get_rest_client(tenant_name=tenant_name)
+    client = env.get_rest_client(tenant_name=tenant_name, pooled=True)
     deployment = client.deployments.get(
         deployment_id, _include=['blueprint_id'])
     blueprint_id = deployment.blueprint_id
@@ -14,7 +14,7 @@
 # limitations under the License.
 ############
 
-from cloudify_cli import env
+from cloudify_cli import env, pagination
 from cloudify_cli.cli import cfy
 from cloudify_cli.table import print_data, print_single
 from cloudify_cli.utils import handle_client_error
@@ -73,6 +73,7 @@ def users():
 @cfy.options.search
 @cfy.options.pagination_offset
 @cfy.options.pagination_size
+@cfy.options.all_pages
 @cfy.assert_manager_active()
 @cfy.pass_client()
 @cfy.pass_logger
@@ -83,12 +84,15 @@ def list(sort_by,
          search,
          pagination_offset,
          pagination_size,
+         all_pages,
          logger,
          client):
     """List all users
     """
     logger.info('Listing all users...')
-    users_list = client.users.list(
+    users_list = pagination.list_items(
+        client.users.list,
+        all_pages,
         sort=sort_by,
         is_descending=descending,
         _get_data=get_data,
@@ -99,9 +103,9 @@ def list(sort_by,
     total = users_list.metadata.pagination.total
     # copy list
     columns = [] + USER_COLUMNS
-    users_list = [_format_group_system_roles(user) for user in users_list]
+    users_list = pagination.map_items(_format_group_system_roles, users_list)
     if get_data:
-        users_list = [_format_user(user) for user in users_list]
+        users_list = pagination.map_items(_format_user, users_list)
         columns += GET_DATA_COLUMNS
     else:
         columns += NO_GET_DATA_COLUMNS
@@ -186,8 +190,7 @@ def set_role(username, security_role, logger, client):
 
 @users.command(name='get',
                short_help='Get details for a single user [manager only]')
-@cfy.argument(
-    'username', default=env.get_username())
+@cfy.argument('username', default=env.get_username)
 @cfy.options.common_options
 @cfy.options.get_data
 @cfy.assert_manager_active()
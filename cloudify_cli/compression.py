@@ -0,0 +1,189 @@
+"""Compress the REST requests and responses.
+
+The responses are compressed by the manager when the request asks for it,
+with the Accept-Encoding header: gzip, or zstd when the zstandard package
+is installed (urllib3 decompresses them both). Listing many deployments,
+node-instances or events is mostly JSON, which compresses very well.
+
+The JSON request bodies (eg. secrets, or deployment inputs) are only
+compressed when the manager said that it accepts compressed requests:
+the manager lists the encodings it accepts in the Accept-Encoding header
+of its responses (RFC 7694). Bodies which are already compressed, like
+blueprint archives, are sent as they are.
+
+The bytes sent and received are counted, and logged in debug output,
+so that the savings are visible.
+"""
+import gzip
+import threading
+from functools import wraps
+from urllib.parse import urlparse
+
+import requests
+from urllib3.util import make_headers
+
+from cloudify_cli.logger import get_logger
+
+# JSON bodies smaller than this (in bytes) aren't worth compressing
+COMPRESS_MIN_SIZE = 16 * 1024
+GZIP_LEVEL = 6
+
+# the encodings which urllib3 can decompress here
+ACCEPT_ENCODING = make_headers(accept_encoding=True)['accept-encoding']
+
+# the encodings of requests that each manager accepts, by its address
+_accepted_encodings = {}
+
+
+def _zstd_compressor():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard.ZstdCompressor().compress
+
+
+def _request_compressors():
+    """The encodings that requests can be compressed with, preferred first
+    """
+    compressors = []
+    zstd = _zstd_compressor()
+    if zstd is not None:
+        compressors.append(('zstd', zstd))
+    compressors.append(
+        ('gzip', lambda data: gzip.compress(data, compresslevel=GZIP_LEVEL)))
+    return compressors
+
+
+_compressors = _request_compressors()
+
+
+def _parse_encodings(header):
+    """The encodings in an Accept-Encoding header, except the q=0 ones"""
+    encodings = set()
+    for item in header.split(','):
+        encoding, _, params = item.partition(';')
+        quality = params.strip().lower()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                pass
+        encodings.add(encoding.strip().lower())
+    return encodings
+
+
+def _origin(url):
+    url = urlparse(url)
+    return url.scheme, url.netloc
+
+
+class ByteCounter(object):
+    """The size of the requests and responses, before and after
+    compression.
+    """
+    def __init__(self):
+        self.sent = 0
+        self.sent_uncompressed = 0
+        self.received = 0
+        self.received_uncompressed = 0
+        self._lock = threading.Lock()
+
+    def add(self, sent, sent_uncompressed, received, received_uncompressed):
+        with self._lock:
+            self.sent += sent
+            self.sent_uncompressed += sent_uncompressed
+            self.received += received
+            self.received_uncompressed += received_uncompressed
+
+    @property
+    def saved(self):
+        return (self.sent_uncompressed - self.sent +
+                self.received_uncompressed - self.received)
+
+
+_byte_counter = ByteCounter()
+
+
+def get_byte_counter():
+    """The bytes sent and received by this process"""
+    return _byte_counter
+
+
+class CompressionMixin(object):
+    """Ask for compressed responses, and compress large JSON requests."""
+    compress_min_size = COMPRESS_MIN_SIZE
+
+    def do_request(self, requests_method, uri, data=None, params=None,
+                   headers=None, **kwargs):
+        headers = dict(headers or {})
+        headers.setdefault('Accept-Encoding', ACCEPT_ENCODING)
+
+        @wraps(requests_method)
+        def send(request_url, data=None, headers=None, **kwargs):
+            headers = dict(headers or {})
+            sent_uncompressed = _size(data)
+            data = self._compress(request_url, data, headers)
+            response = requests_method(
+                request_url, data=data, headers=headers, **kwargs)
+            if isinstance(response, requests.Response):
+                self._learn_encodings(request_url, response)
+                self._count(_size(data), sent_uncompressed, response,
+                            kwargs.get('stream'))
+            return response
+
+        return super(CompressionMixin, self).do_request(
+            send, uri, data=data, params=params, headers=headers, **kwargs)
+
+    def _compress(self, request_url, data, headers):
+        if not isinstance(data, (str, bytes)) or \
+                len(data) < self.compress_min_size or \
+                'Content-Encoding' in headers or \
+                headers.get('Content-type') != 'application/json':
+            return data
+        accepted = _accepted_encodings.get(_origin(request_url), ())
+        for encoding, compress in _compressors:
+            if encoding in accepted:
+                if isinstance(data, str):
+                    data = data.encode('utf-8')
+                headers['Content-Encoding'] = encoding
+                return compress(data)
+        return data
+
+    def _learn_encodings(self, request_url, response):
+        accepted = response.headers.get('Accept-Encoding')
+        if accepted is not None:
+            _accepted_encodings[_origin(request_url)] = \
+                _parse_encodings(accepted)
+
+    def _count(self, sent, sent_uncompressed, response, stream):
+        received = received_uncompressed = 0
+        # a streamed response isn't read yet, so its size isn't known
+        if not stream:
+            received_uncompressed = len(response.content)
+            received = _wire_size(response, received_uncompressed)
+        _byte_counter.add(sent, sent_uncompressed, received,
+                          received_uncompressed)
+        get_logger().debug(
+            'Sent %s bytes (%s uncompressed), received %s bytes '
+            '(%s uncompressed); %s bytes saved by compression so far',
+            sent, sent_uncompressed, received, received_uncompressed,
+            _byte_counter.saved)
+
+
+def _size(data):
+    if isinstance(data, str):
+        return len(data.encode('utf-8'))
+    if isinstance(data, bytes):
+        return len(data)
+    return 0
+
+
+def _wire_size(response, default):
+    """The size of the response body, as it was received"""
+    try:
+        received = response.raw.tell()
+    except AttributeError:
+        return default
+    return received if isinstance(received, int) else default
@@ -16,20 +16,25 @@
 
 
 import os
-import yaml
 
-from dsl_parser import utils as dsl_parser_utils
-from dsl_parser.constants import IMPORT_RESOLVER_KEY
-from dsl_parser.import_resolver.default_import_resolver import (
-    DefaultImportResolver
-)
-
-from cloudify_cli import env, exceptions
+from cloudify_cli import env
 
 
 CLOUDIFY_CONFIG_PATH = os.path.join(env.CLOUDIFY_WORKDIR, 'config.yaml')
 
 
+def __getattr__(name):
+    # the resolver moved to import_resolver, so that importing this module
+    # doesn't import the dsl parser; config.yaml files may still name it
+    # as cloudify_cli.config.config:ResolverWithCatalogIdentification
+    if name == 'ResolverWithCatalogIdentification':
+        from cloudify_cli.config.import_resolver import \
+            ResolverWithCatalogIdentification
+        return ResolverWithCatalogIdentification
+    raise AttributeError(
+        'module {0!r} has no attribute {1!r}'.format(__name__, name))
+
+
 class CloudifyConfig(object):
 
     class Logging(object):
@@ -46,6 +51,7 @@ class CloudifyConfig(object):
             return self._logging.get('loggers', {})
 
     def __init__(self):
+        import yaml
         with open(CLOUDIFY_CONFIG_PATH) as f:
             self._config = yaml.safe_load(f.read())
 
@@ -67,6 +73,7 @@ class CloudifyConfig(object):
 
     @property
     def local_import_resolver(self):
+        from dsl_parser.constants import IMPORT_RESOLVER_KEY
         return self._config.get(IMPORT_RESOLVER_KEY, {})
 
     @property
@@ -91,9 +98,12 @@ def is_auto_generate_ids():
 
 
 def get_import_resolver():
+    # dsl_parser is slow to import, so it's only imported when the resolver
+    # is actually needed
+    from dsl_parser import utils as dsl_parser_utils
     local_import_resolver = {
-        'implementation':
-            'cloudify_cli.config.config:ResolverWithCatalogIdentification'
+        'implementation': 'cloudify_cli.config.import_resolver:'
+                          'ResolverWithCatalogIdentification'
     }
     if env.is_initialized():
         config = CloudifyConfig()
@@ -108,31 +118,3 @@ def is_validate_definitions_version():
         return True
     config = CloudifyConfig()
     return config.validate_definitions_version
-
-
-class ResolverWithCatalogIdentification(DefaultImportResolver):
-    """
-    All catalog resources (blueprints, plugin) can only be validated
-    in the manager not via the CLI, so this resolver only supports not
-    catalog-style urls.
-    """
-    CATALOG_RESOURCES_PREFIX = ('plugin:', 'blueprint:')
-
-    def fetch_import(self, import_url, **kwargs):
-        if self._is_cloudify_repository_url(import_url):
-            e = exceptions.CloudifyCliError(
-                'Error fetching remote resource yaml: {0!r}\nBlueprints using '
-                'Cloudify repository imports can not be validated locally.'
-                .format(import_url))
-            e.possible_solutions = [
-                'Upload the blueprint/plugin to the Cloudify Manager',
-                'In case of a missing plugin, use an explicit URL '
-                'to the plugin YAML file instead of a plugin '
-                'repository `plugin:` import'
-            ]
-            raise e
-        return super(ResolverWithCatalogIdentification, self)\
-            .fetch_import(import_url, **kwargs)
-
-    def _is_cloudify_repository_url(self, import_url):
-        return import_url.startswith(self.CATALOG_RESOURCES_PREFIX)
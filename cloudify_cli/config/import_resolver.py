@@ -0,0 +1,49 @@
+########
+# Copyright (c) 2018 Cloudify Platform Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+############
+
+from dsl_parser.import_resolver.default_import_resolver import (
+    DefaultImportResolver
+)
+
+from cloudify_cli import exceptions
+
+
+class ResolverWithCatalogIdentification(DefaultImportResolver):
+    """
+    All catalog resources (blueprints, plugin) can only be validated
+    in the manager not via the CLI, so this resolver only supports not
+    catalog-style urls.
+    """
+    CATALOG_RESOURCES_PREFIX = ('plugin:', 'blueprint:')
+
+    def fetch_import(self, import_url, **kwargs):
+        if self._is_cloudify_repository_url(import_url):
+            e = exceptions.CloudifyCliError(
+                'Error fetching remote resource yaml: {0!r}\nBlueprints using '
+                'Cloudify repository imports can not be validated locally.'
+                .format(import_url))
+            e.possible_solutions = [
+                'Upload the blueprint/plugin to the Cloudify Manager',
+                'In case of a missing plugin, use an explicit URL '
+                'to the plugin YAML file instead of a plugin '
+                'repository `plugin:` import'
+            ]
+            raise e
+        return super(ResolverWithCatalogIdentification, self)\
+            .fetch_import(import_url, **kwargs)
+
+    def _is_cloudify_repository_url(self, import_url):
+        return import_url.startswith(self.CATALOG_RESOURCES_PREFIX)
@@ -69,6 +69,9 @@ DEFAULT_TENANT_NAME = 'default_tenant'
 PUBLIC_REST_CERT = 'public_rest_cert.crt'
 LOCAL_REST_CERT_FILE = 'LOCAL_REST_CERT_FILE'
 CLOUDIFY_SSL_TRUST_ALL = 'CLOUDIFY_SSL_TRUST_ALL'
+CLOUDIFY_CLUSTER_FAILOVER = 'CLOUDIFY_CLUSTER_FAILOVER'
+CLOUDIFY_CLUSTER_SPOOL_MAX_SIZE = 'CLOUDIFY_CLUSTER_SPOOL_MAX_SIZE'
+CLOUDIFY_SESSION_TOKENS = 'CLOUDIFY_SESSION_TOKENS'
 
 SSL_ENABLED_PROPERTY_NAME = 'enabled'
 SSL_CERTIFICATE_PATH_PROPERTY_NAME = 'certificate_path'
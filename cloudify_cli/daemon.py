@@ -0,0 +1,378 @@
+"""The warm `cfy` daemon.
+
+Every `cfy` invocation pays for the interpreter startup and for importing
+the command modules, before doing anything useful. The daemon is a
+long-running process, started with `cfy daemon start`, which has all the
+commands already imported, and keeps the active profile parsed.
+
+When the daemon is running, `cfy` forwards its arguments, environment,
+working directory and standard streams to it over a unix socket. The
+daemon forks a child to run each invocation, so that invocations are
+isolated from each other just like separate processes would be, and the
+child writes directly to the caller's terminal. If the daemon isn't
+running, or is running a different version of the code, `cfy` just runs
+the command itself.
+"""
+import os
+import sys
+import json
+import time
+import errno
+import signal
+import socket
+import struct
+import traceback
+
+from cloudify_cli import env
+from cloudify_cli.exceptions import CloudifyCliError
+
+SOCKET_PATH = os.path.join(env.CLOUDIFY_WORKDIR, 'daemon.sock')
+LOG_PATH = os.path.join(env.CLOUDIFY_WORKDIR, 'logs', 'daemon.log')
+# set this env var to always run commands in-process
+DISABLE_ENV_VAR = 'CFY_NO_DAEMON'
+# commands that must never be forwarded to the daemon
+LOCAL_ONLY_COMMANDS = ['daemon']
+START_TIMEOUT = 10
+
+_HEADER = struct.Struct('!I')
+_STREAMS = 3
+
+
+def is_supported():
+    return (hasattr(socket, 'AF_UNIX') and hasattr(os, 'fork') and
+            hasattr(socket, 'send_fds'))
+
+
+def fingerprint():
+    """Identify the code that is running.
+
+    A daemon which was started with other code - eg. before the CLI was
+    upgraded - must not be used.
+    """
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    files = 0
+    latest = 0
+    for dirpath, _, filenames in os.walk(package_dir):
+        for filename in filenames:
+            if filename.endswith('.py'):
+                files += 1
+                latest = max(latest, os.path.getmtime(
+                    os.path.join(dirpath, filename)))
+    return '{0}:{1}:{2}:{3}'.format(
+        sys.executable, package_dir, files, latest)
+
+
+def _send_message(sock, message, fds=None):
+    data = json.dumps(message).encode('utf-8')
+    header = _HEADER.pack(len(data))
+    if fds:
+        socket.send_fds(sock, [header], fds)
+    else:
+        sock.sendall(header)
+    sock.sendall(data)
+
+
+def _recv_exactly(sock, size):
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise EOFError('Connection closed')
+        data += chunk
+    return data
+
+
+def _recv_message(sock, max_fds=0):
+    fds = []
+    if max_fds:
+        header, fds, _, _ = socket.recv_fds(sock, _HEADER.size, max_fds)
+        if not header:
+            raise EOFError('Connection closed')
+        header += _recv_exactly(sock, _HEADER.size - len(header))
+    else:
+        header = _recv_exactly(sock, _HEADER.size)
+    size, = _HEADER.unpack(header)
+    message = json.loads(_recv_exactly(sock, size).decode('utf-8'))
+    return (message, fds) if max_fds else message
+
+
+def _connect(timeout=None):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(SOCKET_PATH)
+    except Exception:
+        sock.close()
+        raise
+    return sock
+
+
+def _request(message, timeout=5):
+    sock = _connect(timeout)
+    try:
+        _send_message(sock, message)
+        return _recv_message(sock)
+    finally:
+        sock.close()
+
+
+def forward(args):
+    """Run the command in the daemon, if it's running.
+
+    :param args: the command line arguments, without the program name
+    :return: the exit code of the command, or None if the daemon couldn't
+        run it, and it needs to be run in-process instead
+    """
+    if (not is_supported() or os.environ.get(DISABLE_ENV_VAR) or
+            not os.path.exists(SOCKET_PATH) or
+            (args and args[0] in LOCAL_ONLY_COMMANDS)):
+        return None
+    try:
+        sock = _connect()
+    except (IOError, OSError):
+        return None
+    with sock:
+        try:
+            _send_message(sock, {
+                'command': 'run',
+                'fingerprint': fingerprint(),
+                'args': list(args),
+                'env': dict(os.environ),
+                'cwd': os.getcwd(),
+            }, fds=[sys.stdin.fileno(), sys.stdout.fileno(),
+                    sys.stderr.fileno()])
+            sys.stdout.flush()
+            sys.stderr.flush()
+            started = _recv_message(sock)
+        except (IOError, OSError, EOFError, ValueError):
+            return None
+        if started.get('stale'):
+            return None
+        while True:
+            try:
+                return _recv_message(sock)['exit_code']
+            except KeyboardInterrupt:
+                # the child isn't in our process group, so pass it on
+                os.kill(started['pid'], signal.SIGINT)
+            except (IOError, OSError, EOFError, ValueError):
+                return 1
+
+
+def status():
+    """Return the daemon's details, or None if it isn't running"""
+    if not is_supported():
+        return None
+    try:
+        return _request({'command': 'ping'})
+    except (IOError, OSError, EOFError, ValueError):
+        return None
+
+
+def start(idle_timeout=None):
+    """Start the daemon in the background, and wait for it to come up"""
+    if not is_supported():
+        raise CloudifyCliError(
+            'The cfy daemon is not supported on this platform')
+    if status():
+        raise CloudifyCliError('The cfy daemon is already running')
+    import subprocess
+    log_dir = os.path.dirname(LOG_PATH)
+    if not os.path.exists(log_dir):
+        os.makedirs(log_dir, mode=0o700)
+    command = [sys.executable, '-m', 'cloudify_cli.daemon']
+    if idle_timeout:
+        command.append(str(idle_timeout))
+    with open(LOG_PATH, 'a') as log_file:
+        subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=log_file,
+            stderr=log_file,
+            start_new_session=True,
+            close_fds=True)
+    deadline = time.time() + START_TIMEOUT
+    while time.time() < deadline:
+        details = status()
+        if details:
+            return details
+        time.sleep(0.1)
+    raise CloudifyCliError(
+        'The cfy daemon did not start in {0} seconds, see {1} for '
+        'details'.format(START_TIMEOUT, LOG_PATH))
+
+
+def stop():
+    """Stop the daemon. Return True if it was running."""
+    try:
+        _request({'command': 'stop'})
+    except (IOError, OSError, EOFError, ValueError):
+        return False
+    return True
+
+
+class Daemon(object):
+    def __init__(self, idle_timeout=None):
+        self._idle_timeout = idle_timeout
+        self._fingerprint = fingerprint()
+        self._profile_stamp = None
+        self._sock = None
+        self._served = 0
+
+    def warm_up(self):
+        """Import all the commands, so that the children don't have to"""
+        from cloudify_cli import main
+        main._make_cfy()
+        for command in main.LAZY_COMMANDS:
+            command.load()
+        self._refresh_profile()
+
+    def _refresh_profile(self):
+        """Reload the active profile, if it changed since it was loaded"""
+        active_profile = env.get_active_profile()
+        path = env.get_context_path(active_profile)
+        try:
+            mtime = os.path.getmtime(path) if path else None
+        except OSError:
+            mtime = None
+        stamp = (active_profile, mtime)
+        if stamp != self._profile_stamp:
+            env.profile = env.get_profile_context(suppress_error=True)
+            self._profile_stamp = stamp
+
+    def serve(self):
+        if os.path.exists(SOCKET_PATH):
+            os.unlink(SOCKET_PATH)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.bind(SOCKET_PATH)
+        os.chmod(SOCKET_PATH, 0o600)
+        self._sock.listen(16)
+        self._sock.settimeout(1)
+        signal.signal(signal.SIGTERM, self._handle_sigterm)
+        last_request = time.time()
+        try:
+            while True:
+                self._reap_children()
+                try:
+                    conn, _ = self._sock.accept()
+                except socket.timeout:
+                    if self._idle_timeout and \
+                            time.time() - last_request > self._idle_timeout:
+                        return
+                    continue
+                last_request = time.time()
+                conn.settimeout(None)
+                with conn:
+                    if not self._handle(conn):
+                        return
+        finally:
+            self._sock.close()
+            if os.path.exists(SOCKET_PATH):
+                os.unlink(SOCKET_PATH)
+
+    def _handle_sigterm(self, signum, frame):
+        raise SystemExit(0)
+
+    def _reap_children(self):
+        while True:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except OSError as e:
+                if e.errno == errno.ECHILD:
+                    return
+                raise
+            if not pid:
+                return
+
+    def _handle(self, conn):
+        """Handle a single request. Return False to stop the daemon."""
+        try:
+            message, fds = _recv_message(conn, max_fds=_STREAMS)
+        except (IOError, OSError, EOFError, ValueError):
+            return True
+        command = message.get('command')
+        if command == 'ping':
+            _send_message(conn, {'pid': os.getpid(),
+                                 'fingerprint': self._fingerprint,
+                                 'socket': SOCKET_PATH,
+                                 'commands_run': self._served})
+            return True
+        if command == 'stop':
+            _send_message(conn, {'pid': os.getpid()})
+            return False
+        if command != 'run':
+            return True
+        if len(fds) != _STREAMS or \
+                message.get('fingerprint') != self._fingerprint:
+            _send_message(conn, {'stale': True})
+            for fd in fds:
+                os.close(fd)
+            # if our own code changed, there's no point in staying around
+            return fingerprint() == self._fingerprint
+        self._refresh_profile()
+        self._served += 1
+        pid = os.fork()
+        if pid == 0:
+            self._sock.close()
+            _run_child(conn, message, fds)
+        for fd in fds:
+            os.close(fd)
+        return True
+
+
+def _run_child(conn, message, fds):
+    """Run the command in the forked child. Never returns."""
+    exit_code = 1
+    try:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        sys.stdin = os.fdopen(0, 'r', closefd=False)
+        # line-buffered if it's a terminal, just like the interpreter does
+        sys.stdout = os.fdopen(1, 'w', 1 if os.isatty(1) else -1,
+                               closefd=False)
+        sys.stderr = os.fdopen(2, 'w', 1, closefd=False)
+        os.chdir(message['cwd'])
+        os.environ.clear()
+        os.environ.update(message['env'])
+        # the logger is configured on first use, and must write to the
+        # caller's streams, with the caller's settings
+        from cloudify_cli import logger
+        logger._lgr = None
+        _send_message(conn, {'pid': os.getpid()})
+        exit_code = _invoke(message['args'])
+    except Exception:
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            _send_message(conn, {'exit_code': exit_code})
+        finally:
+            os._exit(exit_code)
+
+
+def _invoke(args):
+    from cloudify_cli import main
+    try:
+        main._cfy.main(args=args, prog_name='cfy')
+    except SystemExit as e:
+        if e.code is None:
+            return 0
+        if isinstance(e.code, int):
+            return e.code
+        sys.stderr.write('{0}\n'.format(e.code))
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    except Exception:
+        sys.excepthook(*sys.exc_info())
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    daemon = Daemon(idle_timeout=float(sys.argv[1]) if sys.argv[1:]
+                    else None)
+    daemon.warm_up()
+    daemon.serve()
@@ -1,21 +1,16 @@
+# This module is imported by almost every command, so only cheap modules
+# are imported at the top level: yaml, requests and the rest client are
+# imported when they're first needed.
 import os
+import copy
 import json
 import errno
-import types
 import shutil
 import getpass
 import tempfile
-import itertools
+import threading
 from base64 import b64encode
-
-import yaml
-import requests
-
-from cloudify_rest_client import CloudifyClient
-from cloudify_rest_client.client import HTTPClient
-from cloudify.cluster_status import CloudifyNodeType
-from cloudify_rest_client.exceptions import CloudifyClientError
-from cloudify.utils import ipv6_url_compat
+from contextlib import contextmanager
 
 from cloudify_cli import constants
 from cloudify_cli.exceptions import CloudifyCliError
@@ -31,7 +26,11 @@ CLOUDIFY_WORKDIR = os.path.join(
     constants.CLOUDIFY_BASE_DIRECTORY_NAME)
 PROFILES_DIR = os.path.join(CLOUDIFY_WORKDIR, 'profiles')
 ACTIVE_PROFILE = os.path.join(CLOUDIFY_WORKDIR, 'active.profile')
+# kept in PROFILES_DIR; it's hidden from the profile names by the dot
+PROFILES_INDEX_FILENAME = '.index.json'
 CLUSTER_RETRY_INTERVAL = 5
+# the most connections kept alive to a manager, by the pooled clients
+CONNECTION_POOL_SIZE = 32
 
 
 def delete_profile(profile_name):
@@ -58,19 +57,72 @@ def assert_profile_exists(profile_name):
 
 def set_active_profile(profile_name):
     global profile
-    with open(ACTIVE_PROFILE, 'w+') as active_profile:
-        active_profile.write(profile_name)
+    _write_atomic(ACTIVE_PROFILE,
+                  lambda active_profile: active_profile.write(profile_name))
     profile = get_profile_context(profile_name, suppress_error=True)
 
 
 def get_active_profile():
+    return _read_cached(ACTIVE_PROFILE,
+                        lambda active_profile: active_profile.read().strip())
+
+
+def _file_signature(path):
     try:
-        with open(ACTIVE_PROFILE) as active_profile:
-            return active_profile.read().strip()
-    except IOError as e:
+        stat = os.stat(path)
+    except OSError as e:
         if e.errno != errno.ENOENT:
             raise
         return None
+    return [stat.st_mtime_ns, stat.st_ino, stat.st_size]
+
+
+def _read_cached(path, parse):
+    """Parse the file, unless it didn't change since it was last parsed.
+
+    The profile files are read many times by a single command, so what
+    they parsed to is kept, until their mtime, inode or size change.
+
+    :return: what parse returned for the file, or None if it doesn't exist
+    """
+    signature = _file_signature(path)
+    if signature is None:
+        _parsed_files.pop(path, None)
+        return None
+    cached = _parsed_files.get(path)
+    if cached is None or cached[0] != signature:
+        try:
+            with open(path) as f:
+                cached = signature, parse(f)
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            return None
+        _parsed_files[path] = cached
+    # the callers might change what they got
+    return copy.deepcopy(cached[1])
+
+
+def _write_atomic(path, write):
+    """Write the file through a temporary file, so that a concurrent cfy
+    never reads it half-written.
+
+    The temporary file is unique, so that threads writing the same file
+    don't write to the same temporary file.
+    """
+    fd, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), prefix=os.path.basename(path) + '.',
+        suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            write(f)
+        if os.path.exists(path):
+            shutil.copymode(path, temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
 
 
 def set_target_manager(manager_host):
@@ -90,6 +142,51 @@ def get_profile_names():
     return profile_names
 
 
+def get_profiles_summary(fields):
+    """The given fields of every profile, by the profile names.
+
+    They're read from the profiles index, which keeps them together with
+    the signature of each profile's context file, so that only the
+    profiles that changed since the index was written are read again.
+    """
+    index_path = os.path.join(PROFILES_DIR, PROFILES_INDEX_FILENAME)
+    try:
+        index = _read_cached(index_path, json.load) or {}
+    except ValueError:
+        index = {}
+    entries = index.get('profiles', {}) if index.get('fields') == fields \
+        else {}
+
+    profiles = {}
+    profile_names = get_profile_names()
+    for profile_name in profile_names:
+        signature = _context_signature(profile_name)
+        entry = entries.get(profile_name)
+        if signature is None or entry is None or \
+                entry['signature'] != signature:
+            context = get_profile_context(profile_name).to_dict()
+            entry = {'signature': signature,
+                     'profile': {field: context.get(field)
+                                 for field in fields}}
+        profiles[profile_name] = entry
+
+    if profiles != entries:
+        try:
+            _write_atomic(index_path, lambda f: json.dump(
+                {'fields': fields, 'profiles': profiles}, f))
+        except (IOError, OSError):
+            # the profiles can still be read without the index
+            pass
+    return {profile_name: profiles[profile_name]['profile']
+            for profile_name in profile_names}
+
+
+def _context_signature(profile_name):
+    base_dir = os.path.join(PROFILES_DIR, profile_name)
+    return _file_signature(os.path.join(base_dir, 'context.json')) or \
+        _file_signature(os.path.join(base_dir, 'context'))
+
+
 def assert_manager_active():
     if not is_manager_active():
         raise CloudifyCliError(
@@ -187,12 +284,7 @@ def get_profile_context(profile_name=None, suppress_error=False):
     loaded = None
     path = get_context_path(profile_name)
     if path:
-        try:
-            with open(path) as f:
-                loaded = json.load(f)
-        except IOError as e:
-            if e.errno != errno.ENOENT:
-                raise
+        loaded = _read_cached(path, json.load)
 
     if not loaded:
         loaded = _try_load_yaml_profile(profile_name)
@@ -206,19 +298,30 @@ def get_profile_context(profile_name=None, suppress_error=False):
     return ProfileContext(loaded, profile_name)
 
 
-class _ProfileLoader(yaml.SafeLoader):
+def _load_str(loader, node):
+    return node.value
+
+
+_profile_loader = None
+
+
+def _get_profile_loader():
     """A yaml Loader that can load Cloudify 5.1 profiles
 
     It supports python/unicode, which was commonly present in py2-created
     profiles.
     """
+    global _profile_loader
+    if _profile_loader is None:
+        import yaml
 
+        class _ProfileLoader(yaml.SafeLoader):
+            pass
 
-def _load_str(loader, node):
-    return node.value
-
-
-_ProfileLoader.add_constructor(u'tag:yaml.org,2002:python/unicode', _load_str)
+        _ProfileLoader.add_constructor(
+            u'tag:yaml.org,2002:python/unicode', _load_str)
+        _profile_loader = _ProfileLoader
+    return _profile_loader
 
 
 def _try_load_yaml_profile(profile_name):
@@ -231,17 +334,14 @@ def _try_load_yaml_profile(profile_name):
     base_dir = get_profile_dir(profile_name)
     if not base_dir:
         return
-    try:
-        with open(os.path.join(base_dir, 'context')) as f:
-            # dropping the object tag from yaml, so that we load the
-            # yaml as just a dict and not as an object
-            data = f.read().replace('!CloudifyProfileContext', '')
-            context = yaml.load(data, Loader=_ProfileLoader)
-    except IOError as e:
-        if e.errno != errno.ENOENT:
-            raise
-        return
-    return context
+
+    def _load_yaml(f):
+        import yaml
+        # dropping the object tag from yaml, so that we load the
+        # yaml as just a dict and not as an object
+        data = f.read().replace('!CloudifyProfileContext', '')
+        return yaml.load(data, Loader=_get_profile_loader())
+    return _read_cached(os.path.join(base_dir, 'context'), _load_yaml)
 
 
 def config_initialized_with_logging():
@@ -294,6 +394,7 @@ def raise_uninitialized():
 
 
 def is_cluster(client_profile=None):
+    from cloudify.cluster_status import CloudifyNodeType
     if client_profile is None:
         client_profile = profile
     return (not isinstance(client_profile.cluster, list) and
@@ -311,7 +412,19 @@ def get_rest_client(client_profile=None,
                     trust_all=False,
                     cluster=None,
                     kerberos_env=None,
-                    token=None):
+                    token=None,
+                    pooled=False):
+    """Make a REST client for the profile's manager.
+
+    :param pooled: return the client from the process-wide pool, which
+        has a client for each profile, tenant and credentials. Use this
+        where clients of many tenants are needed, eg. in a loop over the
+        tenants.
+    """
+    from cloudify_cli import timings
+    from cloudify_cli.cluster_client import CloudifyClusterClient
+    from cloudify_cli.rest_client import CliClient
+    from cloudify_cli.metadata_cache import get_metadata_cache
     if client_profile is None:
         client_profile = profile
     assert_credentials_set(client_profile)
@@ -332,6 +445,7 @@ def get_rest_client(client_profile=None,
         'trust_all': trust_all or get_ssl_trust_all(),
     }
 
+    session_token = None
     if token:
         kwargs['token'] = token
     elif kerberos_env:
@@ -340,15 +454,102 @@ def get_rest_client(client_profile=None,
         kwargs['username'] = username
         kwargs['password'] = password
         kwargs['headers'].update(get_auth_header(username, password))
+        if use_session_tokens(client_profile):
+            session_token = _get_session_token(client_profile, cluster, kwargs)
+
+    clients = _shared_clients
+    if clients is None and pooled:
+        clients = _client_pool
+    cache_key = None
+    if clients is not None:
+        cache_key = json.dumps(
+            [client_profile.profile_name, bool(cluster), kwargs],
+            sort_keys=True)
+        with _client_pool_lock:
+            if cache_key in clients:
+                return clients[cache_key]
+        # the clients of all the tenants share the connections
+        kwargs['session'] = _get_session(client_profile.profile_name)
 
     if cluster:
         kwargs['profile'] = client_profile
         client = CloudifyClusterClient(**kwargs)
     else:
-        client = CloudifyClient(**kwargs)
+        client = CliClient(**kwargs)
+    if not rest_host or rest_host == client_profile.manager_ip:
+        client._client.metadata_cache = get_metadata_cache(client_profile)
+    if session_token is not None:
+        client._client.session_token = session_token
+    recorder = timings.get_recorder()
+    if recorder is not None:
+        recorder.instrument(client._client._session)
+    if cache_key is not None:
+        with _client_pool_lock:
+            client = clients.setdefault(cache_key, client)
     return client
 
 
+def _get_session_token(client_profile, cluster, client_kwargs):
+    """The session token to use instead of the username and password"""
+    from cloudify_cli.rest_client import CliClient
+    from cloudify_cli.cluster_client import CloudifyClusterClient
+    from cloudify_cli.session_tokens import (
+        SESSION_TOKEN_FILENAME,
+        get_session_token,
+    )
+    profile_dir = get_profile_dir(client_profile.profile_name)
+    if not profile_dir:
+        return None
+    client_kwargs = copy.deepcopy(client_kwargs)
+
+    def _make_client():
+        if cluster:
+            return CloudifyClusterClient(profile=client_profile,
+                                         **client_kwargs)
+        return CliClient(**client_kwargs)
+    credentials = '{username}:{password}@{host}:{port}'.format(
+        **client_kwargs)
+    return get_session_token(
+        os.path.join(profile_dir, SESSION_TOKEN_FILENAME),
+        credentials, _make_client)
+
+
+def _get_session(profile_name):
+    """The HTTP session shared by the pooled clients of a profile.
+
+    Its connection pools are large enough for all the threads that the
+    commands use at the same time, so that connections are kept alive
+    rather than discarded once the pool is full.
+    """
+    with _client_pool_lock:
+        if profile_name not in _sessions:
+            import requests
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_maxsize=CONNECTION_POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _sessions[profile_name] = session
+        return _sessions[profile_name]
+
+
+@contextmanager
+def shared_rest_clients():
+    """Reuse the clients made by get_rest_client.
+
+    Within this context, get_rest_client returns the same client for the
+    same profile, manager, tenant and credentials, so that commands
+    running in a single process share the client and its connections.
+    """
+    global _shared_clients
+    previous = _shared_clients
+    _shared_clients = {}
+    try:
+        yield
+    finally:
+        _shared_clients = previous
+
+
 def build_manager_host_string(ssh_user='', ip=''):
     ip = ip or profile.manager_ip
     return build_host_string(ip, ssh_user)
@@ -405,6 +606,16 @@ def get_token(from_profile=None):
     return get_from_profile_or_env_var('token', from_profile)
 
 
+def use_session_tokens(from_profile=None):
+    """Whether to exchange the username and password for session tokens"""
+    if from_profile is None:
+        from_profile = profile
+    env_value = os.environ.get(constants.CLOUDIFY_SESSION_TOKENS)
+    if env_value:
+        return env_value.lower() in ['1', 'true', 'yes', 'on']
+    return bool(from_profile.session_tokens)
+
+
 def get_kerberos_env(from_profile=None):
     return get_from_profile_or_env_var('kerberos_env', from_profile)
 
@@ -478,6 +689,7 @@ class ProfileContext(object):
             'rest_protocol': constants.DEFAULT_REST_PROTOCOL,
             'rest_certificate': None,
             'kerberos_env': False,
+            'session_tokens': False,
             'cluster': {},
         }
         if context:
@@ -520,9 +732,11 @@ class ProfileContext(object):
         target_file_path = os.path.join(
             workdir,
             'context.json')
-        with open(target_file_path, 'w') as f:
+
+        def _write(f):
             json.dump(self.to_dict(), f, sort_keys=True, indent=4)
             f.write('\n')
+        _write_atomic(target_file_path, _write)
 
 
 def get_auth_header(username, password):
@@ -539,133 +753,11 @@ def get_auth_header(username, password):
     return header
 
 
-# attributes that can differ for each node in a cluster. Those will be updated
-# in the profile when we switch to a new master.
-# Dicts with these keys live in profile.cluster, and are added there during
-# either `cfy cluster update-profile` (in which case some of them might be
-# missing, eg. ssh_*), or during a `cfy cluster join`.
-# If a value is missing, we will use the value from the last active manager.
-# Only the IP is required.
-# Note that not all attributes are allowed - username/password will be
-# the same for every node in the cluster.
-CLUSTER_NODE_ATTRS = ['host_ip', 'host_type', 'rest_port', 'rest_protocol',
-                      'ssh_port', 'ssh_user', 'ssh_key']
-_TRY_NEXT_NODE = object()
-
-
-class ClusterHTTPClient(HTTPClient):
-
-    def __init__(self, *args, **kwargs):
-        profile = kwargs.pop('profile')
-        super(ClusterHTTPClient, self).__init__(*args, **kwargs)
-        if not profile.cluster:
-            raise ValueError('Cluster client invoked for an empty cluster!')
-        self._cluster = list(profile.cluster.get(CloudifyNodeType.MANAGER))
-        self._profile = profile
-        first_node = self._cluster[0]
-        self.cert = first_node.get('cert') or self.cert
-        self.trust_all = first_node.get('trust_all') or self.trust_all
-        self.default_timeout_sec = self.default_timeout_sec or (5, None)
-
-    def do_request(self, *args, **kwargs):
-        # this request can be retried for each manager - if the data is
-        # a generator, we need to copy it, so we can send it more than once
-        copied_data = None
-        if isinstance(kwargs.get('data'), types.GeneratorType):
-            copied_data = itertools.tee(kwargs.pop('data'),
-                                        len(self._cluster) + 1)
-
-        if kwargs.get('timeout') is None:
-            kwargs['timeout'] = self.default_timeout_sec
-
-        if copied_data is not None:
-            kwargs['data'] = copied_data[-1]
-
-        manager_host = get_target_manager()
-        if manager_host:
-            self.host = ipv6_url_compat(manager_host)
-            return super(ClusterHTTPClient, self).do_request(*args, **kwargs)
-
-        # First try with the main manager ip given when creating the profile
-        # with `cfy profiles use`
-        self.host = ipv6_url_compat(self._profile.manager_ip)
-        response = self._try_do_request(*args, **kwargs)
-        if response is not _TRY_NEXT_NODE:
-            return response
-
-        for node_index, node in list(enumerate(
-                self._profile.cluster[CloudifyNodeType.MANAGER])):
-            if self._profile.manager_ip in [node['host_ip'], node['hostname']]:
-                continue
-            self._use_node(node)
-            if copied_data is not None:
-                kwargs['data'] = copied_data[node_index]
-
-            response = self._try_do_request(*args, **kwargs)
-            if response is _TRY_NEXT_NODE:
-                continue
-            return response
-
-        raise CloudifyClientError('All cluster nodes are offline')
-
-    def _try_do_request(self, *args, **kwargs):
-        try:
-            return super(ClusterHTTPClient, self).do_request(*args,
-                                                             **kwargs)
-        except (requests.exceptions.ConnectionError,
-                CloudifyClientError) as e:
-            if isinstance(e, CloudifyClientError) and e.status_code != 502:
-                raise
-            self.logger.warning('Could not connect to manager %s on port %s',
-                                self.host, self.port)
-            self.logger.debug(str(e))
-        return _TRY_NEXT_NODE
-
-    def _use_node(self, node):
-        if ipv6_url_compat(node['host_ip']) == self.host:
-            return
-        self.host = ipv6_url_compat(node['host_ip'])
-        for attr in ['rest_port', 'rest_protocol', 'trust_all', 'cert']:
-            new_value = node.get(attr)
-            if new_value:
-                setattr(self, attr, new_value)
-        self._update_profile(node)
-
-    def _update_profile(self, node):
-        """
-        Put the node at the start of the cluster list in profile.
-
-        The client tries nodes in the order of the cluster list, so putting
-        the node first will make the client try it first next time. This makes
-        the client always try the last-known-active-manager first.
-        """
-        self._profile.cluster[CloudifyNodeType.MANAGER].remove(node)
-        self._profile.cluster[CloudifyNodeType.MANAGER] = (
-            [node] + self._profile.cluster[CloudifyNodeType.MANAGER])
-        for node_attr in CLUSTER_NODE_ATTRS:
-            if node_attr in node:
-                setattr(self._profile, node_attr, node[node_attr])
-        self._profile.save()
-
-
-class CloudifyClusterClient(CloudifyClient):
-    """
-    A CloudifyClient that will retry the queries with the current manager.
-
-    When a request fails with a connection error, this will keep trying with
-    every node in the cluster, until it finds an active manager.
-
-    When an active manager is found, the profile will be updated with its
-    address.
-    """
-    def __init__(self, profile, *args, **kwargs):
-        self._profile = profile
-        super(CloudifyClusterClient, self).__init__(*args, **kwargs)
-
-    def client_class(self, *args, **kwargs):
-        kwargs.setdefault('profile', self._profile)
-        return ClusterHTTPClient(*args, **kwargs)
-
-
+# the profile files that were read, by path: (signature, parsed)
+_parsed_files = {}
 profile = get_profile_context(suppress_error=True)
 target_manager = None
+_shared_clients = None
+_client_pool = {}
+_sessions = {}
+_client_pool_lock = threading.Lock()
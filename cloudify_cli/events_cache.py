@@ -0,0 +1,346 @@
+"""A local cache of the events of ended executions.
+
+Once an execution (or an execution group) has ended, it never gets new
+events, so they only need to be downloaded from the manager once. They're
+kept in an SQLite database in the profile's directory, indexed by the
+fields that `cfy events list` can filter by, so that any page of them
+can be looked up locally.
+
+Nothing is downloaded just to fill the cache: the batches of events which
+were fetched from the manager anyway are stored, as long as they continue
+the ones stored before, and the events are looked up locally once all of
+them were stored.
+
+The cache is bounded in size: when it grows over the limit, the events
+of the executions that were used least recently are evicted.
+"""
+import os
+import json
+import time
+import sqlite3
+
+from cloudify_rest_client.executions import Execution
+from cloudify_rest_client.responses import ListResponse
+
+from cloudify_cli import env
+
+CACHE_FILENAME = 'events_cache.db'
+MAX_CACHE_SIZE = 256 * 1024 * 1024
+# how long to wait for another cfy process which is using the cache
+LOCK_TIMEOUT = 10
+# a cache of another schema is dropped, and filled again
+SCHEMA_VERSION = 2
+# the events.list arguments which can be answered from the cache. Note
+# that the manager matches node_id against the node name of the events.
+CACHEABLE_FILTERS = {'execution_id', 'execution_group_id', 'include_logs',
+                     'node_id', 'operation'}
+
+_FILLING = 'filling'
+_COMPLETE = 'complete'
+_TOO_LARGE = 'too_large'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS streams (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    deployment_id TEXT,
+    status TEXT NOT NULL,
+    events_count INTEGER NOT NULL DEFAULT 0,
+    size INTEGER NOT NULL DEFAULT 0,
+    last_used REAL NOT NULL,
+    UNIQUE (kind, key)
+);
+CREATE TABLE IF NOT EXISTS events (
+    stream_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    is_log INTEGER NOT NULL,
+    node_name TEXT,
+    operation TEXT,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (stream_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS events_node
+    ON events (stream_id, node_name, seq);
+CREATE INDEX IF NOT EXISTS events_operation
+    ON events (stream_id, operation, seq);
+CREATE INDEX IF NOT EXISTS streams_last_used ON streams (last_used);
+"""
+_DROP_SCHEMA = """
+DROP TABLE IF EXISTS events;
+DROP TABLE IF EXISTS streams;
+"""
+
+
+def get_events_cache():
+    """The events cache of the active profile, or None if there's none"""
+    profile_dir = env.get_profile_dir()
+    if not profile_dir:
+        return None
+    return EventsCache(os.path.join(profile_dir, CACHE_FILENAME))
+
+
+class EventsCache(object):
+    def __init__(self, path, max_size=MAX_CACHE_SIZE):
+        self.path = path
+        self.max_size = max_size
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=LOCK_TIMEOUT)
+            try:
+                conn.execute('PRAGMA journal_mode=WAL')
+                version, = conn.execute('PRAGMA user_version').fetchone()
+                if version != SCHEMA_VERSION:
+                    conn.executescript(_DROP_SCHEMA)
+                conn.executescript(_SCHEMA)
+                conn.execute(
+                    'PRAGMA user_version = {0}'.format(SCHEMA_VERSION))
+            except Exception:
+                conn.close()
+                raise
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def get_events(self, record, list_kwargs, offset, size):
+        """Return a page of the events, if they're cached.
+
+        :param record: the execution or execution group
+        :param list_kwargs: the arguments of events.list
+        :return: a ListResponse of the events, or None if they aren't
+            cached, so they have to be fetched from the manager
+        """
+        stream = self._stream(record, list_kwargs)
+        if stream is None:
+            return None
+        kind, key, filters = stream
+        try:
+            return self.list_events(
+                kind,
+                key,
+                include_logs=filters.get('include_logs', False),
+                node_name=filters.get('node_id'),
+                operation=filters.get('operation'),
+                offset=offset,
+                size=size)
+        except sqlite3.Error:
+            # the manager still has the events
+            return None
+
+    def add_events(self, record, list_kwargs, offset, events, total):
+        """Store a batch of the events, which was fetched from the manager.
+
+        All the events of an execution or group are kept, in order, so
+        only a batch that was fetched with the logs and without other
+        filters is stored, and only if it continues the events stored
+        before. Once the last of them is stored, they can be looked up.
+
+        :param offset: the position of the first event of the batch
+        :param total: the number of events that the manager has
+        """
+        stream = self._stream(record, list_kwargs)
+        if stream is None:
+            return
+        kind, key, filters = stream
+        if not filters.get('include_logs') or \
+                set(filters) & {'node_id', 'operation'}:
+            return
+        try:
+            complete = self._append(kind, key, getattr(
+                record, 'deployment_id', None), offset, events, total)
+        except sqlite3.Error:
+            # it's only a cache
+            return
+        if complete:
+            self.prune()
+
+    def _stream(self, record, list_kwargs):
+        """The stream of events that an events.list call is about.
+
+        :return: the kind and key of the stream and the filters, or None
+            if the events can't be cached
+        """
+        filters = {k: v for k, v in list_kwargs.items() if v is not None}
+        if record is None or \
+                record.status not in Execution.END_STATES or \
+                not set(filters) <= CACHEABLE_FILTERS:
+            return None
+        if 'execution_id' in filters:
+            return 'execution', filters['execution_id'], filters
+        elif 'execution_group_id' in filters:
+            return 'execution_group', filters['execution_group_id'], filters
+        return None
+
+    def _append(self, kind, key, deployment_id, offset, events, total):
+        conn = self._connect()
+        with conn:
+            # another cfy process might be storing the same events
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                'SELECT id, status, events_count, size FROM streams '
+                'WHERE kind = ? AND key = ?', (kind, key)).fetchone()
+            if row is None:
+                if offset != 0:
+                    return False
+                stream_id = conn.execute(
+                    'INSERT INTO streams '
+                    '(kind, key, deployment_id, status, last_used) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (kind, key, deployment_id, _FILLING,
+                     time.time())).lastrowid
+                count, size = 0, 0
+            else:
+                stream_id, status, count, size = row
+                if status != _FILLING or offset > count:
+                    return False
+            rows = []
+            # the batch might start with events which were stored already
+            for event in events[count - offset:]:
+                payload = event.to_json() if hasattr(event, 'to_json') \
+                    else json.dumps(event)
+                rows.append((
+                    stream_id,
+                    count,
+                    'cloudify_log' in (event.get('type') or ''),
+                    _payload_field(event, 'node_name'),
+                    _payload_field(event, 'operation'),
+                    payload,
+                ))
+                count += 1
+                size += len(payload)
+            if size > self.max_size:
+                # it'd only evict everything else, and then itself, so
+                # remember not to store the rest of them
+                conn.execute('DELETE FROM events WHERE stream_id = ?',
+                             (stream_id, ))
+                conn.execute(
+                    'UPDATE streams SET status = ?, events_count = 0, '
+                    'size = 0 WHERE id = ?', (_TOO_LARGE, stream_id))
+                return False
+            conn.executemany(
+                'INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)', rows)
+            complete = count >= total
+            conn.execute(
+                'UPDATE streams SET status = ?, events_count = ?, '
+                'size = ?, last_used = ? WHERE id = ?',
+                (_COMPLETE if complete else _FILLING, count, size,
+                 time.time(), stream_id))
+        return complete
+
+    def _stream_id(self, conn, kind, key):
+        row = conn.execute(
+            'SELECT id FROM streams '
+            'WHERE kind = ? AND key = ? AND status = ?',
+            (kind, key, _COMPLETE)).fetchone()
+        return row[0] if row else None
+
+    def list_events(self,
+                    kind,
+                    key,
+                    include_logs=False,
+                    node_name=None,
+                    operation=None,
+                    offset=0,
+                    size=100):
+        """Return a page of the cached events, like events.list does.
+
+        :param kind: 'execution' or 'execution_group'
+        :param key: the ID of the execution or execution group
+        :return: a ListResponse of the events, or None if they're not
+            cached
+        """
+        conn = self._connect()
+        stream_id = self._stream_id(conn, kind, key)
+        if stream_id is None:
+            return None
+        conditions = ['stream_id = ?']
+        params = [stream_id]
+        if not include_logs:
+            conditions.append('is_log = 0')
+        if node_name is not None:
+            conditions.append('node_name = ?')
+            params.append(node_name)
+        if operation is not None:
+            conditions.append('operation = ?')
+            params.append(operation)
+        where = ' AND '.join(conditions)
+        total, = conn.execute(
+            'SELECT COUNT(*) FROM events WHERE ' + where, params).fetchone()
+        rows = conn.execute(
+            'SELECT payload FROM events WHERE ' + where +
+            ' ORDER BY seq LIMIT ? OFFSET ?',
+            params + [size, offset]).fetchall()
+        with conn:
+            conn.execute('UPDATE streams SET last_used = ? WHERE id = ?',
+                         (time.time(), stream_id))
+        return ListResponse([json.loads(payload) for payload, in rows], {
+            'pagination': {'total': total, 'offset': offset, 'size': size}})
+
+    def remove(self, deployment_id=None):
+        """Forget the cached events.
+
+        :param deployment_id: only forget the events of this deployment
+        """
+        conn = self._connect()
+        with conn:
+            if deployment_id is None:
+                self._remove_streams(conn, '1 = 1', ())
+            else:
+                # the events of a group might be of any deployment
+                self._remove_streams(
+                    conn, 'deployment_id = ? OR kind = ?',
+                    (deployment_id, 'execution_group'))
+
+    def size(self):
+        """The total size of the cached events"""
+        size, = self._connect().execute(
+            'SELECT COALESCE(SUM(size), 0) FROM streams').fetchone()
+        return size
+
+    def prune(self, max_size=None):
+        """Evict the least recently used events, down to max_size.
+
+        :return: the number of executions and groups evicted, and the size
+            of their events
+        """
+        max_size = self.max_size if max_size is None else max_size
+        conn = self._connect()
+        evicted = 0
+        freed = 0
+        with conn:
+            total = self.size()
+            if total <= max_size:
+                return evicted, freed
+            rows = conn.execute(
+                'SELECT id, size FROM streams ORDER BY last_used').fetchall()
+            for stream_id, size in rows:
+                if total <= max_size:
+                    break
+                self._remove_streams(conn, 'id = ?', (stream_id, ))
+                total -= size
+                freed += size
+                evicted += 1
+        return evicted, freed
+
+    def vacuum(self):
+        """Give the space of the evicted events back to the filesystem"""
+        self._connect().execute('VACUUM')
+
+    def _remove_streams(self, conn, where, params):
+        conn.execute(
+            'DELETE FROM events WHERE stream_id IN '
+            '(SELECT id FROM streams WHERE ' + where + ')', params)
+        conn.execute('DELETE FROM streams WHERE ' + where, params)
+
+
+def _payload_field(event, field):
+    # the event might be an EventRecord, which doesn't expose the fields
+    # that are in its context
+    payload = getattr(event, 'payload', event)
+    return payload.get(field)
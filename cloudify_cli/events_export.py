@@ -0,0 +1,340 @@
+"""Bulk export of the events of many executions.
+
+The events of several executions are fetched at the same time, each by
+its own thread, but they're written out in the order of the executions,
+so that the events of each execution are kept together. Each fetcher
+only runs a few batches ahead of the writer, so memory use stays bounded
+however many events there are.
+
+The output is written in chunks, each of which is compressed on its
+own: concatenated gzip members, or zstd frames, are still a single valid
+compressed file. After each chunk, the position in the output and in the
+events is saved in a checkpoint file, so that an interrupted export can
+be resumed where it stopped.
+"""
+import os
+import json
+import gzip
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from cloudify_rest_client.executions import Execution
+
+from cloudify_cli.exceptions import CloudifyCliError
+from cloudify_cli.execution_events_fetcher import (
+    EventsCursor,
+    ExecutionEventsFetcher,
+)
+
+COMPRESSIONS = ['gzip', 'zstd', 'none']
+EXPORT_BATCH_SIZE = 1000
+EXPORT_PARALLEL = 4
+# how many batches each fetcher can be ahead of the writer
+QUEUED_BATCHES = 2
+CHECKPOINT_VERSION = 1
+
+
+def _compressor(compression):
+    if compression == 'gzip':
+        # the default level of zlib, rather than gzip's slower maximum
+        return lambda data: gzip.compress(data, compresslevel=6, mtime=0)
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise CloudifyCliError(
+                'zstd compression requires the zstandard package. Install '
+                'it with `pip install zstandard`, or use gzip compression')
+        return zstandard.ZstdCompressor().compress
+    if compression in (None, 'none'):
+        return None
+    raise CloudifyCliError('Unknown compression: {0}'.format(compression))
+
+
+class EventsOutput(object):
+    """A file that is written in separately compressed chunks"""
+
+    def __init__(self, path, compression=None, offset=None):
+        """
+        :param offset: append to the existing file at this position,
+            discarding whatever was written after it
+        """
+        self.path = path
+        self._compress = _compressor(compression)
+        if offset is None:
+            self._file = open(path, 'wb')
+        else:
+            self._file = open(path, 'r+b')
+            self._file.truncate(offset)
+            self._file.seek(offset)
+
+    @property
+    def offset(self):
+        return self._file.tell()
+
+    def write(self, text):
+        data = text.encode('utf-8')
+        if not data:
+            return
+        if self._compress:
+            data = self._compress(data)
+        self._file.write(data)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class NDJSONEventsFormat(object):
+    """One JSON object per line, with each event as the API returned it"""
+
+    def header(self, execution_id):
+        return ''
+
+    def events(self, events):
+        return ''.join(event.to_json() + '\n' for event in events)
+
+    def footer(self, execution_id, events_count):
+        return ''
+
+
+class TextEventsFormat(object):
+    """The events as shown by `cfy events list`, by execution"""
+
+    def header(self, execution_id):
+        return '\nListing events for execution id {0}\n\n'.format(
+            execution_id)
+
+    def events(self, events):
+        from cloudify import logs
+        lines = []
+        for event in events:
+            output = logs.create_event_message_prefix(event)
+            if output:
+                lines.append(output + '\n')
+        return ''.join(lines)
+
+    def footer(self, execution_id, events_count):
+        return '\nListed {0} events\n'.format(events_count)
+
+
+def load_checkpoint(path):
+    """Load the checkpoint of an interrupted export, if there is one"""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            checkpoint = json.load(f)
+    except ValueError as e:
+        raise CloudifyCliError(
+            'Invalid export checkpoint {0}: {1}'.format(path, e))
+    if checkpoint.get('version') != CHECKPOINT_VERSION:
+        raise CloudifyCliError(
+            'Export checkpoint {0} was made by another version of cfy, '
+            'remove it to export from the start'.format(path))
+    return checkpoint
+
+
+def _save_checkpoint(path, checkpoint):
+    # write it aside and then replace, so that it's never half-written
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def new_checkpoint(execution_ids, list_kwargs, compression=None):
+    """The checkpoint of an export that hasn't started yet.
+
+    The executions and the filters are kept, so that a resumed export
+    exports the same events, even if more executions were made since,
+    or the time range was relative to when the export started.
+    """
+    return {
+        'version': CHECKPOINT_VERSION,
+        'executions': list(execution_ids),
+        'list_kwargs': {
+            key: value.isoformat() if hasattr(value, 'isoformat') else value
+            for key, value in list_kwargs.items()
+        },
+        'compression': compression,
+        # the number of executions which were exported, and the output
+        # size after them
+        'done': 0,
+        'offset': 0,
+        # the execution which was being exported
+        'current': None,
+        'events': 0,
+    }
+
+
+def resume_offset(checkpoint):
+    """Prepare to resume an interrupted export.
+
+    :return: the output size to resume from. Whatever was written after
+        it was not checkpointed, and is discarded.
+    """
+    current = checkpoint['current']
+    if current is None:
+        return checkpoint['offset']
+    if current['cursor'] is None:
+        # the events of the execution were fetched by offset, so there's
+        # no position to fetch the rest of them from. Export all of them
+        # again, instead.
+        checkpoint['events'] -= current['events']
+        checkpoint['current'] = None
+        return checkpoint['offset']
+    return current['offset']
+
+
+class EventsExporter(object):
+    def __init__(self,
+                 client,
+                 output,
+                 events_format=None,
+                 parallel=EXPORT_PARALLEL,
+                 batch_size=EXPORT_BATCH_SIZE,
+                 checkpoint_path=None,
+                 logger=None):
+        """
+        :param output: the EventsOutput to write to
+        :param events_format: formats the events for the output; NDJSON
+            by default
+        :param parallel: fetch the events of up to this many executions
+            at the same time
+        :param checkpoint_path: keep the checkpoint in this file. It's
+            removed once the export completes.
+        """
+        self._client = client
+        self._output = output
+        self._format = events_format or NDJSONEventsFormat()
+        self._parallel = parallel
+        self._batch_size = batch_size
+        self._checkpoint_path = checkpoint_path
+        self._logger = logger
+
+    def export(self, checkpoint):
+        """Export the events of the executions in the checkpoint.
+
+        :param checkpoint: a checkpoint from new_checkpoint, or of an
+            interrupted export, to resume it
+        :return: the number of events exported
+        """
+        self._save_checkpoint(checkpoint)
+        stop = threading.Event()
+        executions = iter(checkpoint['executions'][checkpoint['done']:])
+        resumed = checkpoint['current']
+        # only start fetching the events of an execution shortly before
+        # it's written, rather than queueing all of them up front
+        jobs = deque()
+
+        def _start_next(executor, cursor=None):
+            execution_id = next(executions, None)
+            if execution_id is None:
+                return
+            batches = queue.Queue(maxsize=QUEUED_BATCHES)
+            jobs.append((execution_id, batches, executor.submit(
+                self._fetch_execution_events, execution_id, cursor,
+                checkpoint['list_kwargs'], batches, stop)))
+
+        with ThreadPoolExecutor(max_workers=self._parallel) as executor:
+            try:
+                _start_next(executor, EventsCursor.from_dict(
+                    resumed['cursor']) if resumed else None)
+                for _ in range(self._parallel - 1):
+                    _start_next(executor)
+                while jobs:
+                    execution_id, batches, _ = jobs.popleft()
+                    _start_next(executor)
+                    self._write_execution_events(
+                        checkpoint, execution_id, batches, resumed)
+                    resumed = None
+            finally:
+                stop.set()
+                for _, _, future in jobs:
+                    future.cancel()
+        if self._checkpoint_path and \
+                os.path.exists(self._checkpoint_path):
+            os.remove(self._checkpoint_path)
+        return checkpoint['events']
+
+    def _write_execution_events(self, checkpoint, execution_id, batches,
+                                resumed):
+        if resumed:
+            events_count = resumed['events']
+            text = ''
+        else:
+            events_count = 0
+            text = self._format.header(execution_id)
+        while True:
+            batch = batches.get()
+            if batch is None:
+                break
+            if isinstance(batch, Exception):
+                raise batch
+            events, cursor = batch
+            self._output.write(text + self._format.events(events))
+            text = ''
+            events_count += len(events)
+            checkpoint['events'] += len(events)
+            checkpoint['current'] = {
+                'execution_id': execution_id,
+                'offset': self._output.offset,
+                'cursor': cursor,
+                'events': events_count,
+            }
+            self._save_checkpoint(checkpoint)
+        self._output.write(
+            text + self._format.footer(execution_id, events_count))
+        checkpoint['done'] += 1
+        checkpoint['offset'] = self._output.offset
+        checkpoint['current'] = None
+        self._save_checkpoint(checkpoint)
+        if self._logger:
+            self._logger.debug('Exported %s events of execution %s',
+                               events_count, execution_id)
+
+    def _save_checkpoint(self, checkpoint):
+        if self._checkpoint_path:
+            _save_checkpoint(self._checkpoint_path, checkpoint)
+
+    def _fetch_execution_events(self, execution_id, cursor, list_kwargs,
+                                batches, stop):
+        try:
+            events_fetcher = ExecutionEventsFetcher(
+                self._client,
+                batch_size=self._batch_size,
+                cursor=cursor or True,
+                # the executions were listed by the manager, so there's no
+                # need to make sure they exist
+                execution=Execution({'id': execution_id}),
+                execution_id=execution_id,
+                **list_kwargs)
+            while not stop.is_set():
+                events = []
+                events_fetcher.fetch_and_process_events_batch(
+                    events_handler=events.extend)
+                cursor = events_fetcher.cursor
+                self._put(batches, (
+                    events, cursor.to_dict() if cursor else None), stop)
+                if len(events) < self._batch_size:
+                    break
+        except Exception as e:
+            self._put(batches, e, stop)
+        self._put(batches, None, stop)
+
+    def _put(self, batches, item, stop):
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
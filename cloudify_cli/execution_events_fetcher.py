@@ -15,9 +15,16 @@
 ############
 
 
+import json
 import time
+import queue
+import random
+import threading
+from collections import Counter, deque
+from collections.abc import Mapping
 
 from cloudify_rest_client.executions import Execution
+from cloudify_rest_client.responses import ListResponse
 
 from cloudify_cli.exceptions import (
     ExecutionTimeoutError,
@@ -25,41 +32,261 @@ from cloudify_cli.exceptions import (
 
 
 WAIT_FOR_EXECUTION_SLEEP_INTERVAL = 1
+# while no new events arrive, the polling interval grows up to this
+MAX_POLL_INTERVAL = 15
+POLL_BACKOFF_FACTOR = 1.5
+POLL_JITTER = 0.2
+# how many batches of events to fetch ahead while waiting for an execution,
+# so catching up with many events doesn't wait for each request in turn
+WAIT_EVENTS_PREFETCH = 2
 WORKFLOW_END_TYPES = {u'workflow_succeeded', u'workflow_failed',
                       u'workflow_cancelled'}
 
 
-class ExecutionEventsFetcher(object):
+def event_key(event):
+    """Identify an event, to tell if it was already seen"""
+    if 'id' in event:
+        return event['id']
+    # events without an id are told apart by their contents; identical
+    # events are counted, so they're not lost either
+    return json.dumps(event, sort_keys=True, default=str)
+
+
+class EventsCursor(object):
+    """The position after the last event seen, in reported_timestamp order.
+
+    Events are resumed from the timestamp of the last event seen, so the
+    events seen with that exact timestamp are returned again, and need to
+    be skipped.
+    """
+
+    def __init__(self):
+        self.timestamp = None
+        # how many times each event with that timestamp was seen
+        self._seen = Counter()
+        self._skip = Counter()
+
+    @property
+    def repeated_count(self):
+        """How many of the resumed events were already seen"""
+        return sum(self._seen.values())
+
+    def resume(self):
+        """Start receiving the events from the cursor again"""
+        self._skip = Counter(self._seen)
+
+    def new_events(self, events):
+        """Filter out the events that were seen before resuming"""
+        new_events = []
+        for event in events:
+            if self._skip and \
+                    event.get('reported_timestamp') == self.timestamp:
+                key = event_key(event)
+                if self._skip[key] > 0:
+                    self._skip[key] -= 1
+                    continue
+            new_events.append(event)
+        return new_events
+
+    def advance(self, events):
+        """Move the cursor past events, which are sorted by timestamp"""
+        if not events:
+            return
+        last_timestamp = events[-1].get('reported_timestamp')
+        if last_timestamp != self.timestamp:
+            self.timestamp = last_timestamp
+            self._seen = Counter()
+        for event in reversed(events):
+            if event.get('reported_timestamp') != last_timestamp:
+                break
+            self._seen[event_key(event)] += 1
+
+    def to_dict(self):
+        """The cursor's position, to resume from in another process"""
+        return {
+            'timestamp': self.timestamp,
+            'seen': [[key, count] for key, count in self._seen.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, position):
+        cursor = cls()
+        cursor.timestamp = position['timestamp']
+        cursor._seen = Counter(
+            {key: count for key, count in position['seen']})
+        return cursor
+
 
-    CONTEXT_FIELDS = [
+class EventRecord(Mapping):
+    """An event, as returned by the events API.
+
+    The API payload is kept as it is, and the record reads as the
+    structure expected by `cloudify.event.Event`, with the event's
+    `context` and `message` built on first use. Events which are only
+    written out as JSON are never remapped.
+    """
+
+    CONTEXT_FIELDS = (
         'deployment_id',
         'execution_id',
         'node_name',
         'operation',
         'workflow_id',
-    ]
+    )
+    # payload fields which are moved into the context
+    MAPPED_FIELDS = frozenset(CONTEXT_FIELDS + (
+        'node_instance_id',
+        'source_id',
+        'target_id',
+        'error_causes',
+    ))
+
+    __slots__ = ('payload', '_raw', '_context', '_message')
+
+    def __init__(self, payload, raw=None):
+        """
+        :param payload: the event, as returned by the API
+        :param raw: the JSON text of the payload, if it was received as-is
+        """
+        self.payload = payload
+        self._raw = raw
+        self._context = None
+        self._message = None
+
+    @property
+    def context(self):
+        if self._context is None:
+            payload = self.payload
+            context = {field: payload.get(field)
+                       for field in self.CONTEXT_FIELDS}
+            context['node_id'] = payload.get('node_instance_id')
+            if 'source_id' in payload:
+                context['source_id'] = payload['source_id']
+                context['target_id'] = payload.get('target_id')
+            context['task_error_causes'] = payload.get('error_causes')
+            self._context = context
+        return self._context
+
+    @property
+    def message(self):
+        if self._message is None:
+            self._message = {
+                'arguments': None,
+                'text': self.payload.get('message'),
+            }
+        return self._message
+
+    def to_json(self):
+        """The payload's JSON text, without remapping it"""
+        if self._raw is None:
+            self._raw = json.dumps(self.payload)
+        return self._raw
+
+    def __getitem__(self, key):
+        if key == 'context':
+            return self.context
+        if key == 'message':
+            return self.message
+        if key in self.MAPPED_FIELDS:
+            raise KeyError(key)
+        return self.payload[key]
+
+    def __iter__(self):
+        for key in self.payload:
+            if key not in self.MAPPED_FIELDS and key != 'message':
+                yield key
+        yield 'context'
+        yield 'message'
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return 'EventRecord({0!r})'.format(self.payload)
+
+
+class ExecutionEventsFetcher(object):
+
+    CONTEXT_FIELDS = list(EventRecord.CONTEXT_FIELDS)
 
     def __init__(self,
                  client,
                  batch_size=100,
+                 cursor=True,
+                 execution=None,
+                 prefetch=0,
+                 events_cache=None,
                  **list_kwargs):
+        """
+        :param cursor: fetch consecutive batches using the timestamp of the
+            last event seen, rather than an ever-growing offset, which
+            costs the manager more and more as the events accumulate.
+            Falls back to offsets if the events can't be paged that way.
+            Pass an EventsCursor to fetch the events after it.
+        :param execution: the execution (or execution group) whose events
+            are fetched, if the caller already has it. Otherwise, it's
+            fetched to make sure that it exists.
+        :param prefetch: in fetch_and_process_events, fetch up to this many
+            batches in a background thread, while the events handler is
+            processing the previous batch
+        :param events_cache: look up the events of an ended execution in
+            this EventsCache, rather than fetching them from the manager
+            every time, and store the batches fetched by
+            fetch_and_process_events_batch in it. Requires the execution.
+        """
         self._client = client
         self._list_kwargs = list_kwargs
         self._batch_size = batch_size
         self._from_event = 0
+        self._use_cursor = bool(cursor)
+        self._cursor = cursor if isinstance(cursor, EventsCursor) \
+            else EventsCursor()
+        # after a given cursor, the offsets of the events aren't known
+        self._offsets_known = not isinstance(cursor, EventsCursor)
+        self._prefetch = prefetch
+        self._execution = execution
+        self._events_cache = events_cache
+        # batches which were prefetched, but not processed
+        self._prefetched = deque()
         # make sure execution/group exists before proceeding
-        # a 404 will be raised otherwise
-        if 'execution_id' in list_kwargs:
-            self._client.executions.get(list_kwargs['execution_id'])
-        elif 'execution_group_id' in list_kwargs:
-            self._client.execution_groups.get(
-                list_kwargs['execution_group_id'])
+        # a 404 will be raised otherwise. If the execution (or group) was
+        # given, it was already fetched.
+        if execution is None:
+            if 'execution_id' in list_kwargs:
+                self._client.executions.get(list_kwargs['execution_id'])
+            elif 'execution_group_id' in list_kwargs:
+                self._client.execution_groups.get(
+                    list_kwargs['execution_group_id'])
+
+    @property
+    def cursor(self):
+        """The position after the events fetched so far.
+
+        This is None if the events are fetched by offset.
+        """
+        return self._cursor if self._use_cursor else None
 
     def fetch_and_process_events_batch(self,
                                        events_handler=None,
                                        offset=None,
                                        size=None):
-        events_list_response = self._fetch_events_batch(offset, size)
+        events_list_response = None
+        if self._events_cache is not None:
+            events_list_response = self._get_cached_events(offset, size)
+        if events_list_response is None:
+            first_event = offset if offset is not None else self._from_event
+            events_list_response = self._fetch_events_batch(offset, size)
+            if self._events_cache is not None and self._offsets_known:
+                self._events_cache.add_events(
+                    self._execution,
+                    self._list_kwargs,
+                    first_event,
+                    events_list_response.items,
+                    events_list_response.metadata.pagination.total)
+        return self._process_events_batch(
+            events_list_response, events_handler)
+
+    def _process_events_batch(self, events_list_response, events_handler):
         total_events = events_list_response.metadata.pagination.total
         events = [
             self._map_api_event_to_internal_event(event)
@@ -70,9 +297,21 @@ class ExecutionEventsFetcher(object):
 
         return len(events), total_events
 
+    def _get_cached_events(self, offset=None, size=None):
+        events_list_response = self._events_cache.get_events(
+            self._execution,
+            self._list_kwargs,
+            offset=offset if offset is not None else self._from_event,
+            size=size if size is not None else self._batch_size)
+        if events_list_response is not None and offset is None:
+            self._from_event += len(events_list_response)
+        return events_list_response
+
     def _fetch_events_batch(self, offset=None, size=None):
-        offset = offset if offset is not None else self._from_event
         size = size if size is not None else self._batch_size
+        if offset is None and self._use_cursor:
+            return self._fetch_events_after_cursor(size)
+        offset = offset if offset is not None else self._from_event
         events_list_response = self._client.events.list(
             _offset=offset,
             _size=size,
@@ -82,45 +321,68 @@ class ExecutionEventsFetcher(object):
         self._from_event += len(events_list_response)
         return events_list_response
 
-    def _map_api_event_to_internal_event(self, event):
+    def _fetch_events_after_cursor(self, size):
+        repeated_count = self._cursor.repeated_count
+        if repeated_count >= size:
+            # more events share a single timestamp than fit in a batch, so
+            # paging by timestamp would return more repeated events than
+            # new ones
+            self._use_cursor = False
+            return self._fetch_events_batch(size=size)
+        list_kwargs = dict(self._list_kwargs)
+        if self._cursor.timestamp is not None:
+            # the cursor is never earlier than the from_datetime the user
+            # asked for, because it's the timestamp of an event found with it
+            list_kwargs['from_datetime'] = self._cursor.timestamp
+        # the events seen at the cursor are returned again, so ask for
+        # enough events to still make a full batch of new ones
+        events_list_response = self._client.events.list(
+            _offset=0,
+            _size=size + repeated_count,
+            sort='reported_timestamp',
+            **list_kwargs
+        )
+        events = events_list_response.items
+        if any('reported_timestamp' not in event for event in events):
+            # can't page by timestamp. This only happens in the first batch,
+            # which is the same as the first batch when paging by offset
+            self._use_cursor = False
+            self._from_event += len(events)
+            return events_list_response
+
+        self._cursor.resume()
+        new_events = self._cursor.new_events(events)[:size]
+        events_before_cursor = self._from_event - repeated_count
+        self._from_event += len(new_events)
+        self._cursor.advance(new_events)
+
+        # the total returned is of the events since the cursor, but the
+        # caller expects the total number of events
+        pagination = events_list_response.metadata.pagination
+        metadata = dict(events_list_response.metadata)
+        metadata['pagination'] = dict(
+            pagination, total=pagination.total + events_before_cursor)
+        return ListResponse(new_events, metadata)
+
+    def _map_api_event_to_internal_event(self, event, raw=None):
         """Map data structure from API to internal.
 
-        This method adapts the data structure returned by the events API
-        endpoint to the structure expected by `cloudify.event.Event`.
-
-        Note: the event is modified in place, so even though the value is
-        returned, the original data structure is not preserved.
+        The event is wrapped in an `EventRecord`, which presents it in the
+        structure expected by `cloudify.event.Event`, without modifying it.
 
         :param event: Event in API format
         :type event: dict(str)
+        :param raw: the JSON text of the event, if it was received as-is
         :return: Event in internal format
-        :rtype: dict(str)
+        :rtype: EventRecord
 
         """
-        event['context'] = {
-            context_field: event[context_field]
-            for context_field in self.CONTEXT_FIELDS
-        }
-        for context_field in self.CONTEXT_FIELDS:
-            del event[context_field]
-
-        event['context']['node_id'] = event['node_instance_id']
-        if 'source_id' in event:
-            event['context']['source_id'] = event['source_id']
-            event['context']['target_id'] = event['target_id']
-        del event['node_instance_id']
-
-        event['message'] = {
-            'arguments': None,
-            'text': event['message'],
-        }
-
-        event['context']['task_error_causes'] = event['error_causes']
-        del event['error_causes']
-
-        return event
+        return EventRecord(event, raw)
 
     def fetch_and_process_events(self, events_handler=None, timeout=60):
+        if self._prefetch:
+            return self._fetch_and_process_prefetched_events(
+                events_handler, timeout)
         total_events_count = 0
         # timeout can be None (never time out), for example when tail is used
         if timeout is not None:
@@ -128,10 +390,7 @@ class ExecutionEventsFetcher(object):
 
         while True:
             if timeout is not None and time.time() > deadline:
-                raise EventProcessingTimeoutError(
-                    self._list_kwargs.get('execution_id') or
-                    self._list_kwargs.get('execution_group_id'),
-                    'events/log fetching timed out')
+                raise self._timeout_error()
 
             events_batch_count, _ = self.fetch_and_process_events_batch(
                 events_handler=events_handler)
@@ -144,6 +403,166 @@ class ExecutionEventsFetcher(object):
 
         return total_events_count
 
+    def _timeout_error(self):
+        return EventProcessingTimeoutError(
+            self._list_kwargs.get('execution_id') or
+            self._list_kwargs.get('execution_group_id'),
+            'events/log fetching timed out')
+
+    def _fetch_and_process_prefetched_events(self, events_handler, timeout):
+        """Like fetch_and_process_events, but fetch the batches ahead.
+
+        The batches are fetched by a background thread, into a queue of
+        up to `prefetch` batches, so that the next batch is already on its
+        way while the handler processes the current one.
+        """
+        if timeout is not None:
+            deadline = time.time() + timeout
+        batches = queue.Queue(maxsize=self._prefetch)
+        # the batch that the fetcher had when it was stopped
+        unqueued = []
+        stop = threading.Event()
+        fetcher = threading.Thread(
+            target=self._prefetch_events_batches,
+            args=(batches, unqueued, stop))
+        fetcher.daemon = True
+        fetcher.start()
+
+        total_events_count = 0
+        try:
+            while True:
+                if self._prefetched:
+                    batch = self._prefetched.popleft()
+                else:
+                    remaining = None
+                    if timeout is not None:
+                        remaining = deadline - time.time()
+                        if remaining <= 0:
+                            raise self._timeout_error()
+                    try:
+                        batch = batches.get(timeout=remaining)
+                    except queue.Empty:
+                        raise self._timeout_error()
+                    if isinstance(batch, Exception):
+                        raise batch
+                events_batch_count, _ = self._process_events_batch(
+                    batch, events_handler)
+                total_events_count += events_batch_count
+                if events_batch_count < self._batch_size:
+                    break
+        finally:
+            stop.set()
+            fetcher.join()
+            # keep the batches that were fetched but not processed, for
+            # the next call
+            leftover = []
+            while not batches.empty():
+                leftover.append(batches.get())
+            leftover.extend(unqueued)
+            self._prefetched.extend(
+                batch for batch in leftover
+                if not isinstance(batch, Exception))
+        return total_events_count
+
+    def _prefetch_events_batches(self, batches, unqueued, stop):
+        while not stop.is_set():
+            try:
+                batch = self._fetch_events_batch()
+            except Exception as e:
+                batch = e
+            while True:
+                try:
+                    batches.put(batch, timeout=0.1)
+                    break
+                except queue.Full:
+                    if stop.is_set():
+                        unqueued.append(batch)
+                        return
+            if isinstance(batch, Exception) or \
+                    len(batch) < self._batch_size:
+                return
+
+
+class PollingScheduler(object):
+    """Pace the polling of a running execution and its events.
+
+    While new events keep arriving, the polls are `min_interval` apart.
+    While nothing new arrives, the interval grows exponentially (with some
+    jitter, so that many waiting clients don't poll in lockstep), up to
+    `max_interval`.
+
+    The status doesn't need to be fetched while events are flowing: the
+    execution is evidently still running, and its end would be announced
+    by a workflow-end event. It's still fetched at least every
+    `max_interval`, because not every ending emits such an event. Once a
+    workflow-end event was seen, the status is fetched in every poll,
+    because it's only updated shortly after that event.
+
+    Use watch_end_events=False when the events are of several executions
+    (eg. of an execution group), where one of them ending doesn't mean
+    that the polled status is about to change.
+    """
+
+    def __init__(self,
+                 min_interval=WAIT_FOR_EXECUTION_SLEEP_INTERVAL,
+                 max_interval=MAX_POLL_INTERVAL,
+                 backoff_factor=POLL_BACKOFF_FACTOR,
+                 jitter=POLL_JITTER,
+                 watch_end_events=True):
+        self._watch_end_events = watch_end_events
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._backoff_factor = backoff_factor
+        self._jitter = jitter
+        self.interval = min_interval
+        self.end_event_seen = False
+        # the events processed since the last wait, and since the status
+        # was last fetched
+        self._new_events = 0
+        self._events_since_status = 0
+        # the time slept since the status was last fetched, or None if it
+        # was never fetched
+        self._since_status = None
+
+    def events_handler(self, events_handler=None):
+        """Wrap events_handler, to keep track of the events processed"""
+        def _handler(events):
+            self._new_events += len(events)
+            self._events_since_status += len(events)
+            if self._watch_end_events and any(
+                    event.get('event_type') in WORKFLOW_END_TYPES
+                    for event in events):
+                self.end_event_seen = True
+            if events_handler:
+                events_handler(events)
+        return _handler
+
+    def should_fetch_status(self):
+        return (self._since_status is None or
+                self.end_event_seen or
+                not self._events_since_status or
+                self._since_status >= self._max_interval)
+
+    def status_fetched(self):
+        self._since_status = 0
+        self._events_since_status = 0
+
+    def wait(self, timeout=None):
+        """Sleep until the next poll, but no longer than timeout"""
+        if self._new_events or self.end_event_seen:
+            self.interval = self._min_interval
+        else:
+            self.interval = min(self.interval * self._backoff_factor,
+                                self._max_interval)
+        self._new_events = 0
+        interval = self.interval * random.uniform(
+            1 - self._jitter, 1 + self._jitter)
+        if timeout is not None:
+            interval = max(0, min(interval, timeout))
+        if self._since_status is not None:
+            self._since_status += interval
+        time.sleep(interval)
+
 
 def get_deployment_environment_creation_execution(client, deployment_id):
     executions = client.executions.list(deployment_id=deployment_id)
@@ -171,9 +590,13 @@ def wait_for_execution(client,
         deadline = time.time() + timeout
 
     events_fetcher = ExecutionEventsFetcher(client,
+                                            execution=execution,
                                             execution_id=execution.id,
                                             include_logs=include_logs,
-                                            from_datetime=from_datetime)
+                                            from_datetime=from_datetime,
+                                            prefetch=WAIT_EVENTS_PREFETCH)
+    scheduler = PollingScheduler()
+    events_handler = scheduler.events_handler(events_handler)
 
     # Poll for execution status and execution logs, until execution ends
     execution_ended = False
@@ -190,8 +613,9 @@ def wait_for_execution(client,
                 # update the remaining timeout
                 timeout = deadline - time.time()
 
-        if not execution_ended:
+        if not execution_ended and scheduler.should_fetch_status():
             execution = client.executions.get(execution.id)
+            scheduler.status_fetched()
             execution_ended = execution.status in Execution.END_STATES
 
         events_fetcher.fetch_and_process_events(
@@ -200,7 +624,7 @@ def wait_for_execution(client,
         if execution_ended:
             break
 
-        time.sleep(WAIT_FOR_EXECUTION_SLEEP_INTERVAL)
+        scheduler.wait(timeout)
 
     return execution
 
@@ -225,9 +649,13 @@ def wait_for_execution_group(client,
 
     events_fetcher = ExecutionEventsFetcher(
         client,
+        execution=execution_group,
         execution_group_id=execution_group.id,
         include_logs=include_logs,
-        from_datetime=from_datetime)
+        from_datetime=from_datetime,
+        prefetch=WAIT_EVENTS_PREFETCH)
+    scheduler = PollingScheduler(watch_end_events=False)
+    events_handler = scheduler.events_handler(events_handler)
 
     # Poll for execution status and execution logs, until execution ends
     group_finished = False
@@ -244,8 +672,9 @@ def wait_for_execution_group(client,
                 # update the remaining timeout
                 timeout = deadline - time.time()
 
-        if not group_finished:
+        if not group_finished and scheduler.should_fetch_status():
             execution_group = client.execution_groups.get(execution_group.id)
+            scheduler.status_fetched()
             group_finished = execution_group.status in Execution.END_STATES
 
         events_fetcher.fetch_and_process_events(
@@ -254,6 +683,6 @@ def wait_for_execution_group(client,
         if group_finished:
             break
 
-        time.sleep(WAIT_FOR_EXECUTION_SLEEP_INTERVAL)
+        scheduler.wait(timeout)
 
     return execution_group
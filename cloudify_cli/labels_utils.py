@@ -10,14 +10,19 @@ from cloudify_cli.utils import explicit_tenant_name_message
 
 def serialize_resource_labels(resource_list):
     for element in resource_list:
-        resource_labels_list = []
-        raw_labels_list = element.get('labels')
-        if raw_labels_list:
-            for raw_label in raw_labels_list:
-                label_value = _format_label_value(raw_label.value)
-                resource_labels_list.append(raw_label.key + ':' +
-                                            label_value.strip('""'))
-            element['labels'] = '"{0}"'.format(','.join(resource_labels_list))
+        serialize_labels(element)
+
+
+def serialize_labels(element):
+    resource_labels_list = []
+    raw_labels_list = element.get('labels')
+    if raw_labels_list:
+        for raw_label in raw_labels_list:
+            label_value = _format_label_value(raw_label.value)
+            resource_labels_list.append(raw_label.key + ':' +
+                                        label_value.strip('""'))
+        element['labels'] = '"{0}"'.format(','.join(resource_labels_list))
+    return element
 
 
 def list_labels(resource_id,
@@ -25,13 +25,12 @@ import logging.config
 from datetime import datetime
 from contextlib import contextmanager
 
-import colorama
-
-from cloudify import logs
-
 from cloudify_cli import env
 from cloudify_cli.config.config import CloudifyConfig, is_use_colors
-from cloudify_cli.colorful_event import ColorfulEvent, ColorfulGroupEvent
+
+# cloudify.logs (which pulls in the rest client and requests) and colorama
+# are imported by the functions that need them, so that importing this
+# module stays cheap
 
 DEFAULT_LOG_FILE = os.path.join(env.CLOUDIFY_WORKDIR, 'logs', 'cli.log')
 
@@ -43,6 +42,8 @@ QUIET = -1
 
 verbosity_level = NO_VERBOSE
 json_output = False
+# json, ndjson or csv
+json_output_format = 'json'
 extended_view = False
 
 _lgr = None
@@ -109,6 +110,9 @@ def configure_loggers():
     # (this will also affect local workflow loggers, which don't use
     # the get_events_logger method of this module)
     if is_use_colors():
+        import colorama
+        from cloudify import logs
+        from cloudify_cli.colorful_event import ColorfulEvent
         logs.EVENT_CLASS = ColorfulEvent
         # refactor this elsewhere if colorama is further used in CLI
         colorama.init(autoreset=True)
@@ -164,13 +168,19 @@ def get_events_logger(json_output=False, with_names=False):
 
     def json_events_logger(events):
         """The json events logger prints events as consumable JSON formatted
-        entries. Each event appears in its own line.
+        entries. Each event appears in its own line, as it was returned
+        by the API.
 
         :param events: The events to print.
         :return:
         """
-        for event in events:
-            click.echo(json.dumps(event))
+        lines = [
+            event.to_json() if hasattr(event, 'to_json')
+            else json.dumps(event)
+            for event in events
+        ]
+        if lines:
+            click.echo('\n'.join(lines))
 
     def text_events_logger(events):
         """The default events logger prints events as short messages.
@@ -178,6 +188,9 @@ def get_events_logger(json_output=False, with_names=False):
         :param events: The events to print.
         :return:
         """
+        from cloudify import logs
+        from cloudify_cli.colorful_event import ColorfulGroupEvent
+        lines = []
         for event in events:
             event_class = None
             if event.get('execution_group_id') is not None:
@@ -185,7 +198,9 @@ def get_events_logger(json_output=False, with_names=False):
             with _nest_event_class(event_class):
                 output = logs.create_event_message_prefix(event, with_names)
             if output:
-                click.echo(output)
+                lines.append(output)
+        if lines:
+            click.echo('\n'.join(lines))
 
     return json_events_logger if json_output else text_events_logger
 
@@ -193,6 +208,7 @@ def get_events_logger(json_output=False, with_names=False):
 def set_global_verbosity_level(verbose):
     """Set the global verbosity level.
     """
+    from cloudify import logs
     global verbosity_level
     verbosity_level = verbose
     logs.EVENT_VERBOSITY_LEVEL = verbosity_level
@@ -204,15 +220,24 @@ def get_global_verbosity():
     return verbosity_level
 
 
-def set_global_json_output(enabled=False):
-    global json_output
+def set_global_json_output(enabled=False, output_format='json'):
+    """Output machine-readable data instead of tables and logs.
+
+    :param output_format: json, ndjson or csv: how tables are written
+    """
+    global json_output, json_output_format
     json_output = enabled
+    json_output_format = output_format
 
 
 def get_global_json_output():
     return json_output
 
 
+def get_global_json_output_format():
+    return json_output_format
+
+
 def set_global_extended_view(enabled=False):
     global extended_view
     extended_view = enabled
@@ -238,6 +263,7 @@ class CloudifyJSONEncoder(json.JSONEncoder):
 
 @contextmanager
 def _nest_event_class(event_class):
+    from cloudify import logs
     prev_event_class = logs.EVENT_CLASS
     if event_class:
         logs.EVENT_CLASS = event_class
@@ -1,66 +1,84 @@
+import os
+import sys
 import click
 import importlib
 
 from cloudify_cli import env
-from cloudify_cli.cli import cfy
+from cloudify_cli import daemon as cfy_daemon
+from cloudify_cli.cli import manifest
 
 
-class LazyLoadedCommand(click.Command):
-    def __init__(self, import_spec, **kwargs):
-        super(LazyLoadedCommand, self).__init__(**kwargs)
-        self._import_spec = import_spec
-        self._command = None
+class _LazyLoadedMixin(object):
+    """Import the real command only when it's needed.
 
-    def _get_command(self):
-        if self._command is None:
-            module_name, group_name = self._import_spec
+    Help pages, usage errors and shell completion are served from the
+    command manifest (see cloudify_cli.cli.manifest), if it's available.
+    """
+    def _init_lazy(self, import_spec):
+        self.import_spec = import_spec
+        self._loaded = None
+
+    def load(self):
+        if self._loaded is None:
+            module_name, attr_name = self.import_spec
             module = importlib.import_module(module_name)
-            self._command = getattr(module, group_name)
-        return self._command
+            self._loaded = getattr(module, attr_name)
+        return self._loaded
 
-    def invoke(self, *a, **kw):
-        return self._get_command().invoke(*a, **kw)
+    def get_manifest_command(self):
+        return manifest.get_command(self.import_spec, self.name)
 
-    def get_usage(self, *a, **kw):
-        return self._get_command().get_usage(*a, **kw)
+    def _target(self, ctx):
+        if self._loaded is None and ctx is not None and (
+                ctx.resilient_parsing or
+                ctx.meta.get(manifest.SERVED_FROM_MANIFEST)):
+            manifest_command = self.get_manifest_command()
+            if manifest_command is not None:
+                return manifest_command
+        return self.load()
 
-    def get_help(self, *a, **kw):
-        return self._get_command().get_help(*a, **kw)
+    def parse_args(self, ctx, args):
+        if manifest.SERVED_FROM_MANIFEST not in ctx.meta:
+            ctx.meta[manifest.SERVED_FROM_MANIFEST] = manifest.serves(
+                self.get_manifest_command(), args,
+                info_name=ctx.info_name, parent=ctx.parent)
+        return self._target(ctx).parse_args(ctx, args)
 
-    def get_params(self, *a, **kw):
-        return self._get_command().get_params(*a, **kw)
+    def invoke(self, ctx):
+        return self._target(ctx).invoke(ctx)
 
+    def get_usage(self, ctx):
+        return self._target(ctx).get_usage(ctx)
 
-class LazyLoadedGroup(click.Group):
-    def __init__(self, import_spec, **kwargs):
-        super(LazyLoadedGroup, self).__init__(**kwargs)
-        self._import_spec = import_spec
-        self._group = None
+    def get_help(self, ctx):
+        return self._target(ctx).get_help(ctx)
 
-    def _get_group(self):
-        if self._group is None:
-            module_name, group_name = self._import_spec
-            module = importlib.import_module(module_name)
-            self._group = getattr(module, group_name)
-        return self._group
+    def get_params(self, ctx):
+        return self._target(ctx).get_params(ctx)
+
+    def shell_complete(self, ctx, incomplete):
+        return self._target(ctx).shell_complete(ctx, incomplete)
 
-    def get_command(self, *a, **kw):
-        return self._get_group().get_command(*a, **kw)
 
-    def list_commands(self, *a, **kw):
-        return self._get_group().list_commands(*a, **kw)
+class LazyLoadedCommand(_LazyLoadedMixin, click.Command):
+    def __init__(self, import_spec, **kwargs):
+        super(LazyLoadedCommand, self).__init__(**kwargs)
+        self._init_lazy(import_spec)
+
 
-    def invoke(self, *a, **kw):
-        return self._get_group().invoke(*a, **kw)
+class LazyLoadedGroup(_LazyLoadedMixin, click.Group):
+    def __init__(self, import_spec, **kwargs):
+        super(LazyLoadedGroup, self).__init__(**kwargs)
+        self._init_lazy(import_spec)
 
-    def get_usage(self, *a, **kw):
-        return self._get_group().get_usage(*a, **kw)
+    def get_command(self, ctx, cmd_name):
+        return self._target(ctx).get_command(ctx, cmd_name)
 
-    def get_help(self, *a, **kw):
-        return self._get_group().get_help(*a, **kw)
+    def list_commands(self, ctx):
+        return self._target(ctx).list_commands(ctx)
 
-    def get_params(self, *a, **kw):
-        return self._get_group().get_params(*a, **kw)
+    def resolve_command(self, ctx, args):
+        return self._target(ctx).resolve_command(ctx, args)
 
 
 @click.group(
@@ -444,6 +462,36 @@ def community():
     pass
 
 
+@click.group(
+    name='debug',
+    cls=LazyLoadedGroup,
+    import_spec=('cloudify_cli.commands.debug', 'debug'),
+    short_help="Troubleshoot the CLI itself"
+)
+def debug():
+    pass
+
+
+@click.group(
+    name='daemon',
+    cls=LazyLoadedGroup,
+    import_spec=('cloudify_cli.commands.daemon', 'daemon'),
+    short_help="Handle the cfy daemon"
+)
+def daemon():
+    pass
+
+
+@click.command(
+    name='batch',
+    cls=LazyLoadedCommand,
+    import_spec=('cloudify_cli.commands.batch', 'batch'),
+    short_help='Run a batch of cfy commands in a single process'
+)
+def batch():
+    pass
+
+
 @click.command(
     name='install',
     cls=LazyLoadedCommand,
@@ -484,15 +532,80 @@ def local_uninstall():
     pass
 
 
+COMMON_COMMANDS = [
+    init,
+    status,
+    profiles,
+    idp,
+    ldap,
+    users,
+    agents,
+    events,
+    cluster,
+    cluster_managers,
+    cluster_db_nodes,
+    plugins,
+    tenants,
+    snapshots,
+    log_bundles,
+    user_groups,
+    maintenance_mode,
+    secrets,
+    tokens,
+    nodes,
+    groups,
+    workflows,
+    license,
+    sites,
+    certificates,
+    apply,
+    auditlog,
+    community,
+    debug,
+    daemon,
+    batch,
+]
+MANAGER_COMMANDS = [
+    manager_blueprints,
+    manager_deployments,
+    manager_executions,
+    manager_node_instances,
+    config,
+    permissions,
+    manager_install,
+    manager_uninstall,
+]
+LOCAL_COMMANDS = [
+    local_blueprints,
+    local_deployments,
+    local_executions,
+    local_node_instances,
+    local_install,
+    local_uninstall,
+]
+LAZY_COMMANDS = COMMON_COMMANDS + MANAGER_COMMANDS + LOCAL_COMMANDS
+
+
+def _get_commands():
+    """The commands available with the current profile"""
+    if env.is_manager_active():
+        return COMMON_COMMANDS + MANAGER_COMMANDS
+    return COMMON_COMMANDS + LOCAL_COMMANDS
+
+
 def _make_cfy():
     """Make the commandline click app object
 
     Create the app object and register all the commands on it, based on
     the current profile.
     """
+    from cloudify_cli.cli import cfy
+
     @cfy.group(name='cfy')
     @cfy.options.verbose(expose_value=True)
     @cfy.options.json
+    @cfy.options.timings
+    @cfy.options.timings_file
     @cfy.options.version
     @cfy.options.extended_view
     def _cfy(verbose):
@@ -510,58 +623,57 @@ def _make_cfy():
         """
         cfy.set_cli_except_hook(verbose)
 
-    _cfy.add_command(init)
-    _cfy.add_command(status)
-    _cfy.add_command(profiles)
-
-    _cfy.add_command(idp)
-    _cfy.add_command(ldap)
-    _cfy.add_command(users)
-    _cfy.add_command(agents)
-    _cfy.add_command(events)
-    _cfy.add_command(cluster)
-    _cfy.add_command(cluster_managers)
-    _cfy.add_command(cluster_db_nodes)
-    _cfy.add_command(plugins)
-    _cfy.add_command(tenants)
-    _cfy.add_command(snapshots)
-    _cfy.add_command(log_bundles)
-    _cfy.add_command(user_groups)
-    _cfy.add_command(maintenance_mode)
-    _cfy.add_command(secrets)
-    _cfy.add_command(tokens)
-    _cfy.add_command(nodes)
-    _cfy.add_command(groups)
-    _cfy.add_command(workflows)
-    _cfy.add_command(license)
-    _cfy.add_command(sites)
-    _cfy.add_command(certificates)
-    _cfy.add_command(apply)
-    _cfy.add_command(auditlog)
-    _cfy.add_command(community)
-
-    if env.is_manager_active():
-        _cfy.add_command(manager_blueprints)
-        _cfy.add_command(manager_deployments)
-        _cfy.add_command(manager_executions)
-        _cfy.add_command(manager_node_instances)
-        _cfy.add_command(config)
-        _cfy.add_command(permissions)
-        _cfy.add_command(manager_install)
-        _cfy.add_command(manager_uninstall)
-
-    else:
-        _cfy.add_command(local_blueprints)
-        _cfy.add_command(local_deployments)
-        _cfy.add_command(local_executions)
-        _cfy.add_command(local_node_instances)
-        _cfy.add_command(local_install)
-        _cfy.add_command(local_uninstall)
+    for command in _get_commands():
+        _cfy.add_command(command)
 
     return _cfy
 
 
-_cfy = _make_cfy()
+class LazyLoadedCli(LazyLoadedGroup):
+    """The `cfy` entrypoint.
+
+    Invocations that can be answered from the command manifest (help pages,
+    usage errors and shell completion) are handled here, without importing
+    any of the command modules. Everything else is forwarded to the cfy
+    daemon if it's running (see cloudify_cli.daemon), or passed to the real
+    app object, made by `_make_cfy`.
+    """
+    def load(self):
+        if self._loaded is None:
+            self._loaded = _make_cfy()
+        return self._loaded
+
+    def get_manifest_command(self):
+        return manifest.get_command(
+            self.import_spec, self.name,
+            commands={command.name: command for command in _get_commands()})
+
+    def main(self, args=None, prog_name=None, complete_var=None, **extra):
+        if complete_var is None:
+            complete_var = '_CFY_COMPLETE'
+        if self._loaded is None and (
+                os.environ.get(complete_var) or
+                manifest.serves(self.get_manifest_command(),
+                                sys.argv[1:] if args is None else args,
+                                info_name=self.name)):
+            return super(LazyLoadedCli, self).main(
+                args=args, prog_name=prog_name, complete_var=complete_var,
+                **extra)
+        if args is None:
+            exit_code = cfy_daemon.forward(sys.argv[1:])
+            if exit_code is not None:
+                sys.exit(exit_code)
+        return self.load().main(
+            args=args, prog_name=prog_name, complete_var=complete_var,
+            **extra)
+
+
+_cfy = LazyLoadedCli(
+    name='cfy',
+    import_spec=manifest.ROOT_SPEC,
+    # same as the real app object's, see cfy.CLICK_CONTEXT_SETTINGS
+    context_settings=dict(help_option_names=['-h', '--help']),
+)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,169 @@
+"""A cache of the manager's metadata, like its version and license state.
+
+Many commands ask the manager for its version or license state before
+doing anything, and commands that invoke other commands ask for them
+again. Those rarely change, so they're cached:
+  - in memory, so that a single cfy process only asks once,
+  - in the profile's directory, for METADATA_TTL seconds. After that,
+    they're revalidated with the ETag of the previous response, if the
+    manager sent one.
+"""
+import os
+import copy
+import json
+import time
+import threading
+
+import requests
+
+from cloudify_cli import env
+
+CACHE_FILENAME = 'metadata_cache.json'
+# for how long (in seconds) the cached responses are used without asking
+# the manager again
+METADATA_TTL = 300
+# the GET endpoints which are cached
+METADATA_URIS = ['/version', '/license-check', '/provider/context',
+                 '/managers']
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_metadata_cache(client_profile=None):
+    """The metadata cache of the profile, shared by the whole process"""
+    client_profile = client_profile or env.profile
+    profile_dir = env.get_profile_dir(client_profile.profile_name)
+    if not profile_dir:
+        return None
+    path = os.path.join(profile_dir, CACHE_FILENAME)
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = MetadataCache(path)
+        return _caches[path]
+
+
+def clear_metadata_cache(client_profile=None):
+    """Forget the metadata of the profile's manager"""
+    metadata_cache = get_metadata_cache(client_profile)
+    if metadata_cache is not None:
+        metadata_cache.clear()
+
+
+class MetadataCache(object):
+    def __init__(self, path, ttl=METADATA_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # the responses that were already used by this process
+        self._memo = {}
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _save(self, entries):
+        temp_path = '{0}.{1}.tmp'.format(self.path, os.getpid())
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(entries, f)
+            os.replace(temp_path, self.path)
+        except (IOError, OSError, TypeError, ValueError):
+            # the manager still has the metadata
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def get(self, key):
+        """The cached response, and whether it's still fresh.
+
+        :return: a (response, etag, fresh) tuple, or None if there's no
+            cached response
+        """
+        with self._lock:
+            if key in self._memo:
+                return copy.deepcopy(self._memo[key]), None, True
+            entry = self._load().get(key)
+        if entry is None:
+            return None
+        fresh = time.time() - entry['stored'] < self.ttl
+        if fresh:
+            with self._lock:
+                self._memo[key] = entry['response']
+        return copy.deepcopy(entry['response']), entry.get('etag'), fresh
+
+    def set(self, key, response, etag=None):
+        with self._lock:
+            self._memo[key] = copy.deepcopy(response)
+            entries = self._load()
+            entries[key] = {'response': response, 'etag': etag,
+                            'stored': time.time()}
+            self._save(entries)
+
+    def clear(self):
+        """Forget the cached metadata, eg. after changing the license"""
+        with self._lock:
+            self._memo.clear()
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+class MetadataCacheMixin(object):
+    """Answer the requests for the manager's metadata from a cache.
+
+    Set metadata_cache on the HTTP client to use it.
+    """
+    metadata_cache = None
+
+    def do_request(self, requests_method, uri, data=None, params=None,
+                   headers=None, expected_status_code=200, stream=False,
+                   url_prefix=True, versioned_url=True, timeout=None):
+        request_kwargs = dict(
+            data=data, params=params, headers=headers,
+            expected_status_code=expected_status_code, stream=stream,
+            url_prefix=url_prefix, versioned_url=versioned_url,
+            timeout=timeout)
+        if self.metadata_cache is None or uri not in METADATA_URIS or \
+                requests_method != self._session.get or \
+                data is not None or stream or expected_status_code != 200:
+            return super(MetadataCacheMixin, self).do_request(
+                requests_method, uri, **request_kwargs)
+
+        key = json.dumps([uri, params, versioned_url], sort_keys=True)
+        cached = self.metadata_cache.get(key)
+        if cached is not None and cached[2]:
+            return cached[0]
+        cached_response, etag = cached[:2] if cached else (None, None)
+        received = {}
+
+        def get(request_url, **kwargs):
+            if etag:
+                kwargs['headers'] = dict(kwargs['headers'] or {},
+                                         **{'If-None-Match': etag})
+            response = requests_method(request_url, **kwargs)
+            received['etag'] = response.headers.get('ETag')
+            if response.status_code == 304:
+                # not modified: answer with the cached response instead
+                received['etag'] = received['etag'] or etag
+                response = _cached_response(response, cached_response)
+            return response
+
+        response = super(MetadataCacheMixin, self).do_request(
+            get, uri, **request_kwargs)
+        self.metadata_cache.set(key, response, received.get('etag'))
+        return response
+
+
+def _cached_response(not_modified, cached):
+    response = requests.Response()
+    response.status_code = 200
+    response.reason = 'OK'
+    response._content = json.dumps(cached).encode('utf-8')
+    response.headers = not_modified.headers
+    response.request = not_modified.request
+    response.url = not_modified.url
+    return response
@@ -0,0 +1,139 @@
+"""List all the items of a resource, with `--all`.
+
+Without `--all`, the list commands only show a single page. With it, the
+first page is fetched for the total count, and the rest of the pages are
+fetched concurrently by a few threads, while the items that already
+arrived are printed, in order.
+
+The pages are fetched with separate requests, so the sort has to be a
+total order: when many items have the same value of the sort key, the
+manager might return them in a different order for each page, and then
+some would be on two pages, and others on none. The ID is added to the
+sort, as a tie-breaker.
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+# how many pages are fetched at the same time
+PAGES_WORKERS = 4
+DEFAULT_PAGE_SIZE = 1000
+STABLE_SORT_KEY = 'id'
+
+
+def list_items(list_method, all_pages=False, offset_param='_offset',
+               size_param='_size', **kwargs):
+    """Call list_method with kwargs, or list all its items with all_pages.
+
+    :param list_method: the list method of a rest client, eg.
+        client.deployments.list
+    :param all_pages: list all the items, instead of a single page
+    :param offset_param: the name of list_method's offset argument
+    :param size_param: the name of list_method's page size argument
+    :param kwargs: the arguments of list_method, including `sort`,
+        `is_descending`, and the offset and page size
+    """
+    if not all_pages:
+        return list_method(**kwargs)
+    return AllPages(list_method, offset_param=offset_param,
+                    size_param=size_param, **kwargs)
+
+
+def map_items(function, items):
+    """Apply function to each of the items, and return the results.
+
+    The items of all pages are mapped as they're iterated over, instead
+    of all at once.
+    """
+    if isinstance(items, AllPages):
+        return items.map(function)
+    return [function(item) for item in items]
+
+
+class AllPages(object):
+    """The items of all the pages of a list, in order.
+
+    It can be iterated over once. Its length is the number of items
+    iterated over so far, and its metadata is the first page's.
+    """
+    def __init__(self, list_method, workers=PAGES_WORKERS,
+                 offset_param='_offset', size_param='_size', **kwargs):
+        self._list_method = list_method
+        self._workers = workers
+        self._offset_param = offset_param
+        self._size_param = size_param
+        self._offset = kwargs.pop(offset_param, None) or 0
+        self._size = kwargs.pop(size_param, None) or DEFAULT_PAGE_SIZE
+        self._kwargs = _stable_sort(kwargs)
+        self._functions = []
+        self._count = 0
+        self._first_page = self._fetch(self._offset)
+        self.metadata = self._first_page.metadata
+
+    @property
+    def total(self):
+        return self.metadata.pagination.total
+
+    def map(self, function):
+        self._functions.append(function)
+        return self
+
+    def __len__(self):
+        return self._count
+
+    def __bool__(self):
+        return self.total > self._offset
+
+    def __iter__(self):
+        first_page, self._first_page = self._first_page, None
+        if first_page is None:
+            raise RuntimeError('All the pages were already iterated over')
+        offsets = range(self._offset + self._size, self.total, self._size)
+        for page in self._pages(first_page, offsets):
+            for item in page:
+                for function in self._functions:
+                    item = function(item)
+                self._count += 1
+                yield item
+
+    def _fetch(self, offset):
+        kwargs = dict(self._kwargs)
+        kwargs[self._offset_param] = offset
+        kwargs[self._size_param] = self._size
+        return self._list_method(**kwargs)
+
+    def _pages(self, first_page, offsets):
+        """Generate the pages in order, fetching the next ones meanwhile.
+
+        Only a few pages are fetched ahead, so that the pages that were
+        already printed don't have to be kept.
+        """
+        offsets = iter(offsets)
+        executor = ThreadPoolExecutor(max_workers=self._workers)
+        pending = deque()
+        try:
+            for offset in islice(offsets, self._workers):
+                pending.append(executor.submit(self._fetch, offset))
+            yield first_page
+            while pending:
+                page = pending.popleft().result()
+                offset = next(offsets, None)
+                if offset is not None:
+                    pending.append(executor.submit(self._fetch, offset))
+                yield page
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown()
+
+
+def _stable_sort(kwargs):
+    """Sort by the ID too, for the order of the pages to be the same"""
+    if 'sort' not in kwargs:
+        return kwargs
+    kwargs = dict(kwargs)
+    sort = kwargs.pop('sort') or STABLE_SORT_KEY
+    prefix = '-' if kwargs.pop('is_descending', False) else ''
+    keys = [sort] if sort == STABLE_SORT_KEY else [sort, STABLE_SORT_KEY]
+    kwargs['_sort'] = [prefix + key for key in keys]
+    return kwargs
@@ -0,0 +1,22 @@
+"""The rest client made by env.get_rest_client, for an all-in-one manager.
+
+See cloudify_cli.cluster_client for the client of a cluster.
+"""
+from cloudify_rest_client import CloudifyClient
+from cloudify_rest_client.client import HTTPClient
+
+from cloudify_cli.compression import CompressionMixin
+from cloudify_cli.metadata_cache import MetadataCacheMixin
+from cloudify_cli.session_tokens import SessionTokenMixin
+
+
+class CliHTTPClient(SessionTokenMixin, MetadataCacheMixin, CompressionMixin,
+                    HTTPClient):
+    pass
+
+
+class CliClient(CloudifyClient):
+    """A CloudifyClient which caches the manager's metadata, compresses
+    the requests and responses, and can authenticate with session tokens.
+    """
+    client_class = CliHTTPClient
@@ -0,0 +1,171 @@
+"""Authenticate with short-lived session tokens, instead of a password.
+
+With a username and password, the manager verifies the password hash on
+every request, which is expensive. When session tokens are enabled (with
+`cfy profiles set --session-tokens`, or the CLOUDIFY_SESSION_TOKENS env
+variable), the credentials are exchanged for a token once, and the
+token is used until it's about to expire, or the manager rejects it.
+
+The token is kept in the profile's directory, so that the next cfy
+commands use it too. It's encrypted with a key derived from the
+credentials, so it's only usable by whoever has them anyway.
+"""
+import os
+import json
+import time
+import base64
+import threading
+
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+from cloudify import constants
+from cloudify_rest_client.exceptions import CloudifyClientError
+
+SESSION_TOKEN_FILENAME = 'session_token'
+# how long (in seconds) the tokens are valid for
+SESSION_TOKEN_LIFETIME = 3600
+# a token that expires in less than this (in seconds) is replaced
+REFRESH_MARGIN = 300
+KEY_ITERATIONS = 100000
+SALT_SIZE = 16
+
+_session_tokens = {}
+_session_tokens_lock = threading.Lock()
+
+
+def get_session_token(path, credentials, make_client):
+    """The session token stored at path, shared by the whole process.
+
+    :param credentials: the credentials that the token is for, as a
+        string. The token is encrypted with a key derived from them.
+    :param make_client: a function returning a client that authenticates
+        with the credentials, used to create the tokens
+    """
+    with _session_tokens_lock:
+        key = (path, credentials)
+        if key not in _session_tokens:
+            _session_tokens[key] = SessionToken(path, credentials, make_client)
+        return _session_tokens[key]
+
+
+class SessionToken(object):
+    def __init__(self, path, credentials, make_client,
+                 lifetime=SESSION_TOKEN_LIFETIME):
+        self.path = path
+        self.lifetime = lifetime
+        self._credentials = credentials.encode('utf-8')
+        self._make_client = make_client
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._value = None
+        self._expires = 0
+
+    def get(self):
+        """A token that isn't about to expire.
+
+        It's the one this process already has, or the one stored by
+        another cfy process, or a new one.
+        """
+        with self._lock:
+            if not self._is_fresh():
+                self._load()
+            if not self._is_fresh():
+                self._create()
+            return self._value
+
+    def refresh(self, rejected):
+        """Replace the token that the manager rejected.
+
+        Other threads might have replaced it already, so that the manager
+        only gets a single request for a new token.
+        """
+        with self._lock:
+            if self._value == rejected:
+                self._create()
+            return self._value
+
+    def _is_fresh(self):
+        return self._value is not None and \
+            self._expires - time.time() > REFRESH_MARGIN
+
+    def _key(self, salt):
+        if salt not in self._keys:
+            kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32,
+                             salt=salt, iterations=KEY_ITERATIONS)
+            self._keys[salt] = Fernet(
+                base64.urlsafe_b64encode(kdf.derive(self._credentials)))
+        return self._keys[salt]
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                stored = json.load(f)
+            salt = base64.b64decode(stored['salt'])
+            token = json.loads(self._key(salt).decrypt(
+                stored['token'].encode('utf-8')).decode('utf-8'))
+        except (IOError, OSError, ValueError, KeyError, TypeError,
+                InvalidToken):
+            # there's no token, or it's for other credentials
+            return
+        self._value = token['value']
+        self._expires = token['expires']
+
+    def _create(self):
+        expires = time.time() + self.lifetime
+        token = self._make_client().tokens.create(
+            description='cfy session token',
+            expiration='+{0} minutes'.format(self.lifetime // 60))
+        self._value = token.value
+        self._expires = expires
+        self._save()
+
+    def _save(self):
+        salt = os.urandom(SALT_SIZE)
+        encrypted = self._key(salt).encrypt(json.dumps({
+            'value': self._value,
+            'expires': self._expires,
+        }).encode('utf-8'))
+        temp_path = '{0}.{1}.tmp'.format(self.path, os.getpid())
+        try:
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                         0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump({
+                    'salt': base64.b64encode(salt).decode('utf-8'),
+                    'token': encrypted.decode('utf-8'),
+                }, f)
+            os.replace(temp_path, self.path)
+        except (IOError, OSError):
+            # this process can still use the token
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+class SessionTokenMixin(object):
+    """Authenticate the requests with a session token.
+
+    Set session_token on the HTTP client to use it.
+    """
+    session_token = None
+
+    def do_request(self, *args, **kwargs):
+        if self.session_token is None:
+            return super(SessionTokenMixin, self).do_request(*args, **kwargs)
+        token = self.session_token.get()
+        self._use_session_token(token)
+        try:
+            return super(SessionTokenMixin, self).do_request(*args, **kwargs)
+        except CloudifyClientError as e:
+            data = kwargs.get('data')
+            # a streamed body was already read, so it can't be sent again
+            if e.status_code != 401 or hasattr(data, 'read') or \
+                    hasattr(data, '__next__'):
+                raise
+        self._use_session_token(self.session_token.refresh(token))
+        return super(SessionTokenMixin, self).do_request(*args, **kwargs)
+
+    def _use_session_token(self, token):
+        self.headers.pop(constants.CLOUDIFY_AUTHENTICATION_HEADER, None)
+        self.headers[constants.CLOUDIFY_TOKEN_AUTHENTICATION_HEADER] = token
@@ -15,20 +15,32 @@
 ############
 
 import os
+import re
 import json
+import tempfile
+import textwrap
+from contextlib import nullcontext
 from datetime import datetime
+from itertools import islice
 
+from cloudify_cli import writers
 from cloudify_cli.logger import (
     get_global_json_output,
+    get_global_json_output_format,
     get_global_extended_view,
     CloudifyJSONEncoder,
     output)
-from cloudify_cli.prettytable import PrettyTable
+from cloudify_cli.prettytable import PrettyTable, _str_block_width
+
+# the column widths and types of a table are inferred from this many rows
+STREAM_SAMPLE_SIZE = 1000
+
+_TIMESTAMP = re.compile(r'\d{4}-\d{2}-\d{2}')
 
 
 def generate(cols, data, defaults=None, labels=None):
     """
-    Return a new PrettyTable instance representing the list.
+    Return a new StreamingTable instance representing the list.
 
     Arguments:
 
@@ -52,17 +64,137 @@ def generate(cols, data, defaults=None, labels=None):
                  will be used for the table header
 
     """
-    defaults = defaults or {}
-    labels = labels or {}
-    pt = PrettyTable([labels.get(col, col) for col in cols])
+    return StreamingTable(cols, data, defaults=defaults, labels=labels)
 
-    for d in data:
-        values_row = []
-        for c in cols:
-            values_row.append(get_values_per_column(c, d, defaults))
-        pt.add_row(values_row)
 
-    return pt
+class StreamingTable(object):
+    """A table which is printed as its rows arrive.
+
+    It looks like a PrettyTable, but the rows aren't all kept in memory:
+    the widths of the columns, and which columns are timestamps, are
+    inferred from the first sample_size rows, and then every row is
+    printed as soon as it's read from data, which can be a generator.
+    A longer value than the width of its column is wrapped to more lines.
+
+    With spill, the rows are first written to a temporary file instead,
+    so that the widths are inferred from all of them.
+    """
+    def __init__(self, cols, data, defaults=None, labels=None,
+                 sample_size=STREAM_SAMPLE_SIZE, spill=False):
+        self.cols = cols
+        self.data = data
+        self.defaults = defaults or {}
+        self.labels = labels or {}
+        self.sample_size = sample_size
+        self.spill = spill
+        self.max_width = None
+
+    def __str__(self):
+        return '\n'.join(self.lines())
+
+    def lines(self):
+        """Generate the lines of the table: a row might span several"""
+        rows = iter(self.data)
+        sample = list(islice(rows, self.sample_size))
+        timestamps = [_is_timestamp_column(col, sample) for col in self.cols]
+
+        def _formatted(rows):
+            for row in rows:
+                yield [self._format(col, row, timestamp)
+                       for col, timestamp in zip(self.cols, timestamps)]
+
+        header = [self.labels.get(col, col) for col in self.cols]
+        widths = [_width(label) for label in header]
+        formatted = list(_formatted(sample))
+        del sample
+        with tempfile.TemporaryFile('w+') if self.spill else nullcontext() \
+                as spill_file:
+            if self.spill:
+                for cells in _formatted(rows):
+                    spill_file.write(json.dumps(cells) + '\n')
+                    self._fit(widths, cells)
+                spill_file.seek(0)
+                rows = (json.loads(line) for line in spill_file)
+            else:
+                rows = _formatted(rows)
+            for cells in formatted:
+                self._fit(widths, cells)
+
+            hrule = '+{0}+'.format(
+                '+'.join('-' * (width + 2) for width in widths))
+            yield hrule
+            yield self._row(header, widths)
+            yield hrule
+            for cells in formatted:
+                yield self._row(cells, widths)
+            del formatted
+            for cells in rows:
+                yield self._row(cells, widths)
+            yield hrule
+
+    def _format(self, col, row, timestamp):
+        if col not in row:
+            return str(self.defaults.get(col, 'N/A'))
+        value = row[col]
+        if value and isinstance(value, str):
+            if timestamp and _TIMESTAMP.match(value):
+                value = value.replace('T', ' ').replace('Z', ' ')
+        elif value and isinstance(value, list):
+            value = ','.join(value)
+        elif not value and not isinstance(value, (bool, int)):
+            value = ''
+        return str(value)
+
+    def _fit(self, widths, cells):
+        for index, cell in enumerate(cells):
+            width = max(_width(line) for line in cell.split('\n'))
+            if self.max_width:
+                width = min(width, self.max_width)
+            if width > widths[index]:
+                widths[index] = width
+
+    def _row(self, cells, widths):
+        columns = []
+        for cell, width in zip(cells, widths):
+            lines = []
+            for line in cell.split('\n'):
+                if _width(line) > width:
+                    lines.extend(textwrap.fill(line, width).split('\n'))
+                else:
+                    lines.append(line)
+            columns.append(lines)
+        height = max(len(lines) for lines in columns)
+        return '\n'.join(
+            '|' + '|'.join(
+                ' ' + _center(lines[y] if y < len(lines) else '', width) +
+                ' ' for lines, width in zip(columns, widths)) + '|'
+            for y in range(height))
+
+
+def _is_timestamp_column(col, sample):
+    """Is the column of timestamps, judging by its first value"""
+    for row in sample:
+        value = row.get(col)
+        if value and isinstance(value, str):
+            return get_timestamp(value) is not None
+    return False
+
+
+def _width(text):
+    """The width of the text on a terminal"""
+    if text.isascii() and text.isprintable():
+        return len(text)
+    return _str_block_width(text)
+
+
+def _center(text, width):
+    """Center the text like PrettyTable does"""
+    excess = width - _width(text)
+    left = excess // 2
+    # like str.center, the extra space of odd length text is on the right
+    if excess % 2 and not _width(text) % 2:
+        left += 1
+    return ' ' * left + text + ' ' * (excess - left)
 
 
 def generate_extended(cols, data, defaults=None, labels=None):
@@ -97,7 +229,13 @@ def get_values_per_column(column, row_data, defaults):
 
 
 def display(title, tb):
-    output('{0}{1}{0}{2}{0}'.format(os.linesep, title, tb))
+    if isinstance(tb, StreamingTable):
+        output('{0}{1}'.format(os.linesep, title))
+        for line in tb.lines():
+            output(line)
+        output('')
+    else:
+        output('{0}{1}{0}{2}{0}'.format(os.linesep, title, tb))
 
 
 def format_json_object(cols, item, defaults=None, labels=None):
@@ -111,13 +249,13 @@ def format_json_object(cols, item, defaults=None, labels=None):
     }, cls=CloudifyJSONEncoder)
 
 
-def format_json_output(cols, data, defaults=None, labels=None):
-    # output the json array newline-separated to aid debuggability: makes
+def format_json_output(cols, data, defaults=None, labels=None,
+                       output_format='json'):
+    # the json array is output newline-separated to aid debuggability: makes
     # it possible to analyze the output line-by-line and use eg. grep
-    output('[')
-    output(',\n'.join(
-        format_json_object(cols, item, defaults, labels) for item in data))
-    output(']')
+    writer = writers.WRITERS[output_format](
+        cols, defaults=defaults, labels=labels)
+    writer.write_rows(data)
 
 
 def print_data(columns, items, header_text, max_width=None, defaults=None,
@@ -125,7 +263,8 @@ def print_data(columns, items, header_text, max_width=None, defaults=None,
     """Display the items in a tabular manner.
     """
     if get_global_json_output():
-        format_json_output(columns, items, defaults=defaults, labels=labels)
+        format_json_output(columns, items, defaults=defaults, labels=labels,
+                           output_format=get_global_json_output_format())
     elif get_global_extended_view():
         if not items:
             output("{0}[NO RECORDS]{0}".format(os.linesep))
@@ -149,7 +288,10 @@ def print_single(columns, item, header_text, max_width=None, defaults=None,
     This is similar to the table-generating print_data, but for use when
     it is known that there is only going to be one item.
     """
-    if get_global_json_output():
+    if get_global_json_output() and get_global_json_output_format() == 'csv':
+        format_json_output(columns, [item], defaults=defaults, labels=labels,
+                           output_format='csv')
+    elif get_global_json_output():
         output(format_json_object(
             columns, item, defaults=defaults, labels=labels))
     elif get_global_extended_view():
@@ -15,10 +15,11 @@
 
 import uuid
 
-from mock import patch, PropertyMock, DEFAULT
+from mock import patch, MagicMock
 
 from .test_base import CliCommandTest
 from cloudify_rest_client.client import CLOUDIFY_TENANT_HEADER
+from cloudify_rest_client.exceptions import CloudifyClientError
 from cloudify_rest_client.executions import ExecutionsClient
 from cloudify_rest_client.events import EventsClient
 from cloudify_rest_client.node_instances import NodeInstance
@@ -30,6 +31,8 @@ from cloudify_cli.cli import cfy
 from cloudify_cli.exceptions import CloudifyCliError
 
 from cloudify_cli.commands.agents import (
+    TRACKER_MAX_POLL_FAILURES,
+    ExecutionsTracker,
     get_filters_map,
     get_deployments_and_run_workers)
 
@@ -364,8 +367,7 @@ class AgentsTests(CliCommandTest):
         for call in exec_client_mock.call_args_list:
             self.assertTrue(call[0][2]['install_methods'] == ['provided'])
 
-    @patch.object(ExecutionsClient, 'get',
-                  return_value=Execution({'status': 'terminated'}))
+    @patch('cloudify_cli.execution_events_fetcher.time.sleep')
     @patch.object(EventsClient, 'list',
                   return_value=ListResponse(
                       [],
@@ -373,29 +375,159 @@ class AgentsTests(CliCommandTest):
                           'total': 0,
                           'offset': 0,
                           'size': 10}})))
-    def test_execution_tracking(self, events_list_mock, exec_get_mock):
+    def test_execution_tracking(self, events_list_mock, sleep_mock):
         self.mock_client(AgentsTests.DEFAULT_TOPOLOGY)
+        started = {}
+        list_calls = []
 
         def _mock_execution_start(*args, **kwargs):
             tenant_name = args[0].api.headers.get(CLOUDIFY_TENANT_HEADER)
             deployment_id = args[1]
-            return Execution({'id': str(uuid.uuid4()),
-                              'deployment_id': deployment_id,
-                              'tenant_name': tenant_name})
-
-        def _wait_side_effect(*args, **kwargs):
-            client_tenant = args[0]._client.headers[CLOUDIFY_TENANT_HEADER]
-            execution = args[1]
-            self.assertEquals(client_tenant, execution['tenant_name'])
-            return DEFAULT
-
-        with patch('cloudify_cli.commands.agents.wait_for_execution',
-                   return_value=PropertyMock(error=False),
-                   side_effect=_wait_side_effect), \
-            patch.object(ExecutionsClient, 'start',
-                         _mock_execution_start), \
-                patch('cloudify_cli.commands.agents.time.sleep'):
+            execution = Execution({'id': str(uuid.uuid4()),
+                                   'status': 'pending',
+                                   'deployment_id': deployment_id,
+                                   'tenant_name': tenant_name})
+            started[execution.id] = execution
+            return execution
+
+        def _mock_execution_list(executions_client, id, **kwargs):
+            client_tenant = executions_client.api.headers[
+                CLOUDIFY_TENANT_HEADER]
+            list_calls.append((client_tenant, sorted(id)))
+            results = []
+            for execution_id in id:
+                self.assertEqual(client_tenant,
+                                 started[execution_id]['tenant_name'])
+                results.append(Execution(dict(started[execution_id],
+                                              status='terminated')))
+            return ListResponse(results, {})
 
+        with patch.object(ExecutionsClient, 'start',
+                          _mock_execution_start), \
+                patch.object(ExecutionsClient, 'list', autospec=True,
+                             side_effect=_mock_execution_list):
             get_deployments_and_run_workers(
                 self.client, self._agent_filters(), True, self.logger,
                 'workflow', True)
+
+        # a single request for the status of the executions of each tenant
+        expected_calls = {}
+        for execution in started.values():
+            expected_calls.setdefault(
+                execution['tenant_name'], []).append(execution.id)
+        self.assertEqual(
+            sorted((tenant_name, sorted(execution_ids))
+                   for tenant_name, execution_ids in expected_calls.items()),
+            sorted(list_calls))
+        self.assertEqual(5, events_list_mock.call_count)
+
+    @patch('cloudify_cli.execution_events_fetcher.time.sleep')
+    def test_tracker_fetches_events_every_poll(self, sleep_mock):
+        statuses = iter([
+            ['started', 'started'],
+            ['started', 'started'],
+            ['terminated', 'failed'],
+        ])
+
+        def _mock_execution_list(id, **kwargs):
+            return ListResponse([
+                Execution({'id': execution_id,
+                           'status': status,
+                           'deployment_id': 'd1',
+                           'error': 'boom' if status == 'failed' else ''})
+                for execution_id, status in zip(id, next(statuses))
+            ], {})
+
+        self.client.executions.list = _mock_execution_list
+        self.client.events.list = MagicMock(
+            return_value=ListResponse([], {'pagination': {'total': 0}}))
+        tracker = ExecutionsTracker(
+            [(None, Execution({'id': 'e1', 'status': 'pending'})),
+             (None, Execution({'id': 'e2', 'status': 'pending'}))],
+            'workflow', self.logger)
+        with patch('cloudify_cli.env.get_rest_client',
+                   return_value=self.client):
+            tracker.run()
+
+        # for each execution in each poll, even when its status is the same
+        self.assertEqual(6, self.client.events.list.call_count)
+        self.assertEqual('Executions: 1 done, 1 failed, 0 running',
+                         tracker.progress())
+        self.assertEqual(1, len(tracker.errors))
+        self.assertIn('boom', tracker.errors[0])
+
+    @patch('cloudify_cli.execution_events_fetcher.time.sleep')
+    def test_tracker_execution_not_found(self, sleep_mock):
+        self.client.executions.list = MagicMock(
+            return_value=ListResponse([], {}))
+        tracker = ExecutionsTracker(
+            [(None, Execution({'id': 'e1', 'status': 'pending'}))],
+            'workflow', self.logger)
+        with patch('cloudify_cli.env.get_rest_client',
+                   return_value=self.client):
+            tracker.run()
+        self.assertEqual('Executions: 0 done, 1 failed, 0 running',
+                         tracker.progress())
+        self.assertIn('Execution not found', tracker.errors[0])
+
+    @patch('cloudify_cli.execution_events_fetcher.time.sleep')
+    def test_tracker_retries_failed_poll(self, sleep_mock):
+        self.client.executions.list = MagicMock(side_effect=[
+            CloudifyClientError('unavailable'),
+            CloudifyClientError('unavailable'),
+            ListResponse([Execution({'id': 'e1', 'status': 'terminated',
+                                     'deployment_id': 'd1', 'error': ''})],
+                         {}),
+        ])
+        self.client.events.list = MagicMock(
+            return_value=ListResponse([], {'pagination': {'total': 0}}))
+        tracker = ExecutionsTracker(
+            [(None, Execution({'id': 'e1', 'status': 'pending'}))],
+            'workflow', self.logger)
+        with patch('cloudify_cli.env.get_rest_client',
+                   return_value=self.client):
+            tracker.run()
+        self.assertEqual('Executions: 1 done, 0 failed, 0 running',
+                         tracker.progress())
+        self.assertEqual([], tracker.errors)
+
+    @patch('cloudify_cli.execution_events_fetcher.time.sleep')
+    def test_tracker_retries_failed_events(self, sleep_mock):
+        self.client.executions.list = MagicMock(side_effect=[
+            ListResponse([Execution({'id': 'e1', 'status': status,
+                                     'deployment_id': 'd1', 'error': ''})],
+                         {})
+            for status in ['started', 'started', 'terminated']
+        ])
+        self.client.events.list = MagicMock(side_effect=[
+            CloudifyClientError('unavailable'),
+            ListResponse([{'id': 'ev1', 'message': 'running',
+                           'type': 'cloudify_event'}],
+                         {'pagination': {'total': 1}}),
+            ListResponse([], {'pagination': {'total': 1}}),
+        ])
+        tracker = ExecutionsTracker(
+            [(None, Execution({'id': 'e1', 'status': 'pending'}))],
+            'workflow', self.logger)
+        with patch('cloudify_cli.env.get_rest_client',
+                   return_value=self.client):
+            tracker.run()
+        self.assertEqual('Executions: 1 done, 0 failed, 0 running',
+                         tracker.progress())
+        self.assertEqual([], tracker.errors)
+
+    @patch('cloudify_cli.execution_events_fetcher.time.sleep')
+    def test_tracker_poll_keeps_failing(self, sleep_mock):
+        self.client.executions.list = MagicMock(
+            side_effect=CloudifyClientError('unavailable'))
+        tracker = ExecutionsTracker(
+            [(None, Execution({'id': 'e1', 'status': 'pending'}))],
+            'workflow', self.logger)
+        with patch('cloudify_cli.env.get_rest_client',
+                   return_value=self.client):
+            tracker.run()
+        self.assertEqual(TRACKER_MAX_POLL_FAILURES,
+                         self.client.executions.list.call_count)
+        self.assertEqual('Executions: 0 done, 1 failed, 0 running',
+                         tracker.progress())
+        self.assertIn('unavailable', tracker.errors[0])
@@ -47,6 +47,7 @@ default_manager_params = dict(
     rest_protocol='http',
     rest_certificate=None,
     kerberos_env=False,
+    session_tokens=False,
     manager_username='admin',
     manager_password='admin',
     manager_token=None,
@@ -0,0 +1,157 @@
+import json
+import threading
+import time
+
+from mock import MagicMock
+
+from cloudify_rest_client.exceptions import CloudifyClientError
+
+from cloudify_cli.commands import batch
+from cloudify_cli.exceptions import (
+    CloudifyCliError,
+    SuppressedCloudifyCliError,
+)
+from cloudify_cli.tests.commands.test_base import CliCommandTest
+from cloudify_cli.tests.commands.mocks import MockListResponse
+
+
+class BatchParseTest(CliCommandTest):
+    def test_lines(self):
+        self.assertEqual([
+            (1, ['blueprints', 'list']),
+            (4, ['deployments', 'create', '-b', 'bp 1']),
+        ], batch.parse_batch(
+            'cfy blueprints list\n'
+            '# a comment\n'
+            '\n'
+            'deployments create -b "bp 1"  # another comment\n'))
+
+    def test_json(self):
+        self.assertEqual([
+            (1, ['blueprints', 'list']),
+            (2, ['deployments', 'create', '-b', 'bp 1']),
+        ], batch.parse_batch(json.dumps([
+            'cfy blueprints list',
+            ['deployments', 'create', '-b', 'bp 1'],
+        ])))
+
+    def test_yaml(self):
+        self.assertEqual([
+            (1, ['blueprints', 'list']),
+            (2, ['deployments', 'list']),
+        ], batch.parse_batch(
+            '- blueprints list\n'
+            '- [deployments, list]\n'))
+
+    def test_invalid(self):
+        self.assertRaises(CloudifyCliError, batch.parse_batch, '[1]')
+        self.assertRaises(CloudifyCliError, batch.parse_batch, '[')
+        self.assertRaises(CloudifyCliError, batch.parse_batch,
+                          'blueprints list "')
+
+    def test_sets_output_options(self):
+        for command, expected in [
+            ('blueprints list', False),
+            ('blueprints list --json', True),
+            ('blueprints list --format=json', True),
+            ('blueprints list -vv', True),
+            ('deployments get d1 -x', True),
+            ('blueprints list -t t1', False),
+            ('blueprints list -- --json', False),
+        ]:
+            self.assertEqual(
+                expected, batch.sets_output_options(command.split()),
+                command)
+
+
+class BatchTest(CliCommandTest):
+    def setUp(self):
+        super(BatchTest, self).setUp()
+        self.client.blueprints.list = MagicMock(
+            return_value=MockListResponse())
+        self.client.deployments.list = MagicMock(
+            return_value=MockListResponse())
+
+    def _write_batch(self, content):
+        path = str(self.tmpdir / 'batch.txt')
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def _fail_blueprints_list(self):
+        self.client.blueprints.list.side_effect = \
+            CloudifyClientError('listing failed')
+
+    def test_batch(self):
+        path = self._write_batch('blueprints list\ndeployments list\n')
+        outcome = self.invoke('cfy batch {0}'.format(path))
+        self.assertEqual(1, self.client.blueprints.list.call_count)
+        self.assertEqual(1, self.client.deployments.list.call_count)
+        self.assertIn('Blueprints:', outcome.output)
+        self.assertIn('Deployments:', outcome.output)
+
+    def test_batch_results_json(self):
+        path = self._write_batch('blueprints list\ndeployments list\n')
+        outcome = self.invoke('cfy batch {0} --json'.format(path))
+        # the listings are printed as json too, the results come last
+        results = json.loads(outcome.output[outcome.output.rindex('[\n{'):])
+        self.assertEqual(
+            [(1, 'blueprints list', 0), (2, 'deployments list', 0)],
+            [(r['line'], r['command'], r['exit_code']) for r in results])
+
+    def test_stop_on_error(self):
+        self._fail_blueprints_list()
+        path = self._write_batch('blueprints list\ndeployments list\n')
+        self.invoke('cfy batch {0}'.format(path), err_str_segment='',
+                    exception=SuppressedCloudifyCliError)
+        self.assertEqual(0, self.client.deployments.list.call_count)
+
+    def test_continue_on_error(self):
+        self._fail_blueprints_list()
+        path = self._write_batch('blueprints list\ndeployments list\n')
+        self.invoke('cfy batch {0} --continue-on-error'.format(path),
+                    err_str_segment='',
+                    exception=SuppressedCloudifyCliError)
+        self.assertEqual(1, self.client.deployments.list.call_count)
+
+    def test_usage_error(self):
+        path = self._write_batch('blueprints list --no-such-option\n')
+        outcome = self.invoke('cfy batch {0}'.format(path),
+                              err_str_segment='',
+                              exception=SuppressedCloudifyCliError)
+        self.assertIn('No such option', outcome.output)
+
+    def test_parallel(self):
+        path = self._write_batch(
+            'blueprints list\ndeployments list\nblueprints list\n')
+        outcome = self.invoke('cfy batch {0} --parallel 2'.format(path))
+        self.assertEqual(2, self.client.blueprints.list.call_count)
+        self.assertEqual(1, self.client.deployments.list.call_count)
+        self.assertEqual(2, outcome.output.count('Blueprints:'))
+
+    def test_parallel_output_options_run_alone(self):
+        lock = threading.Lock()
+        running = []
+        overlapping = []
+
+        def _list(name):
+            def _list(*args, **kwargs):
+                with lock:
+                    running.append(name)
+                    overlapping.extend(running if len(running) > 1 else [])
+                time.sleep(0.05)
+                with lock:
+                    running.remove(name)
+                return MockListResponse()
+            return _list
+
+        self.client.blueprints.list.side_effect = _list('blueprints')
+        self.client.deployments.list.side_effect = _list('deployments')
+        path = self._write_batch(
+            'deployments list\nblueprints list --json\n'
+            'deployments list\ndeployments list\n')
+        outcome = self.invoke('cfy batch {0} --parallel 4'.format(path))
+        self.assertEqual(3, self.client.deployments.list.call_count)
+        self.assertNotIn('blueprints', overlapping)
+        # the --json of one command doesn't change the output of the others
+        self.assertEqual(3, outcome.output.count('Deployments:'))
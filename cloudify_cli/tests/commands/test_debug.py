@@ -0,0 +1,68 @@
+import json
+import subprocess
+import sys
+
+from cloudify_cli.commands import debug
+from cloudify_cli.tests.commands.test_base import CliCommandTest
+
+# Importing cloudify_cli.main runs on every single `cfy` invocation, so
+# it must stay cheap: the heavy dependencies are only imported by the
+# commands that use them. How long it takes is measured by
+# `cfy debug import-times cloudify_cli.main`.
+STARTUP_MODULE = 'cloudify_cli.main'
+HEAVY_MODULES = [
+    'yaml',
+    'requests',
+    'colorama',
+    'dsl_parser',
+    'pkg_resources',
+    'cloudify.logs',
+    'cloudify_rest_client',
+    'cloudify_cli.cli.cfy',
+]
+
+IMPORTTIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:      1000 |       1000 | site
+import time:       110 |        110 |   cloudify_cli.constants
+import time:      2500 |      12000 | cloudify_cli.main
+"""
+
+
+class DebugTest(CliCommandTest):
+    def test_parse_import_times(self):
+        self.assertEqual([
+            {'module': 'site', 'self_ms': 1.0, 'cumulative_ms': 1.0},
+            {'module': 'cloudify_cli.constants',
+             'self_ms': 0.1, 'cumulative_ms': 0.1},
+            {'module': 'cloudify_cli.main',
+             'self_ms': 2.5, 'cumulative_ms': 12.0},
+        ], debug.parse_import_times(IMPORTTIME_OUTPUT))
+
+    def test_parse_import_times_of_module(self):
+        self.assertEqual(
+            ['cloudify_cli.constants', 'cloudify_cli.main'],
+            [t['module'] for t in debug.parse_import_times(
+                IMPORTTIME_OUTPUT, 'cloudify_cli.main')])
+
+    def test_import_times(self):
+        outcome = self.invoke(
+            'cfy debug import-times cloudify_cli.constants --json')
+        times = json.loads(outcome.output)
+        self.assertIn('cloudify_cli.constants',
+                      [t['module'] for t in times])
+
+    def test_import_times_missing_module(self):
+        self.invoke('cfy debug import-times cloudify_cli.nonexistent',
+                    err_str_segment='Could not import')
+
+    def test_startup_imports(self):
+        script = (
+            'import sys, {0}\n'
+            'print(",".join(sys.modules))'
+        ).format(STARTUP_MODULE)
+        modules = subprocess.check_output(
+            [sys.executable, '-c', script],
+            universal_newlines=True).strip().split(',')
+        self.assertEqual(
+            [], [m for m in HEAVY_MODULES if m in modules])
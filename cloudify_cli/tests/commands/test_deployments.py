@@ -43,6 +43,7 @@ from cloudify_rest_client.deployment_modifications import (
 )
 from cloudify_rest_client.responses import ListResponse, Metadata
 
+from cloudify_cli.commands.deployments import DEPLOYMENT_COLUMNS
 from cloudify_cli.constants import DEFAULT_TENANT_NAME
 from cloudify_cli.exceptions import CloudifyCliError, CloudifyValidationError
 
@@ -779,6 +780,22 @@ class DeploymentsTest(CliCommandTest):
         call_args = list(self.client.deployments.list.call_args)
         self.assertEqual(call_args[1].get('_search_name'), search_name_pattern)
 
+    def test_list_deployments_columns(self):
+        self.client.deployments.list = Mock(return_value=MockListResponse(
+            items=[{'id': 'd1', 'display_name': 'dep 1'}]))
+        self.invoke('cfy deployments list')
+        self.assertEqual(
+            DEPLOYMENT_COLUMNS,
+            self.client.deployments.list.call_args[1]['_include'])
+
+        outcome = self.invoke(
+            'cfy deployments list --columns id,display_name --json')
+        self.assertEqual(
+            ['id', 'display_name'],
+            self.client.deployments.list.call_args[1]['_include'])
+        self.assertEqual([{'id': 'd1', 'display_name': 'dep 1'}],
+                         json.loads(outcome.output))
+
 
 class DeploymentModificationsTest(CliCommandTest):
     def _mock_wait_for_executions(self, value):
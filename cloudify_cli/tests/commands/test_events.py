@@ -1,13 +1,21 @@
+import os
+import gzip
 import json
 import time
+import asyncio
 import datetime
+import threading
 
-from mock import patch
+from aiohttp import web
+from mock import MagicMock, patch
 
 from .test_base import CliCommandTest
 from .mocks import MockListResponse, mock_log_message_prefix
 
 from cloudify_rest_client import executions, deployments
+from cloudify_rest_client.client import CloudifyClient
+
+from cloudify_cli.async_commands import events as async_events
 
 DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
 
@@ -155,9 +163,11 @@ class EventsTest(CliCommandTest):
             all(event_log in output for event_log in expected_event_logs),
             missing_events_error_message)
 
-    @patch('cloudify_cli.logger.logs.create_event_message_prefix',
+    @patch('cloudify.logs.create_event_message_prefix',
            new=mock_log_message_prefix)
-    def test_events_tail(self):
+    @patch('cloudify_cli.async_commands.events.tail_events',
+           return_value=None)
+    def test_events_tail(self, _):
         self.client.executions.get = self._mock_executions_get
         self.client.events.list = self._mock_events_list
 
@@ -167,14 +177,29 @@ class EventsTest(CliCommandTest):
 
         self._assert_events_displayed(expected_events, output)
 
-    @patch('cloudify_cli.logger.logs.create_event_message_prefix',
+    def test_events_tail_streamed(self):
+        self.client.executions.get = self._mock_executions_get
+        execution = executions.Execution({
+            'id': 'execution_id', 'status': executions.Execution.TERMINATED,
+            'workflow_id': 'install', 'deployment_id': 'd1'})
+        with patch('cloudify_cli.async_commands.events.tail_events',
+                   return_value=execution) as tail_events, \
+                patch('cloudify_cli.commands.events.wait_for_execution') \
+                as wait_for_execution:
+            outcome = self.invoke('cfy events list execution-id --tail')
+        self.assertEqual(
+            'execution-id', tail_events.call_args[1]['execution_id'])
+        wait_for_execution.assert_not_called()
+        self.assertIn('Finished executing workflow install', outcome.logs)
+
+    @patch('cloudify.logs.create_event_message_prefix',
            new=mock_log_message_prefix)
     def test_events(self):
         output = self._test_events()
         expected_events = self._get_events_before(time.time())
         self._assert_events_displayed(expected_events, output)
 
-    @patch('cloudify_cli.logger.logs.create_event_message_prefix',
+    @patch('cloudify.logs.create_event_message_prefix',
            new=mock_log_message_prefix)
     def test_events_no_logs(self):
         output = self._test_events('--no-logs')
@@ -218,6 +243,56 @@ class EventsTest(CliCommandTest):
         self.assertEqual(outcome.logs.split('\n')[-1], 'No events to delete')
         self.assertEqual(len(self.events), 0)
 
+    @patch('cloudify.logs.create_event_message_prefix',
+           new=mock_log_message_prefix)
+    def test_delete_events_store_before(self):
+        self._patch_clients_for_deletion()
+        # events are modified when they're processed, so return copies
+        self.client.events.list = lambda **kwargs: MockListResponse([
+            dict(event) for event in self._mock_events_list(**kwargs)])
+        self.client.executions.list = MagicMock(return_value=[
+            executions.Execution({'id': 'execution_id'})])
+        output_path = str(self.tmpdir / 'events.log')
+        expected_events = self._get_events_before(time.time())
+        self.invoke('cfy events delete deployment_id_1 --store-before '
+                    '-o {0}'.format(output_path))
+        with open(output_path) as f:
+            stored = f.read()
+        self._assert_events_displayed(expected_events, stored)
+
+    def test_export_events(self):
+        self.client.events.list = self._mock_events_list
+        self.client.executions.list = MagicMock(return_value=[
+            executions.Execution({'id': 'execution_1'}),
+            executions.Execution({'id': 'execution_2'})])
+        output_path = str(self.tmpdir / 'events.ndjson.gz')
+        expected_events = self._get_events_before(time.time())
+        self.invoke('cfy events export {0} -d deployment_id_1'.format(
+            output_path))
+        self.assertEqual(
+            'deployment_id_1',
+            self.client.executions.list.call_args[1]['deployment_id'])
+        with gzip.open(output_path, 'rt') as f:
+            exported = [json.loads(line) for line in f]
+        # the mock returns the same events for every execution
+        self.assertEqual(expected_events * 2, exported)
+        self.assertFalse(os.path.exists(output_path + '.checkpoint'))
+        # don't overwrite a finished export
+        self.invoke('cfy events export {0} -d deployment_id_1'.format(
+            output_path), err_str_segment='already exists')
+
+    def test_events_cache_prune(self):
+        events_cache = MagicMock()
+        events_cache.prune.return_value = (2, 3 * 1024 * 1024)
+        with patch('cloudify_cli.commands.events.get_events_cache',
+                   return_value=events_cache):
+            outcome = self.invoke('cfy events cache prune --max-size 10')
+            events_cache.prune.assert_called_once_with(10 * 1024 * 1024)
+            self.assertIn('Evicted the events of 2 executions (3 MB)',
+                          outcome.logs)
+            self.invoke('cfy events cache prune --all')
+            events_cache.remove.assert_called_once_with()
+
     def test_delete_events_no_logs(self):
         self._patch_clients_for_deletion()
         self.assertEqual(len(self.events), 5)
@@ -276,3 +351,130 @@ class EventsTest(CliCommandTest):
                     DATETIME_FORMAT)[:-3]))
         self.assertEqual(outcome.logs.split('\n')[-1], 'Deleted 2 events')
         self.assertEqual(len(self.events), 0)
+
+
+class FakeEventsStream(object):
+    """A manager with an events stream endpoint, on a local port.
+
+    Every connection is answered with the next item of responses: a list of
+    events to stream and then disconnect, or an HTTP status code.
+    """
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+        self.port = None
+        self._loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._serve)
+        self._thread.daemon = True
+
+    def _serve(self):
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        app.router.add_get('/api/v3.1/events/stream', self._stream)
+        self._runner = web.AppRunner(app)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        self._loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._started.set()
+        self._loop.run_forever()
+
+    async def _stream(self, request):
+        self.requests.append(dict(request.query))
+        response = self.responses.pop(0) if self.responses else []
+        if isinstance(response, int):
+            return web.Response(status=response)
+        stream = web.StreamResponse()
+        await stream.prepare(request)
+        for event in response:
+            await stream.write(json.dumps(event).encode() + b'\n')
+        return stream
+
+    def __enter__(self):
+        self._thread.start()
+        self._started.wait()
+        return self
+
+    def __exit__(self, *exc_info):
+        asyncio.run_coroutine_threadsafe(
+            self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+class EventsStreamTest(CliCommandTest):
+    def setUp(self):
+        super(EventsStreamTest, self).setUp()
+        self.execution = executions.Execution(
+            {'id': 'e1', 'status': executions.Execution.STARTED})
+        self.statuses = []
+
+    def _event(self, index, event_type='task_succeeded'):
+        return {
+            'id': index,
+            'reported_timestamp': '2020-01-01T00:00:0{0}.000Z'.format(
+                index // 2),
+            'event_type': event_type,
+            'deployment_id': 'd1',
+            'execution_id': 'e1',
+            'node_name': 'node',
+            'operation': 'op',
+            'workflow_id': 'install',
+            'node_instance_id': 'node_1',
+            'message': 'event {0}'.format(index),
+            'error_causes': None,
+        }
+
+    def _tail(self, server, client=None):
+        if client is None:
+            client = CloudifyClient(
+                host='127.0.0.1', port=server.port, protocol='http')
+        client.executions.get = MagicMock(side_effect=lambda _: (
+            executions.Execution({'id': 'e1', 'status': self.statuses.pop(0)
+                                  if self.statuses
+                                  else executions.Execution.TERMINATED})))
+        received = []
+        execution = async_events.tail_events(
+            client, self.execution, received.extend, execution_id='e1')
+        return execution, [e['message']['text'] for e in received]
+
+    @patch('cloudify_cli.async_commands.events.RECONNECT_DELAY', 0)
+    def test_resume_after_disconnect(self):
+        self.statuses = [executions.Execution.STARTED]
+        with FakeEventsStream([
+            [self._event(0), self._event(1), self._event(2)],
+            [self._event(2), self._event(3),
+             self._event(4, 'workflow_succeeded')],
+        ]) as server:
+            execution, received = self._tail(server)
+        self.assertEqual(executions.Execution.TERMINATED, execution.status)
+        self.assertEqual(['event {0}'.format(i) for i in range(5)], received)
+        self.assertEqual(self._event(2)['reported_timestamp'],
+                         server.requests[1]['since'])
+
+    def test_endpoint_missing(self):
+        with FakeEventsStream([404]) as server:
+            self.assertEqual((None, []), self._tail(server))
+
+    def test_manager_unreachable(self):
+        with FakeEventsStream([]) as server:
+            port = server.port
+        client = CloudifyClient(host='127.0.0.1', port=port,
+                                protocol='http')
+        self.assertEqual((None, []), self._tail(None, client))
+
+    def test_ended_execution(self):
+        self.execution = executions.Execution(
+            {'id': 'e1', 'status': executions.Execution.TERMINATED})
+        with FakeEventsStream([]) as server:
+            self.assertEqual((self.execution, []), self._tail(server))
+        self.assertEqual([], server.requests)
+
+    def test_trust_all(self):
+        client = CloudifyClient(host='127.0.0.1', protocol='https',
+                                trust_all=True)
+        self.assertIs(False, async_events._async_client(client).ssl)
+        client = CloudifyClient(host='127.0.0.1', protocol='https')
+        self.assertIsNot(False, async_events._async_client(client).ssl)
@@ -4,6 +4,8 @@ import tempfile
 
 from mock import MagicMock
 
+from cloudify_rest_client.responses import ListResponse
+
 from .test_base import CliCommandTest
 from cloudify_cli.exceptions import CloudifyCliError
 from .mocks import node_instance_get_mock, MockListResponse
@@ -54,6 +56,22 @@ class NodeInstancesTest(CliCommandTest):
                     context='node_instances')
         self.invoke('cfy node-instances list -a', context='node_instances')
 
+    def test_instances_list_all_pages(self):
+        instances = [node_instance_get_mock() for _ in range(5)]
+
+        def _list(_offset, _size, **kwargs):
+            return ListResponse(
+                instances[_offset:_offset + _size],
+                {'pagination': {'total': 5, 'offset': _offset,
+                                'size': _size}})
+        self.client.node_instances.list = MagicMock(side_effect=_list)
+        outcome = self.invoke('cfy node-instances list --all -s 2',
+                              context='node_instances')
+        for instance in instances:
+            self.assertIn(str(instance.id), outcome.output)
+        self.assertIn('Showing 5 of 5 node-instances', outcome.logs)
+        self.assertEqual(3, self.client.node_instances.list.call_count)
+
     def test_local_instances(self):
         self._create_local_env()
         output = self.invoke('cfy node-instances -b local', context='local')
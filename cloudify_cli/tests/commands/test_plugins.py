@@ -61,6 +61,12 @@ class PluginsTest(CliCommandTest):
         self.invoke('cfy plugins list -t dummy_tenant')
         self.invoke('cfy plugins list -a')
 
+    def test_plugins_list_columns(self):
+        self.client.plugins.list = Mock(return_value=MockListResponse())
+        self.invoke('cfy plugins list --columns id --columns "installed on"')
+        self.assertEqual(['id', 'installation_state'],
+                         self.client.plugins.list.call_args[1]['_include'])
+
     def test_plugin_get(self):
         self.client.plugins.get = Mock(
             return_value=plugins.Plugin({
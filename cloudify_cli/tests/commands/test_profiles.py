@@ -4,7 +4,7 @@ import tarfile
 import tempfile
 from contextlib import closing
 
-from mock import MagicMock, patch
+from mock import MagicMock, call, patch
 
 from ... import env
 from ... import utils
@@ -46,6 +46,27 @@ class ProfilesTest(CliCommandTest):
         self.assertIn('rest_port', outcome.output)
         self.assertIn('80', outcome.output)
 
+    def test_list_profiles_from_index(self):
+        self.use_manager()
+        self.use_manager(manager_ip='10.10.1.11', rest_port=8080)
+        self.invoke('profiles list')
+        with patch('cloudify_cli.env.get_profile_context',
+                   wraps=env.get_profile_context) as get_context:
+            outcome = self.invoke('profiles list')
+            self.assertNotIn(call('10.10.1.10'), get_context.call_args_list)
+            self.assertNotIn(call('10.10.1.11'), get_context.call_args_list)
+            self.assertIn('8080', outcome.output)
+
+            changed = env.get_profile_context('10.10.1.11')
+            changed.rest_port = 8081
+            changed.save()
+            get_context.reset_mock()
+            outcome = self.invoke('profiles list')
+            self.assertNotIn(call('10.10.1.10'), get_context.call_args_list)
+            self.assertIn(call('10.10.1.11'), get_context.call_args_list)
+        self.assertIn('8081', outcome.output)
+        self.assertIn('*10.10.1.11', outcome.output)
+
     def test_list_profiles_no_profiles(self):
         self.delete_current_profile()
         outcome = self.invoke('profiles list')
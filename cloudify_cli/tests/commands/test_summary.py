@@ -0,0 +1,158 @@
+import csv
+import threading
+from collections import Counter, namedtuple
+
+from mock import MagicMock, patch
+from testtools import TestCase
+
+from cloudify_rest_client.responses import ListResponse
+
+from ...commands import summary
+from .test_base import CliCommandTest
+
+Tenant = namedtuple('Tenant', 'name')
+DEPLOYMENTS = [
+    {'tenant_name': tenant, 'blueprint_id': blueprint_id,
+     'visibility': visibility, 'site_name': site_name}
+    for tenant, blueprint_id, visibility, site_name, count in [
+        ('t1', 'bp1', 'private', 's1', 3),
+        ('t1', 'bp1', 'tenant', 's1', 1),
+        ('t1', 'bp2', 'private', None, 2),
+        ('t2', 'bp1', 'private', 's2', 4),
+    ]
+    for _ in range(count)
+]
+
+
+class FakeSummaryClient(object):
+    """Summarize resources by one or two fields, like the manager"""
+    def __init__(self, resources, summary_type='deployments'):
+        self.resources = resources
+        self.summary_type = summary_type
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def get(self, _target_field, _sub_field=None, _all_tenants=None,
+            **filters):
+        with self._lock:
+            self.calls.append(dict(filters, _target_field=_target_field,
+                                   _sub_field=_sub_field))
+        resources = [r for r in self.resources
+                     if all(r[k] == v for k, v in filters.items()
+                            if v is not None)]
+        items = []
+        counts = Counter(r[_target_field] for r in resources)
+        for value, count in sorted(counts.items(), key=str):
+            item = {_target_field: value, self.summary_type: count}
+            if _sub_field:
+                sub_counts = Counter(r[_sub_field] for r in resources
+                                     if r[_target_field] == value)
+                item['by ' + _sub_field] = [
+                    {_sub_field: sub_value, self.summary_type: sub_count}
+                    for sub_value, sub_count in sorted(sub_counts.items())]
+            items.append(item)
+        return ListResponse(items, {})
+
+
+def _client(resources):
+    client = MagicMock()
+    client.summary.deployments = FakeSummaryClient(resources)
+    return client
+
+
+def _counts(rows, fields):
+    return {tuple(row[field] for field in fields): row['deployments']
+            for row in rows}
+
+
+def _expected(fields, resources=DEPLOYMENTS):
+    return dict(Counter(tuple(r[field] for field in fields)
+                        for r in resources))
+
+
+class SummarizeTest(TestCase):
+    def test_two_fields(self):
+        client = _client(DEPLOYMENTS)
+        columns, rows = summary.summarize(
+            client, 'deployments', ('tenant_name', 'blueprint_id'))
+        self.assertEqual(['tenant_name', 'blueprint_id', 'deployments'],
+                         columns)
+        # the manager's summary, with the totals
+        self.assertEqual(1, len(client.summary.deployments.calls))
+        self.assertIn({'tenant_name': 't1', 'blueprint_id': 'TOTAL',
+                       'deployments': 6}, rows)
+
+    def test_pivot(self):
+        client = _client(DEPLOYMENTS)
+        fields = ('tenant_name', 'blueprint_id', 'visibility')
+        columns, rows = summary.summarize(client, 'deployments', fields)
+        self.assertEqual(list(fields) + ['deployments'], columns)
+        self.assertEqual(_expected(fields), _counts(rows, fields))
+        # the tenants, and then bp1 x visibility and bp2 x visibility for
+        # each tenant
+        self.assertEqual(3, len(client.summary.deployments.calls))
+
+    def test_pivot_four_fields(self):
+        client = _client(DEPLOYMENTS)
+        fields = ('visibility', 'tenant_name', 'blueprint_id', 'site_name')
+        _, rows = summary.summarize(client, 'deployments', fields)
+        self.assertEqual(_expected(fields), _counts(rows, fields))
+
+    def test_pivot_missing_value(self):
+        client = _client(DEPLOYMENTS)
+        logger = MagicMock()
+        fields = ('site_name', 'tenant_name', 'blueprint_id')
+        _, rows = summary.summarize(client, 'deployments', fields,
+                                    logger=logger)
+        self.assertEqual(
+            _expected(fields, [r for r in DEPLOYMENTS if r['site_name']]),
+            _counts(rows, fields))
+        logger.warning.assert_called_once_with(
+            'Leaving out %d %s without %s', 2, 'deployments', 'site_name')
+
+    def test_percentages(self):
+        client = _client(DEPLOYMENTS)
+        columns, rows = summary.summarize(
+            client, 'deployments', ('tenant_name',), percentages=True)
+        self.assertEqual(['tenant_name', 'deployments', 'percent'], columns)
+        self.assertEqual({'t1': 60.0, 't2': 40.0},
+                         {row['tenant_name']: row['percent'] for row in rows})
+
+    def test_per_tenant(self):
+        tenants = {
+            name: _client([r for r in DEPLOYMENTS
+                           if r['tenant_name'] == name])
+            for name in ('t1', 't2')
+        }
+        client = MagicMock()
+        client.tenants.list.return_value = [
+            Tenant(name) for name in sorted(tenants)]
+        fields = ('tenant_name', 'blueprint_id', 'visibility')
+        with patch('cloudify_cli.env.get_rest_client',
+                   side_effect=lambda tenant_name, pooled: tenants[
+                       tenant_name]):
+            columns, rows = summary.summarize(
+                client, 'deployments', fields[1:], per_tenant=True,
+                _all_tenants=True)
+        self.assertEqual(list(fields) + ['deployments'], columns)
+        self.assertEqual(_expected(fields), _counts(rows, fields))
+        for tenant_client in tenants.values():
+            self.assertEqual(1, len(tenant_client.summary.deployments.calls))
+        client.summary.deployments.get.assert_not_called()
+
+
+class SummaryCommandTest(CliCommandTest):
+    def setUp(self):
+        super(SummaryCommandTest, self).setUp()
+        self.use_manager()
+        self.client.summary.deployments = FakeSummaryClient(DEPLOYMENTS)
+
+    def test_pivot_csv(self):
+        outcome = self.invoke(
+            'cfy deployments summary tenant_name blueprint_id visibility '
+            '--percentages --format csv')
+        lines = list(csv.reader(outcome.output.splitlines()))
+        self.assertEqual(['tenant_name', 'blueprint_id', 'visibility',
+                          'deployments', 'percent'], lines[0])
+        self.assertIn(['t2', 'bp1', 'private', '4', '40.0'], lines)
+        self.assertEqual(5, len(lines))
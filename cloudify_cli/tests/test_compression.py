@@ -0,0 +1,99 @@
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from testtools import TestCase
+
+from .. import compression
+from ..rest_client import CliClient
+
+
+class _ManagerHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._reply()
+
+    def do_PUT(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        self.server.requests.append((dict(self.headers), json.loads(body)))
+        self._reply()
+
+    def _reply(self):
+        body = json.dumps({'items': ['deployment'] * 1000}).encode('utf-8')
+        self.send_response(200)
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        if self.server.accept_encoding:
+            self.send_header('Accept-Encoding', self.server.accept_encoding)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class CompressionTest(TestCase):
+    def setUp(self):
+        super(CompressionTest, self).setUp()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _ManagerHandler)
+        self.server.requests = []
+        self.server.accept_encoding = 'gzip'
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.addCleanup(compression._accepted_encodings.clear)
+        self.client = CliClient(host='127.0.0.1',
+                                port=self.server.server_address[1],
+                                protocol='http')
+
+    def test_compressed_response(self):
+        counter = compression.get_byte_counter()
+        received = counter.received
+        received_uncompressed = counter.received_uncompressed
+        response = self.client._client.get('/deployments')
+        self.assertEqual(1000, len(response['items']))
+        self.assertEqual(len(json.dumps(response).encode('utf-8')),
+                         counter.received_uncompressed -
+                         received_uncompressed)
+        self.assertLess(counter.received - received, 1000)
+
+    def test_compressed_request(self):
+        inputs = {'inputs': {'input{0}'.format(index): 'value'
+                             for index in range(2000)}}
+        # the manager didn't say that it accepts compressed requests yet
+        self.client._client.put('/deployments/d1', data=inputs)
+        self.client._client.put('/deployments/d1', data=inputs)
+        (first, first_body), (second, second_body) = self.server.requests
+        self.assertNotIn('Content-Encoding', first)
+        self.assertEqual('gzip', second['Content-Encoding'])
+        self.assertLess(int(second['Content-Length']),
+                        int(first['Content-Length']) // 5)
+        self.assertEqual(inputs, first_body)
+        self.assertEqual(inputs, second_body)
+
+    def test_small_request_not_compressed(self):
+        self.client._client.get('/deployments')
+        self.client._client.put('/deployments/d1', data={'inputs': {}})
+        headers, _ = self.server.requests[0]
+        self.assertNotIn('Content-Encoding', headers)
+
+    def test_compression_not_accepted(self):
+        self.server.accept_encoding = 'identity'
+        inputs = {'inputs': {'input{0}'.format(index): 'value'
+                             for index in range(2000)}}
+        self.client._client.get('/deployments')
+        self.client._client.put('/deployments/d1', data=inputs)
+        headers, _ = self.server.requests[0]
+        self.assertNotIn('Content-Encoding', headers)
+
+    def test_parse_encodings(self):
+        self.assertEqual(
+            {'gzip', 'identity'},
+            compression._parse_encodings('gzip;q=1.0, zstd;q=0, identity'))
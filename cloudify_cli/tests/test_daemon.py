@@ -0,0 +1,82 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from mock import patch
+from testtools import TestCase
+
+from .. import daemon
+
+
+class DaemonTest(TestCase):
+    def setUp(self):
+        super(DaemonTest, self).setUp()
+        if not daemon.is_supported():
+            self.skipTest('The daemon is not supported on this platform')
+        self.workdir = tempfile.mkdtemp(prefix='cfy-daemon-')
+        self.addCleanup(shutil.rmtree, self.workdir)
+        self.env = dict(os.environ, CFY_WORKDIR=self.workdir)
+        self.env.pop(daemon.DISABLE_ENV_VAR, None)
+        socket_path = os.path.join(self.workdir, '.cloudify', 'daemon.sock')
+        patcher = patch('cloudify_cli.daemon.SOCKET_PATH', socket_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _start_daemon(self):
+        os.makedirs(os.path.join(self.workdir, '.cloudify'))
+        proc = subprocess.Popen(
+            [sys.executable, '-m', 'cloudify_cli.daemon'], env=self.env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.addCleanup(proc.wait)
+        self.addCleanup(daemon.stop)
+        deadline = time.time() + daemon.START_TIMEOUT
+        while not daemon.status():
+            if time.time() > deadline:
+                self.fail('The daemon did not start')
+            time.sleep(0.1)
+
+    def _run_cfy(self, *args):
+        proc = subprocess.Popen(
+            [sys.executable, '-c',
+             'from cloudify_cli.main import _cfy; _cfy()'] + list(args),
+            env=self.env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            universal_newlines=True)
+        output, _ = proc.communicate()
+        return proc.returncode, output
+
+    def test_no_daemon(self):
+        self.assertIsNone(daemon.status())
+        self.assertIsNone(daemon.forward(['profiles', 'list']))
+        self.assertFalse(daemon.stop())
+
+    def test_forward(self):
+        self._start_daemon()
+        exit_code, output = self._run_cfy('profiles', 'list')
+        self.assertEqual(0, exit_code)
+        self.assertIn('No profiles found', output)
+        self.assertEqual(1, daemon.status()['commands_run'])
+
+    def test_forward_exit_code(self):
+        self._start_daemon()
+        exit_code, output = self._run_cfy('events', 'list', '-e', 'x')
+        self.assertEqual(1, exit_code)
+        self.assertIn('only available when using a manager', output)
+        self.assertEqual(1, daemon.status()['commands_run'])
+
+    def test_disabled(self):
+        self._start_daemon()
+        self.env[daemon.DISABLE_ENV_VAR] = '1'
+        exit_code, _ = self._run_cfy('profiles', 'list')
+        self.assertEqual(0, exit_code)
+        self.assertEqual(0, daemon.status()['commands_run'])
+
+    def test_stale_daemon(self):
+        self._start_daemon()
+        with patch('cloudify_cli.daemon.fingerprint', return_value='x'):
+            self.assertIsNone(daemon.forward(['profiles', 'list']))
+        # the daemon's own code didn't change, so it's still there
+        self.assertIsNotNone(daemon.status())
+        self.assertEqual(0, daemon.status()['commands_run'])
@@ -20,13 +20,17 @@ import mock
 import json
 import time
 import yaml
+import click
 import shutil
 import logging
 import tarfile
 import zipfile
+import threading
 import requests
 import tempfile
+import tracemalloc
 from contextlib import closing
+from functools import partial
 from mock import MagicMock, patch
 from io import StringIO
 from itertools import chain, repeat, count
@@ -35,6 +39,8 @@ from cloudify import logs
 
 from cloudify_rest_client.executions import Execution
 from cloudify_rest_client.client import CloudifyClient
+from cloudify_rest_client.exceptions import CloudifyClientError
+from cloudify_rest_client.responses import ListResponse
 from cloudify_rest_client.client import DEFAULT_API_VERSION
 
 import dsl_parser
@@ -48,6 +54,7 @@ from .. import utils
 from .. import inputs
 from .. import logger
 from .. import constants
+from .. import cluster_client
 from ..config import config
 from .. import local as cli_local
 from ..exceptions import CloudifyCliError
@@ -55,7 +62,9 @@ from ..colorful_event import ColorfulEvent
 from ..exceptions import ExecutionTimeoutError
 from ..exceptions import EventProcessingTimeoutError
 from ..execution_events_fetcher import wait_for_execution
+from ..execution_events_fetcher import wait_for_execution_group
 from ..execution_events_fetcher import ExecutionEventsFetcher
+from ..execution_events_fetcher import PollingScheduler
 
 from .commands.test_base import CliCommandTest
 from .commands.mocks import mock_stdout, MockListResponse
@@ -185,6 +194,54 @@ class CliEnvTests(CliCommandTest):
         self.assertTrue(hasattr(context, 'manager_ip'))
         self.assertEqual(context.manager_ip, '10.10.1.10')
 
+    def test_get_profile_context_parsed_once(self):
+        self.use_manager()
+        with patch('json.load', wraps=json.load) as json_load:
+            env.get_profile_context().manager_tenant = 'changed'
+            self.assertEqual('default_tenant',
+                             env.get_profile_context().manager_tenant)
+            self.assertFalse(json_load.called)
+        profile = env.get_profile_context()
+        profile.rest_port = 8080
+        profile.save()
+        context_path = env.get_context_path(profile.profile_name)
+        # the temporary file was renamed into place
+        self.assertEqual([], [
+            name for name in os.listdir(os.path.dirname(context_path))
+            if name.endswith('.tmp')])
+        self.assertEqual(8080, env.get_profile_context().rest_port)
+
+    def test_write_atomic_threads(self):
+        path = os.path.join(tempfile.mkdtemp(), 'file.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        started = threading.Barrier(4)
+        errors = []
+
+        def _write(f, index):
+            started.wait()
+            f.write(str(index) * 1000 * (index + 1))
+
+        def _write_atomic(index):
+            try:
+                env._write_atomic(path, partial(_write, index=index))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=_write_atomic, args=(i, ))
+                   for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([], errors)
+        with open(path) as f:
+            content = f.read()
+        # one of the writes, whole
+        self.assertIn(content,
+                      [str(i) * 1000 * (i + 1) for i in range(4)])
+        self.assertEqual(['file.json'],
+                         os.listdir(os.path.dirname(path)))
+
     def test_get_context_path(self):
         profile = self.use_manager()
         context_path = env.get_context_path(profile.manager_ip)
@@ -703,6 +760,185 @@ class ExecutionEventsFetcherTest(CliCommandTest):
                               timeout=2)
 
 
+class _ListEventsTest(CliCommandTest):
+    """Base for tests of fetching events with a mock events.list"""
+
+    def setUp(self):
+        super(_ListEventsTest, self).setUp()
+        self.client = CloudifyClient()
+        self.client.executions.get = MagicMock()
+        self.client.events.list = MagicMock(side_effect=self._mock_list)
+        self.events = []
+
+    def _mock_list(self, from_datetime=None, _offset=0, _size=100,
+                   **kwargs):
+        events = [dict(event) for event in self.events
+                  if from_datetime is None or
+                  event['reported_timestamp'] >= from_datetime]
+        return ListResponse(events[_offset:_offset + _size], {
+            'pagination': {'total': len(events), 'offset': _offset,
+                           'size': _size}})
+
+    def _generate_events(self, count, per_timestamp=1, with_id=True):
+        events = []
+        for index in range(count):
+            event = {
+                'reported_timestamp': '2020-01-01T00:00:{0:06.3f}Z'.format(
+                    index // per_timestamp / 1000.0),
+                'deployment_id': '<deployment_id>',
+                'execution_id': '<execution_id>',
+                'node_name': '<node_name>',
+                'operation': '<operation>',
+                'workflow_id': '<workflow_id>',
+                'node_instance_id': '<node_instance_id>',
+                'message': '<message>',
+                'error_causes': '<error_causes>',
+            }
+            if with_id:
+                event['id'] = index
+            events.append(event)
+        return events
+
+    def _fetch_all(self, events_fetcher):
+        fetched = []
+        events_fetcher.fetch_and_process_events(events_handler=fetched.extend)
+        return fetched
+
+
+class CursorEventsFetcherTest(_ListEventsTest):
+
+    def test_cursor_batches(self):
+        self.events = self._generate_events(10)
+        events_fetcher = ExecutionEventsFetcher(
+            self.client, execution_id='execution_id', batch_size=3)
+        fetched = self._fetch_all(events_fetcher)
+        self.assertEqual(list(range(10)), [e['id'] for e in fetched])
+        calls = self.client.events.list.call_args_list
+        self.assertEqual([0] * len(calls),
+                         [c[1]['_offset'] for c in calls])
+        self.assertNotIn('from_datetime', calls[0][1])
+        self.assertEqual(self.events[5]['reported_timestamp'],
+                         calls[2][1]['from_datetime'])
+
+    def test_cursor_boundary_events_not_repeated(self):
+        # the boundary of every batch falls between events that share
+        # a timestamp
+        self.events = self._generate_events(20, per_timestamp=3)
+        events_fetcher = ExecutionEventsFetcher(
+            self.client, execution_id='execution_id', batch_size=4)
+        fetched = self._fetch_all(events_fetcher)
+        self.assertEqual(list(range(20)), [e['id'] for e in fetched])
+        self.events.extend(self._generate_events(23, per_timestamp=3)[20:])
+        fetched = self._fetch_all(events_fetcher)
+        self.assertEqual([20, 21, 22], [e['id'] for e in fetched])
+
+    def test_cursor_identical_events_without_id(self):
+        self.events = self._generate_events(6, per_timestamp=3,
+                                            with_id=False)
+        events_fetcher = ExecutionEventsFetcher(
+            self.client, execution_id='execution_id', batch_size=2)
+        self.assertEqual(6, events_fetcher.fetch_and_process_events())
+
+    def test_cursor_total(self):
+        self.events = self._generate_events(10)
+        events_fetcher = ExecutionEventsFetcher(
+            self.client, execution_id='execution_id', batch_size=4)
+        events_fetcher.fetch_and_process_events_batch()
+        self.assertEqual(
+            (4, 10), events_fetcher.fetch_and_process_events_batch())
+
+    def test_fallback_without_timestamps(self):
+        self.events = self._generate_events(5)
+        for event in self.events:
+            del event['reported_timestamp']
+        events_fetcher = ExecutionEventsFetcher(
+            self.client, execution_id='execution_id', batch_size=2)
+        fetched = self._fetch_all(events_fetcher)
+        self.assertEqual(list(range(5)), [e['id'] for e in fetched])
+        self.assertEqual(
+            [0, 2, 4],
+            [c[1]['_offset'] for c in self.client.events.list.call_args_list])
+
+    def test_fallback_when_timestamp_fills_batch(self):
+        self.events = self._generate_events(10, per_timestamp=5)
+        events_fetcher = ExecutionEventsFetcher(
+            self.client, execution_id='execution_id', batch_size=2)
+        fetched = self._fetch_all(events_fetcher)
+        self.assertEqual(list(range(10)), [e['id'] for e in fetched])
+
+    def test_explicit_offset(self):
+        self.events = self._generate_events(10)
+        events_fetcher = ExecutionEventsFetcher(
+            self.client, execution_id='execution_id')
+        self.assertEqual(
+            (3, 10),
+            events_fetcher.fetch_and_process_events_batch(offset=7, size=5))
+        self.assertEqual(
+            7, self.client.events.list.call_args[1]['_offset'])
+
+
+class PrefetchEventsFetcherTest(_ListEventsTest):
+
+    def test_prefetch_all_events(self):
+        self.events = self._generate_events(25, per_timestamp=2)
+        events_fetcher = ExecutionEventsFetcher(
+            self.client, execution_id='execution_id', batch_size=4,
+            prefetch=2)
+        fetched = self._fetch_all(events_fetcher)
+        self.assertEqual(list(range(25)), [e['id'] for e in fetched])
+        self.events.extend(self._generate_events(30, per_timestamp=2)[25:])
+        fetched = self._fetch_all(events_fetcher)
+        self.assertEqual(list(range(25, 30)), [e['id'] for e in fetched])
+
+    def test_prefetch_while_processing(self):
+        self.events = self._generate_events(10)
+        second_batch_requested = threading.Event()
+        list_events = self.client.events.list.side_effect
+
+        def _list(**kwargs):
+            if self.client.events.list.call_count == 2:
+                second_batch_requested.set()
+            return list_events(**kwargs)
+
+        def _handler(events):
+            if events[0]['id'] == 0:
+                # the handler is still processing the first batch, but the
+                # second one is already being fetched
+                self.assertTrue(second_batch_requested.wait(5))
+
+        self.client.events.list.side_effect = _list
+        events_fetcher = ExecutionEventsFetcher(
+            self.client, execution_id='execution_id', batch_size=5,
+            prefetch=1)
+        self.assertEqual(10, events_fetcher.fetch_and_process_events(
+            events_handler=_handler))
+
+    def test_prefetch_error(self):
+        self.client.events.list.side_effect = RuntimeError('boom')
+        events_fetcher = ExecutionEventsFetcher(
+            self.client, execution_id='execution_id', prefetch=2)
+        self.assertRaises(RuntimeError,
+                          events_fetcher.fetch_and_process_events)
+
+    def test_prefetch_keeps_unprocessed_batches(self):
+        self.events = self._generate_events(20)
+        events_fetcher = ExecutionEventsFetcher(
+            self.client, execution_id='execution_id', batch_size=2,
+            prefetch=3)
+        fetched = []
+
+        def _failing_handler(events):
+            fetched.extend(events)
+            raise RuntimeError('handler failed')
+
+        self.assertRaises(
+            RuntimeError, events_fetcher.fetch_and_process_events,
+            events_handler=_failing_handler)
+        events_fetcher.fetch_and_process_events(
+            events_handler=fetched.extend)
+        self.assertEqual(list(range(20)), [e['id'] for e in fetched])
+
+
 class WaitForExecutionTests(CliCommandTest):
 
     def setUp(self):
@@ -757,6 +993,153 @@ class WaitForExecutionTests(CliCommandTest):
             polling the execution status after it received a workflow_succeeded
             event (expected 101 calls, got %d)""" % calls_count)
 
+    def test_wait_for_execution_no_redundant_get(self):
+        self.client.executions.get = MagicMock(
+            return_value=MagicMock(status=Execution.TERMINATED))
+        self.client.events.list = MagicMock(
+            return_value=MockListResponse([], 0))
+        wait_for_execution(self.client, MagicMock(status=Execution.STARTED))
+        self.assertEqual(1, len(self.client.executions.get.mock_calls))
+
+    def test_wait_for_execution_group_no_redundant_get(self):
+        self.client.execution_groups.get = MagicMock(
+            return_value=MagicMock(status=Execution.TERMINATED))
+        self.client.events.list = MagicMock(
+            return_value=MockListResponse([], 0))
+        wait_for_execution_group(self.client,
+                                 MagicMock(status=Execution.STARTED))
+        self.assertEqual(1, len(self.client.execution_groups.get.mock_calls))
+
+    def test_wait_for_execution_skips_status_while_events_flow(self):
+        # a new event in each of the first 10 polls, and then the
+        # execution ends
+        self.client.events.list = MagicMock(side_effect=chain(
+            [MockListResponse([{'id': i, 'message': str(i)}], 1)
+             for i in range(10)],
+            repeat(MockListResponse([], 0))))
+        self.client.executions.get = MagicMock(
+            side_effect=lambda execution_id: MagicMock(
+                status=Execution.STARTED
+                if self.client.events.list.call_count < 10
+                else Execution.TERMINATED))
+        wait_for_execution(self.client, MagicMock(status=Execution.STARTED),
+                           timeout=None)
+        # the status was fetched before the first poll's events, and then
+        # only when the events stopped for long enough
+        self.assertEqual(2, len(self.client.executions.get.mock_calls))
+
+    def test_wait_for_execution_backs_off(self):
+        executions = chain(
+            [MagicMock(status=Execution.STARTED)] * 5,
+            repeat(MagicMock(status=Execution.TERMINATED))
+        )
+        self.client.executions.get = MagicMock(side_effect=executions)
+        self.client.events.list = MagicMock(
+            return_value=MockListResponse([], 0))
+        wait_for_execution(self.client, MagicMock(status=Execution.STARTED),
+                           timeout=None)
+        intervals = [c[1][0] for c in self.time.sleep.mock_calls]
+        self.assertEqual(5, len(intervals))
+        self.assertEqual(intervals, sorted(intervals))
+
+    def test_wait_for_execution_prefetches_events(self):
+        events = [{'id': i, 'message': str(i)} for i in range(250)]
+        self.client.executions.get = MagicMock(
+            return_value=MagicMock(status=Execution.TERMINATED))
+        self.client.events.list = MagicMock(
+            side_effect=lambda _offset, _size, **kwargs: MockListResponse(
+                events[_offset:_offset + _size], len(events)))
+        fetched = []
+        prefetch = ExecutionEventsFetcher._fetch_and_process_prefetched_events
+        with patch.object(ExecutionEventsFetcher,
+                          '_fetch_and_process_prefetched_events',
+                          autospec=True, side_effect=prefetch) as prefetched:
+            wait_for_execution(self.client,
+                               MagicMock(status=Execution.STARTED),
+                               events_handler=fetched.extend, timeout=None)
+        prefetched.assert_called_once()
+        self.assertEqual(list(range(250)), [e['id'] for e in fetched])
+
+
+class PollingSchedulerTest(CliCommandTest):
+    def setUp(self):
+        super(PollingSchedulerTest, self).setUp()
+        sleep_patcher = patch('cloudify_cli.execution_events_fetcher.'
+                              'time.sleep')
+        self.sleep = sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+        self.scheduler = PollingScheduler(
+            min_interval=1, max_interval=8, backoff_factor=2, jitter=0)
+        self.handler = self.scheduler.events_handler()
+
+    def _slept(self):
+        return [c[1][0] for c in self.sleep.mock_calls]
+
+    def test_backoff(self):
+        for _ in range(5):
+            self.scheduler.wait()
+        self.assertEqual([2, 4, 8, 8, 8], self._slept())
+
+    def test_events_reset_interval(self):
+        self.scheduler.wait()
+        self.scheduler.wait()
+        self.handler([{}])
+        self.scheduler.wait()
+        self.scheduler.wait()
+        self.assertEqual([2, 4, 1, 2], self._slept())
+
+    def test_wait_timeout(self):
+        self.scheduler.wait(timeout=0.5)
+        self.assertEqual([0.5], self._slept())
+
+    def test_jitter(self):
+        scheduler = PollingScheduler(min_interval=10, max_interval=10,
+                                     jitter=0.2)
+        for _ in range(20):
+            scheduler.wait()
+        self.assertTrue(all(8 <= interval <= 12
+                            for interval in self._slept()))
+
+    def test_skip_status_while_events_flow(self):
+        self.assertTrue(self.scheduler.should_fetch_status())
+        self.scheduler.status_fetched()
+        self.handler([{}])
+        self.assertFalse(self.scheduler.should_fetch_status())
+        # the next poll checks before fetching its events
+        self.scheduler.wait()
+        self.assertFalse(self.scheduler.should_fetch_status())
+        self.scheduler.status_fetched()
+        self.assertTrue(self.scheduler.should_fetch_status())
+
+    def test_fetch_status_every_max_interval(self):
+        self.scheduler.status_fetched()
+        fetches = []
+        for _ in range(10):
+            self.handler([{}])
+            fetches.append(self.scheduler.should_fetch_status())
+            self.scheduler.wait()
+        # events arrive in every poll, so the polls are 1 second apart
+        self.assertEqual([False] * 8 + [True, True], fetches)
+
+    def test_end_event(self):
+        self.scheduler.status_fetched()
+        self.handler([{'event_type': 'workflow_succeeded'}])
+        self.scheduler.wait()
+        self.scheduler.wait()
+        self.assertTrue(self.scheduler.should_fetch_status())
+        self.assertEqual([1, 1], self._slept())
+
+    def test_end_event_not_watched(self):
+        scheduler = PollingScheduler(min_interval=1, backoff_factor=2,
+                                     jitter=0, watch_end_events=False)
+        handler = scheduler.events_handler()
+        scheduler.status_fetched()
+        handler([{'event_type': 'workflow_succeeded'}])
+        self.assertFalse(scheduler.should_fetch_status())
+        scheduler.wait()
+        scheduler.wait()
+        self.assertEqual([1, 2], self._slept())
+
 
 @mock.patch('cloudify_cli.env.is_initialized', lambda: True)
 class TestCLIConfig(CliCommandTest):
@@ -904,6 +1287,15 @@ class GetImportResolverTests(CliCommandTest):
         self.assertEqual(type(resolver), CustomImportResolver)
         self.assertEqual(resolver.param, 'custom-parameter')
 
+    def test_get_resolver_by_old_path(self):
+        import_resolver_config = create_resolver_configuration(
+            implementation='cloudify_cli.config.config:'
+                           'ResolverWithCatalogIdentification')
+        update_config_file(resolver_configuration=import_resolver_config)
+        resolver = config.get_import_resolver()
+        self.assertEqual('ResolverWithCatalogIdentification',
+                         type(resolver).__name__)
+
 
 class ImportResolverLocalUseTests(CliCommandTest):
     @mock.patch('cloudify_cli.config.config.get_import_resolver')
@@ -999,6 +1391,46 @@ class TestGetRestClient(CliCommandTest):
             rest_protocol, host, port, DEFAULT_API_VERSION),
             client._client.url)
 
+    def test_shared_rest_clients(self):
+        get_rest_client = self.original_utils_get_rest_client
+        self.assertIsNot(get_rest_client(rest_host='localhost'),
+                         get_rest_client(rest_host='localhost'))
+        with env.shared_rest_clients():
+            client = get_rest_client(rest_host='localhost')
+            self.assertIs(client, get_rest_client(rest_host='localhost'))
+            self.assertIsNot(
+                client,
+                get_rest_client(rest_host='localhost', tenant_name='other'))
+        self.assertIsNot(client, get_rest_client(rest_host='localhost'))
+
+    def test_session_tokens(self):
+        self.use_manager(manager_username=None, manager_password=None)
+        get_rest_client = self.original_utils_get_rest_client
+        self.assertIsNone(get_rest_client()._client.session_token)
+        with mock.patch.dict(os.environ, {
+                constants.CLOUDIFY_SESSION_TOKENS: 'true'}):
+            session_token = get_rest_client()._client.session_token
+        self.assertIsNotNone(session_token)
+        self.assertEqual(
+            os.path.join(env.get_profile_dir(), 'session_token'),
+            session_token.path)
+        env.profile.session_tokens = True
+        self.assertIs(session_token, get_rest_client()._client.session_token)
+
+    def test_pooled_rest_clients(self):
+        get_rest_client = self.original_utils_get_rest_client
+        self.addCleanup(env._client_pool.clear)
+        client = get_rest_client(rest_host='localhost', pooled=True)
+        self.assertIs(client,
+                      get_rest_client(rest_host='localhost', pooled=True))
+        other_tenant = get_rest_client(
+            rest_host='localhost', tenant_name='other', pooled=True)
+        self.assertIsNot(client, other_tenant)
+        self.assertEqual('other', other_tenant._client.tenant_name)
+        # the clients of all the tenants share the connections
+        self.assertIs(client._client._session, other_tenant._client._session)
+        self.assertIsNot(client, get_rest_client(rest_host='localhost'))
+
 
 class TestUtils(CliCommandTest):
     _TAR_TYPES_TO_FLAGS = {'tar': 'w', 'tar.gz': 'w:gz', 'tar.bz2': 'w:bz2'}
@@ -1120,18 +1552,210 @@ class TestClusterRestClient(CliCommandTest):
 
         return mock.patch('requests.Session.get', side_effect=_mocked_get)
 
-    def test_manager_offline(self):
+    def _mock_probe(self, latencies):
+        """Mock probing the nodes: latencies is a dict of the latency of
+        each node, with None for the nodes that are offline.
+        """
+        def _probe(host, port, timeout=None):
+            if latencies[host]:
+                time.sleep(latencies[host])
+            return latencies[host]
+        return mock.patch('cloudify_cli.cluster_client.probe_node',
+                          side_effect=_probe)
+
+    def _cluster_client(self, nodes=2):
+        self.use_manager()
         env.profile.manager_ip = '127.0.0.1'
         env.profile.cluster = {'manager': [
-            {'host_ip': '127.0.0.1', 'hostname': 'manager_1'},
-            {'host_ip': '127.0.0.2', 'hostname': 'manager_2'}
+            {'host_ip': '127.0.0.{0}'.format(index),
+             'hostname': 'manager_{0}'.format(index)}
+            for index in range(1, nodes + 1)
         ]}
-        c = env.CloudifyClusterClient(env.profile, host='127.0.0.1')
+        return cluster_client.CloudifyClusterClient(
+            env.profile, host='127.0.0.1')
 
-        with self._mock_get('127.0.0.2', ['127.0.0.1']) as mocked_get:
-            response = c.blueprints.list()
+    def test_manager_offline(self):
+        c = self._cluster_client()
+        with self._mock_probe({'127.0.0.2': 0.01}):
+            with self._mock_get('127.0.0.2', ['127.0.0.1']) as mocked_get:
+                response = c.blueprints.list()
 
         self.assertEqual([], list(response))
         self.assertEqual(2, len(mocked_get.mock_calls))
         self.assertEqual('127.0.0.2',
                          env.profile.cluster['manager'][0]['host_ip'])
+        saved = env.get_profile_context(env.profile.profile_name)
+        self.assertEqual('127.0.0.2', saved.cluster['manager'][0]['host_ip'])
+
+    def test_manager_offline_first_responder(self):
+        c = self._cluster_client(nodes=3)
+        latencies = {'127.0.0.2': 0.2, '127.0.0.3': 0.01}
+        with self._mock_probe(latencies):
+            with self._mock_get('127.0.0.3',
+                                ['127.0.0.1', '127.0.0.2']) as mocked_get:
+                c.blueprints.list()
+        # the node that answered the probe first was tried first
+        self.assertEqual(2, len(mocked_get.mock_calls))
+
+        # a new command remembers the offline manager, and doesn't wait
+        # for it again
+        c = cluster_client.CloudifyClusterClient(
+            env.profile, host='127.0.0.1')
+        with self._mock_probe(latencies) as mocked_probe:
+            with self._mock_get('127.0.0.3', ['127.0.0.1']) as mocked_get:
+                c.blueprints.list()
+        self.assertEqual(1, len(mocked_get.mock_calls))
+        self.assertFalse(mocked_probe.called)
+
+    def test_manager_offline_sequential(self):
+        self._cluster_client(nodes=3)
+        with mock.patch.dict(os.environ, {
+                constants.CLOUDIFY_CLUSTER_FAILOVER: 'sequential'}):
+            c = cluster_client.CloudifyClusterClient(
+                env.profile, host='127.0.0.1')
+        with self._mock_probe({}) as mocked_probe:
+            with self._mock_get('127.0.0.3',
+                                ['127.0.0.1', '127.0.0.2']) as mocked_get:
+                c.blueprints.list()
+        self.assertEqual(3, len(mocked_get.mock_calls))
+        self.assertFalse(mocked_probe.called)
+
+    def test_health_saved_only_on_change(self):
+        path = os.path.join(tempfile.mkdtemp(), 'health.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        health = cluster_client.NodesHealth(path, ttl=60)
+        health.update('m1', True, 0.05)
+        self.assertTrue(health.changed)
+        health.save()
+        self.assertEqual(['health.json'], os.listdir(os.path.dirname(path)))
+
+        health.update('m1', True)
+        health.update('m1', True, 0.052)
+        self.assertFalse(health.changed)
+        health.update('m1', True, 0.2)
+        self.assertTrue(health.changed)
+        health.save()
+        health.update('m1', False)
+        self.assertTrue(health.changed)
+        health.save()
+
+        # refreshed when it's halfway to expiring
+        with mock.patch('cloudify_cli.cluster_client.time.time',
+                        return_value=time.time() + 31):
+            health.update('m1', False)
+        self.assertTrue(health.changed)
+
+    def test_persisted_before_command_ends(self):
+        c = self._cluster_client()
+        saved = []
+
+        def _slow_save():
+            time.sleep(0.2)
+            saved.append(True)
+
+        with mock.patch.object(env.ProfileContext, 'save',
+                               side_effect=_slow_save):
+            with click.Context(click.Command('cfy')):
+                with self._mock_probe({'127.0.0.2': 0.01}):
+                    with self._mock_get('127.0.0.2', ['127.0.0.1']):
+                        c.blueprints.list()
+            self.assertEqual([True], saved)
+
+    def test_persisted_outside_command(self):
+        c = self._cluster_client()
+        saved = []
+
+        def _slow_save():
+            time.sleep(0.2)
+            saved.append(True)
+
+        with mock.patch.object(env.ProfileContext, 'save',
+                               side_effect=_slow_save):
+            with self._mock_probe({'127.0.0.2': 0.01}):
+                with self._mock_get('127.0.0.2', ['127.0.0.1']):
+                    c.blueprints.list()
+            self.assertEqual([True], saved)
+        self.assertIsNone(c._client._persisting)
+
+    def _mock_put(self, manager, fail_after):
+        """Mock requests.put, recording how much of the body each manager
+        got. Managers other than the given one fail after fail_after bytes
+        of the body.
+        """
+        received = []
+
+        def _mocked_put(request_url, data=None, **kwargs):
+            size = 0
+            chunks = [data] if isinstance(data, bytes) else (
+                iter(lambda: data.read(1024), b'')
+                if hasattr(data, 'read') else data)
+            for chunk in chunks:
+                size += len(chunk)
+                if manager not in request_url and size >= fail_after:
+                    received.append(size)
+                    raise requests.exceptions.ConnectionError()
+            received.append(size)
+            response = mock.Mock()
+            response.status_code = 200
+            response.json.return_value = {}
+            return response
+        return received, mock.patch('requests.Session.put',
+                                    side_effect=_mocked_put)
+
+    def _upload(self, data, fail_after):
+        c = self._cluster_client()
+        received, mocked_put = self._mock_put('127.0.0.2', fail_after)
+        with self._mock_probe({'127.0.0.2': 0.01}), mocked_put:
+            c._client.put('/snapshots/s1/archive', data=data)
+        return received
+
+    def test_upload_generator_failover(self):
+        chunks = [os.urandom(1000) for _ in range(10)]
+        received = self._upload((chunk for chunk in chunks), 2500)
+        self.assertEqual([3000, 10000], received)
+
+    def test_upload_file_failover(self):
+        with tempfile.TemporaryFile() as f:
+            f.write(b'x' * 10000)
+            f.seek(100)
+            received = self._upload(f, 2500)
+        self.assertEqual([3072, 9900], received)
+
+    def test_upload_failover_constant_memory(self):
+        chunk = b'x' * 1024 ** 2
+        # larger than any cap a spool might have by default
+        upload_size = 1024 ** 3 + len(chunk)
+
+        def _generate():
+            for _ in range(upload_size // len(chunk)):
+                yield chunk
+
+        tracemalloc.start()
+        try:
+            received = self._upload(_generate(), 512 * len(chunk))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual([512 * len(chunk), upload_size], received)
+        self.assertLess(peak, 64 * 1024 ** 2)
+
+    @mock.patch.dict(os.environ, {
+        constants.CLOUDIFY_CLUSTER_SPOOL_MAX_SIZE: '5000'})
+    def test_upload_too_large_to_replay(self):
+        chunks = [os.urandom(1000) for _ in range(10)]
+        with self.assertRaisesRegex(CloudifyClientError, 'another manager'):
+            self._upload((chunk for chunk in chunks), 8000)
+
+    def test_upload_single_manager_not_spooled(self):
+        self.use_manager()
+        env.profile.manager_ip = '127.0.0.1'
+        env.profile.cluster = {'manager': [{'host_ip': '127.0.0.1'}]}
+        c = cluster_client.CloudifyClusterClient(
+            env.profile, host='127.0.0.1')
+        received, mocked_put = self._mock_put('127.0.0.1', 0)
+        with mock.patch('tempfile.SpooledTemporaryFile') as spool, \
+                mocked_put:
+            c._client.put('/snapshots/s1/archive',
+                          data=(chunk for chunk in [b'x' * 1000]))
+        self.assertEqual([1000], received)
+        self.assertFalse(spool.called)
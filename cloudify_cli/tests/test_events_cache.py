@@ -0,0 +1,178 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from mock import MagicMock
+from testtools import TestCase
+
+from cloudify_rest_client.client import CloudifyClient
+from cloudify_rest_client.executions import Execution
+from cloudify_rest_client.responses import ListResponse
+
+from ..events_cache import EventsCache
+from ..execution_events_fetcher import ExecutionEventsFetcher
+
+
+class EventsCacheTest(TestCase):
+    def setUp(self):
+        super(EventsCacheTest, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.cache = EventsCache(os.path.join(self.tmpdir, 'events.db'))
+        self.addCleanup(self.cache.close)
+        self.client = CloudifyClient()
+        self.client.events.list = MagicMock(side_effect=self._mock_list)
+        self.events = {}
+        for execution_id, count in [('e1', 30), ('e2', 5)]:
+            self.events[execution_id] = [{
+                'id': '{0}-{1}'.format(execution_id, index),
+                'type': 'cloudify_log' if index % 3 == 0
+                else 'cloudify_event',
+                'execution_id': execution_id,
+                'deployment_id': 'd1',
+                'node_name': 'node_{0}'.format(index % 2),
+                'node_instance_id': 'node_{0}_{1}'.format(index % 2,
+                                                          index % 4),
+                'operation': 'op_{0}'.format(index % 5),
+                'reported_timestamp':
+                    '2020-01-01T00:00:{0:06.3f}Z'.format(index / 1000.0),
+                'message': 'event {0}'.format(index),
+            } for index in range(count)]
+
+    def _mock_list(self, execution_id, include_logs=False,
+                   from_datetime=None, node_id=None, operation=None,
+                   _offset=0, _size=100, **kwargs):
+        events = [
+            dict(event) for event in self.events[execution_id]
+            if (include_logs or event['type'] == 'cloudify_event') and
+            (from_datetime is None or
+             event['reported_timestamp'] >= from_datetime) and
+            # the manager matches node_id against the node name
+            (node_id is None or event['node_name'] == node_id) and
+            (operation is None or event['operation'] == operation)
+        ]
+        return ListResponse(events[_offset:_offset + _size], {
+            'pagination': {'total': len(events), 'offset': _offset,
+                           'size': _size}})
+
+    def _execution(self, execution_id='e1', status=Execution.TERMINATED):
+        return Execution({'id': execution_id, 'status': status,
+                          'deployment_id': 'd1'})
+
+    def _list(self, execution, offset=0, size=10, **list_kwargs):
+        fetched = []
+        events_fetcher = ExecutionEventsFetcher(
+            self.client,
+            execution=execution,
+            events_cache=self.cache,
+            execution_id=execution.id,
+            **list_kwargs)
+        _, total = events_fetcher.fetch_and_process_events_batch(
+            events_handler=fetched.extend, offset=offset, size=size)
+        return [event['id'] for event in fetched], total
+
+    def _list_all(self, execution_id='e1', size=100):
+        """List all the events with the logs, page by page"""
+        offset = 0
+        while True:
+            events, total = self._list(self._execution(execution_id),
+                                       offset=offset, size=size,
+                                       include_logs=True)
+            offset += len(events)
+            if offset >= total:
+                return
+
+    def test_cached_like_the_manager(self):
+        queries = [
+            {'include_logs': True},
+            {'include_logs': False, 'offset': 5},
+            {'include_logs': True, 'node_id': 'node_1', 'size': 100},
+            {'include_logs': False, 'operation': 'op_3', 'offset': 1},
+        ]
+        from_manager = [self._list(self._execution(status=Execution.STARTED),
+                                   **query) for query in queries]
+        self._list_all()
+        list_calls = self.client.events.list.call_count
+        from_cache = [self._list(self._execution(), **query)
+                      for query in queries]
+        self.assertEqual(from_manager, from_cache)
+        self.assertEqual(list_calls, self.client.events.list.call_count)
+
+    def test_node_filter(self):
+        from_manager = self._list(self._execution(), node_id='node_1',
+                                  include_logs=True)
+        self.assertTrue(from_manager[0])
+        self._list_all()
+        list_calls = self.client.events.list.call_count
+        self.assertEqual(from_manager, self._list(
+            self._execution(), node_id='node_1', include_logs=True))
+        self.assertEqual(list_calls, self.client.events.list.call_count)
+
+    def test_filled_by_pages(self):
+        self._list_all(size=7)
+        self.assertEqual(5, self.client.events.list.call_count)
+        self.assertIsNotNone(self.cache.list_events('execution', 'e1'))
+
+    def test_page_not_filled(self):
+        # only the page is fetched, rather than all the events
+        self.assertEqual((['e1-29'], 30), self._list(
+            self._execution(), offset=29, size=1, include_logs=True))
+        self.assertEqual((['e1-0'], 30), self._list(
+            self._execution(), size=1, include_logs=True))
+        self.assertEqual(2, self.client.events.list.call_count)
+        for call in self.client.events.list.call_args_list:
+            self.assertEqual(1, call[1]['_size'])
+        self.assertIsNone(self.cache.list_events('execution', 'e1'))
+
+    def test_filtered_not_filled(self):
+        for query in [{'include_logs': False},
+                      {'include_logs': True, 'node_id': 'node_1'},
+                      {'include_logs': True, 'operation': 'op_1'}]:
+            self._list(self._execution(), size=100, **query)
+        self.assertIsNone(self.cache.list_events('execution', 'e1'))
+
+    def test_running_not_filled(self):
+        self._list(self._execution(status=Execution.STARTED), size=100,
+                   include_logs=True)
+        self.assertIsNone(self.cache.list_events('execution', 'e1'))
+
+    def test_not_cached_with_time_range(self):
+        self._list(self._execution(), include_logs=True, size=100,
+                   from_datetime='2020-01-01T00:00:00.010Z')
+        self.assertIsNone(self.cache.list_events('execution', 'e1'))
+
+    def test_too_large(self):
+        self.cache.max_size = 100
+        self._list_all(size=10)
+        self._list_all(size=10)
+        self.assertIsNone(self.cache.list_events('execution', 'e1'))
+        self.assertEqual(6, self.client.events.list.call_count)
+        self.assertEqual(0, self.cache.size())
+
+    def test_old_schema(self):
+        conn = sqlite3.connect(self.cache.path)
+        conn.execute('CREATE TABLE events (stream_id INTEGER, '
+                     'node_id TEXT, payload TEXT)')
+        conn.close()
+        self._list_all()
+        self.assertEqual(['e1-1'], self._list(
+            self._execution(), node_id='node_1', size=1)[0])
+
+    def test_evict_least_recently_used(self):
+        self._list_all('e1')
+        self._list_all('e2')
+        self._list(self._execution('e1'))
+        size = self.cache.size()
+        evicted, freed = self.cache.prune(max_size=size - 1)
+        self.assertEqual(1, evicted)
+        self.assertEqual(size - freed, self.cache.size())
+        self.assertIsNotNone(self.cache.list_events('execution', 'e1'))
+        self.assertIsNone(self.cache.list_events('execution', 'e2'))
+
+    def test_remove_deployment(self):
+        self._list_all('e1')
+        self.cache.remove(deployment_id='d2')
+        self.assertIsNotNone(self.cache.list_events('execution', 'e1'))
+        self.cache.remove(deployment_id='d1')
+        self.assertIsNone(self.cache.list_events('execution', 'e1'))
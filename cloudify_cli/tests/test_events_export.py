@@ -0,0 +1,151 @@
+import os
+import gzip
+import json
+import shutil
+import tempfile
+
+from mock import MagicMock
+from testtools import TestCase
+
+from cloudify_rest_client.client import CloudifyClient
+from cloudify_rest_client.responses import ListResponse
+
+from ..exceptions import CloudifyCliError
+from ..events_export import (
+    EventsExporter,
+    EventsOutput,
+    TextEventsFormat,
+    load_checkpoint,
+    new_checkpoint,
+    resume_offset,
+)
+
+BATCH_SIZE = 10
+
+
+class EventsExporterTest(TestCase):
+    def setUp(self):
+        super(EventsExporterTest, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.output_path = os.path.join(self.tmpdir, 'events.ndjson.gz')
+        self.checkpoint_path = self.output_path + '.checkpoint'
+        self.client = CloudifyClient()
+        self.client.events.list = MagicMock(side_effect=self._mock_list)
+        self.events = {
+            'e1': self._generate_events('e1', 25),
+            'e2': self._generate_events('e2', 0),
+            'e3': self._generate_events('e3', 2 * BATCH_SIZE),
+            'e4': self._generate_events('e4', 7),
+        }
+        # list calls that fail, by execution
+        self.failing = {}
+
+    def _generate_events(self, execution_id, count, with_timestamp=True):
+        events = []
+        for index in range(count):
+            event = {
+                'id': '{0}-{1}'.format(execution_id, index),
+                'type': 'cloudify_event',
+                'event_type': 'task_succeeded',
+                'deployment_id': 'd1',
+                'execution_id': execution_id,
+                'timestamp': '2020-01-01T00:00:00.000Z',
+                'message': 'event {0}'.format(index),
+            }
+            if with_timestamp:
+                # pairs of events share a timestamp
+                event['reported_timestamp'] = \
+                    '2020-01-01T00:00:{0:06.3f}Z'.format(index // 2 / 1000.0)
+            events.append(event)
+        return events
+
+    def _mock_list(self, execution_id, from_datetime=None, _offset=0,
+                   _size=100, **kwargs):
+        failing = self.failing.get(execution_id)
+        if failing is not None:
+            if failing == 0:
+                raise RuntimeError('Lost the manager')
+            self.failing[execution_id] -= 1
+        events = [dict(event) for event in self.events[execution_id]
+                  if from_datetime is None or
+                  event['reported_timestamp'] >= from_datetime]
+        return ListResponse(events[_offset:_offset + _size], {
+            'pagination': {'total': len(events), 'offset': _offset,
+                           'size': _size}})
+
+    def _export(self, checkpoint=None, offset=None, parallel=2):
+        checkpoint = checkpoint or new_checkpoint(
+            sorted(self.events), {'include_logs': True}, 'gzip')
+        with EventsOutput(self.output_path, 'gzip', offset) as output:
+            exporter = EventsExporter(
+                self.client, output,
+                parallel=parallel,
+                batch_size=BATCH_SIZE,
+                checkpoint_path=self.checkpoint_path)
+            return exporter.export(checkpoint)
+
+    def _exported(self):
+        with gzip.open(self.output_path, 'rt') as f:
+            return [json.loads(line) for line in f]
+
+    def _all_events(self):
+        return [event for execution_id in sorted(self.events)
+                for event in self.events[execution_id]]
+
+    def test_export(self):
+        self.assertEqual(52, self._export())
+        # written in the order of the executions, as returned by the API
+        self.assertEqual(self._all_events(), self._exported())
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+
+    def test_resume(self):
+        # e3 fails after its first batch
+        self.failing['e3'] = 1
+        self.assertRaises(RuntimeError, self._export, parallel=1)
+        checkpoint = load_checkpoint(self.checkpoint_path)
+        self.assertEqual(2, checkpoint['done'])
+        self.assertEqual('e3', checkpoint['current']['execution_id'])
+        # an unfinished chunk, which wasn't checkpointed
+        with open(self.output_path, 'ab') as f:
+            f.write(b'\x1f\x8b\x08\x00')
+
+        del self.failing['e3']
+        offset = resume_offset(checkpoint)
+        self.assertEqual(52, self._export(checkpoint, offset))
+        self.assertEqual(self._all_events(), self._exported())
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+
+    def test_resume_without_cursor(self):
+        # these events can only be fetched by offset, so the execution is
+        # exported from its start again
+        self.events['e3'] = self._generate_events(
+            'e3', 2 * BATCH_SIZE, with_timestamp=False)
+        self.failing['e3'] = 1
+        self.assertRaises(RuntimeError, self._export, parallel=1)
+        checkpoint = load_checkpoint(self.checkpoint_path)
+        self.assertIsNone(checkpoint['current']['cursor'])
+
+        del self.failing['e3']
+        offset = resume_offset(checkpoint)
+        self.assertEqual(52, self._export(checkpoint, offset))
+        self.assertEqual(self._all_events(), self._exported())
+
+    def test_text_format(self):
+        self.events = {'e1': self._generate_events('e1', 2)}
+        output_path = os.path.join(self.tmpdir, 'events.log')
+        with EventsOutput(output_path) as output:
+            EventsExporter(
+                self.client, output, events_format=TextEventsFormat()
+            ).export(new_checkpoint(['e1'], {}))
+        with open(output_path) as f:
+            lines = f.read().splitlines()
+        self.assertEqual('Listing events for execution id e1', lines[1])
+        self.assertIn('event 1', lines[4])
+        self.assertEqual('Listed 2 events', lines[-1])
+
+    def test_invalid_checkpoint(self):
+        with open(self.checkpoint_path, 'w') as f:
+            f.write('{"version": 0}')
+        self.assertRaises(CloudifyCliError,
+                          load_checkpoint, self.checkpoint_path)
@@ -0,0 +1,94 @@
+"""Benchmark printing events with the events loggers.
+
+Events are wrapped in records, like ExecutionEventsFetcher does with the
+events fetched by `cfy events list`, and passed to the text and JSON
+loggers of `get_events_logger`. Run this module directly to print the
+number of events per second:
+
+    python -m cloudify_cli.tests.test_events_logger_benchmark
+"""
+import io
+import json
+import time
+from contextlib import redirect_stdout
+
+from testtools import TestCase
+
+from .. import logger
+from ..execution_events_fetcher import EventRecord
+
+EVENTS_COUNT = 1000
+BATCH_SIZE = 100
+
+
+def generate_events(count):
+    return [{
+        'id': index,
+        'type': 'cloudify_event',
+        'reported_timestamp': '2020-01-01T00:00:{0:06.3f}Z'.format(
+            index / 1000.0),
+        'timestamp': '2020-01-01T00:00:{0:06.3f}Z'.format(index / 1000.0),
+        'deployment_id': 'd1',
+        'execution_id': 'e1',
+        'node_name': 'node',
+        'operation': 'cloudify.interfaces.lifecycle.create',
+        'workflow_id': 'install',
+        'node_instance_id': 'node_abc123',
+        'source_id': None,
+        'target_id': None,
+        'event_type': 'task_succeeded',
+        'message': 'Task succeeded {0}'.format(index),
+        'error_causes': None,
+    } for index in range(count)]
+
+
+def log_events(events, json_output):
+    """Map and print the events in batches, and return the output"""
+    events_logger = logger.get_events_logger(json_output=json_output)
+    output = io.StringIO()
+    with redirect_stdout(output):
+        for start in range(0, len(events), BATCH_SIZE):
+            events_logger([
+                EventRecord(event)
+                for event in events[start:start + BATCH_SIZE]
+            ])
+    return output.getvalue()
+
+
+class EventsLoggerBenchmarkTest(TestCase):
+    def test_json_output_is_the_payload(self):
+        events = generate_events(EVENTS_COUNT)
+        output = log_events(events, json_output=True)
+        self.assertEqual(
+            events, [json.loads(line) for line in output.splitlines()])
+
+    def test_text_output(self):
+        events = generate_events(EVENTS_COUNT)
+        output = log_events(events, json_output=False)
+        lines = output.splitlines()
+        self.assertEqual(EVENTS_COUNT, len(lines))
+        self.assertIn('<d1>', lines[-1])
+        self.assertIn('[node_abc123.create]', lines[-1])
+        self.assertIn('Task succeeded {0}'.format(EVENTS_COUNT - 1),
+                      lines[-1])
+
+    def test_events_not_modified(self):
+        events = generate_events(1)
+        record = EventRecord(events[0])
+        self.assertEqual('node_abc123', record['context']['node_id'])
+        self.assertEqual(generate_events(1), events)
+
+
+def main(events_count=100 * EVENTS_COUNT):
+    events = generate_events(events_count)
+    print('{0} events, in batches of {1}'.format(events_count, BATCH_SIZE))
+    print('{0:>8} {1:>12}'.format('output', 'events/s'))
+    for name, json_output in (('text', False), ('json', True)):
+        started = time.time()
+        log_events(events, json_output)
+        print('{0:>8} {1:>12.0f}'.format(
+            name, events_count / (time.time() - started)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""Benchmark paging through events by offset, and by cursor.
+
+This runs ExecutionEventsFetcher against a local fake of the manager's
+events endpoint. Like a database, the fake has to step over all the rows
+before the requested offset, but can seek straight to a timestamp. Run this
+module directly to print the average time per page:
+
+    python -m cloudify_cli.tests.test_events_pagination
+"""
+import json
+import time
+import bisect
+import threading
+from itertools import islice
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from testtools import TestCase
+
+from cloudify_rest_client.client import CloudifyClient
+
+from ..execution_events_fetcher import ExecutionEventsFetcher
+
+EVENTS_COUNT = 20000
+BATCH_SIZE = 200
+# events that share a timestamp, so that batches end between them
+EVENTS_PER_TIMESTAMP = 3
+
+
+class FakeEventsServer(object):
+    def __init__(self, events):
+        self.events = events
+        self.timestamps = [event['reported_timestamp'] for event in events]
+        # the number of rows visited to serve each request
+        self.rows_scanned = []
+        self._server = HTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def list_events(self, params):
+        offset = int(params.get('_offset', ['0'])[0])
+        size = int(params.get('_size', ['1000'])[0])
+        start = 0
+        for timestamp_range in params.get('_range', []):
+            _, from_datetime, _ = timestamp_range.split(',')
+            if from_datetime:
+                start = bisect.bisect_left(self.timestamps, from_datetime)
+        rows = iter(self.events[i] for i in range(start, len(self.events)))
+        items = list(islice(rows, offset, offset + size))
+        self.rows_scanned.append(offset + len(items))
+        return {
+            'items': items,
+            'metadata': {'pagination': {
+                'total': len(self.events) - start,
+                'offset': offset,
+                'size': size,
+            }},
+        }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if not url.path.endswith('/events'):
+                    self.send_error(404)
+                    return
+                body = json.dumps(
+                    server.list_events(parse_qs(url.query))).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def generate_events(count):
+    return [{
+        'id': index,
+        'reported_timestamp': '2020-01-01T{0:02d}:{1:02d}:{2:06.3f}Z'.format(
+            *_split_timestamp(index // EVENTS_PER_TIMESTAMP)),
+        'deployment_id': 'd1',
+        'execution_id': 'e1',
+        'node_name': 'node',
+        'operation': 'cloudify.interfaces.lifecycle.create',
+        'workflow_id': 'install',
+        'node_instance_id': 'node_abc123',
+        'source_id': None,
+        'target_id': None,
+        'event_type': 'task_succeeded',
+        'message': 'Task succeeded {0}'.format(index),
+        'error_causes': None,
+    } for index in range(count)]
+
+
+def _split_timestamp(milliseconds):
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return hours, minutes, seconds + milliseconds / 1000.0
+
+
+def fetch_all(port, cursor):
+    """Fetch all the events, and return them with the time of each page"""
+    client = CloudifyClient(host='127.0.0.1', port=port, protocol='http')
+    events_fetcher = ExecutionEventsFetcher(
+        client, batch_size=BATCH_SIZE, cursor=cursor)
+    fetched = []
+    page_times = []
+    while True:
+        started = time.time()
+        count, _ = events_fetcher.fetch_and_process_events_batch(
+            events_handler=fetched.extend)
+        page_times.append(time.time() - started)
+        if count < BATCH_SIZE:
+            return fetched, page_times
+
+
+class EventsPaginationBenchmarkTest(TestCase):
+    def _fetch(self, cursor):
+        with FakeEventsServer(generate_events(EVENTS_COUNT)) as server:
+            fetched, _ = fetch_all(server.port, cursor)
+        self.assertEqual(list(range(EVENTS_COUNT)),
+                         [event['id'] for event in fetched])
+        return server.rows_scanned
+
+    def test_offset_pages_grow(self):
+        rows_scanned = self._fetch(cursor=False)
+        self.assertEqual(BATCH_SIZE, rows_scanned[0])
+        self.assertEqual(EVENTS_COUNT, rows_scanned[-2])
+
+    def test_cursor_pages_flat(self):
+        rows_scanned = self._fetch(cursor=True)
+        # every page only visits the page itself, and the events at the
+        # cursor that were already seen
+        self.assertLessEqual(
+            max(rows_scanned), BATCH_SIZE + EVENTS_PER_TIMESTAMP)
+
+
+def main(events_count=10 * EVENTS_COUNT):
+    events = generate_events(events_count)
+    results = {}
+    for cursor in (False, True):
+        with FakeEventsServer(events) as server:
+            _, results[cursor] = fetch_all(server.port, cursor)
+    pages = len(results[True])
+    print('{0} events, {1} pages of {2}'.format(
+        events_count, pages, BATCH_SIZE))
+    print('{0:>12} {1:>16} {2:>16}'.format(
+        'pages', 'offset [ms/page]', 'cursor [ms/page]'))
+    quarter = pages // 4
+    for start in range(0, 4 * quarter, quarter):
+        print('{0:>12} {1:>16.2f} {2:>16.2f}'.format(
+            '{0}-{1}'.format(start + 1, start + quarter),
+            _average(results[False][start:start + quarter]) * 1000,
+            _average(results[True][start:start + quarter]) * 1000))
+
+
+def _average(times):
+    return sum(times) / len(times)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import click
+from mock import patch
+from testtools import TestCase
+
+from ..cli import manifest
+
+
+class ManifestTest(TestCase):
+    def test_manifest_up_to_date(self):
+        """The shipped manifest matches the commands it describes.
+
+        If this fails, regenerate it using
+        `python -m cloudify_cli.cli.manifest`.
+        """
+        with open(manifest.MANIFEST_PATH) as f:
+            shipped = json.load(f)
+        self.assertEqual(
+            json.loads(json.dumps(manifest.generate())), shipped)
+
+    def test_independent_of_root_subcommands(self):
+        from cloudify_cli import main
+        make_cfy = main._make_cfy
+
+        def _make_cfy():
+            # the root's subcommands depend on the active profile
+            root = make_cfy()
+            root.add_command(click.Command('extra', params=[
+                click.Option(['--extra-option'])]))
+            return root
+
+        generated = manifest.generate()
+        with patch.object(main, '_make_cfy', _make_cfy):
+            self.assertEqual(generated, manifest.generate())
+
+    def test_check(self):
+        path = self._write_tempfile(json.dumps(manifest.generate()))
+        manifest.main(['--check', path])
+        self.assertTrue(os.path.exists(path))
+        stale = self._write_tempfile('{}')
+        self.assertRaises(SystemExit, manifest.main, ['--check', stale])
+        with open(stale) as f:
+            self.assertEqual('{}', f.read())
+
+    def test_rejects_options(self):
+        self.assertRaises(SystemExit, manifest.main, ['--chek'])
+
+    def _run_cfy(self, args):
+        # run in a subprocess, so that the imports done by other tests
+        # don't affect the outcome
+        script = (
+            'import sys\n'
+            'from cloudify_cli.main import _cfy\n'
+            'try:\n'
+            '    _cfy({0!r})\n'
+            'except SystemExit as e:\n'
+            '    print("exit %s" % (e.code, ))\n'
+            'print(sorted(m for m in sys.modules\n'
+            '             if m.startswith("cloudify_cli.")))\n'
+        ).format(args)
+        output = subprocess.check_output(
+            [sys.executable, '-c', script], stderr=subprocess.STDOUT,
+            universal_newlines=True)
+        lines = output.strip().splitlines()
+        return '\n'.join(lines[:-1]), eval(lines[-1])
+
+    def _assert_served_from_manifest(self, modules):
+        self.assertNotIn('cloudify_cli.cli.cfy', modules)
+        self.assertFalse(
+            [m for m in modules if m.startswith('cloudify_cli.commands.')])
+
+    def test_help_from_manifest(self):
+        output, modules = self._run_cfy(['blueprints', 'list', '-h'])
+        self.assertIn('blueprints list [OPTIONS]', output)
+        self.assertIn('--extended-view', output)
+        self.assertIn('exit 0', output)
+        self._assert_served_from_manifest(modules)
+
+    def test_group_help_from_manifest(self):
+        output, modules = self._run_cfy(['blueprints'])
+        self.assertIn('Commands:', output)
+        self.assertIn('validate', output)
+        self._assert_served_from_manifest(modules)
+
+    def test_unknown_command_from_manifest(self):
+        output, modules = self._run_cfy(['blueprnts'])
+        self.assertIn("No such command 'blueprnts'", output)
+        self.assertIn('exit 2', output)
+        self._assert_served_from_manifest(modules)
+
+    def test_stale_manifest(self):
+        data = manifest.load()
+        self.addCleanup(setattr, manifest, '_manifest', data)
+        stale = dict(data, fingerprint=data['fingerprint'] + 'x')
+        path = self._write_tempfile(json.dumps(stale))
+        self.assertIsNone(manifest._read_manifest(path))
+
+    def test_fingerprint_same_size_edit(self):
+        package_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, package_dir)
+        module_path = os.path.join(package_dir, 'commands.py')
+        modules = ['cloudify_cli.commands']
+        with patch.object(manifest, '_PACKAGE_DIR', package_dir):
+            with open(module_path, 'w') as f:
+                f.write("HELP = 'List blueprints'")
+            before = manifest.fingerprint(modules)
+            with open(module_path, 'w') as f:
+                f.write("HELP = 'List blueprintz'")
+            self.assertNotEqual(before, manifest.fingerprint(modules))
+
+    def _write_tempfile(self, content):
+        fd, path = tempfile.mkstemp(suffix='.json')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        return path
@@ -0,0 +1,84 @@
+import os
+import json
+import shutil
+import tempfile
+
+from mock import Mock, patch
+from testtools import TestCase
+
+from ..metadata_cache import MetadataCache
+from ..rest_client import CliClient
+
+
+class MetadataCacheTest(TestCase):
+    def setUp(self):
+        super(MetadataCacheTest, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.cache_path = os.path.join(self.tmpdir, 'metadata_cache.json')
+        self.version = {'version': '7.0.0', 'edition': 'premium'}
+        self.etag = '"v1"'
+        self.requests = []
+        mocked_get = patch('requests.Session.get',
+                           side_effect=self._mocked_get)
+        mocked_get.start()
+        self.addCleanup(mocked_get.stop)
+
+    def _mocked_get(self, request_url, headers=None, **kwargs):
+        self.requests.append((request_url, headers))
+        response = Mock()
+        response.history = []
+        response.headers = {'ETag': self.etag}
+        if headers.get('If-None-Match') == self.etag:
+            response.status_code = 304
+        else:
+            response.status_code = 200
+            response.json.return_value = dict(self.version)
+        return response
+
+    def _client(self, ttl=300):
+        client = CliClient(host='localhost')
+        client._client.metadata_cache = MetadataCache(self.cache_path, ttl)
+        return client
+
+    def test_memoized(self):
+        client = self._client()
+        self.assertEqual(self.version, client.manager.get_version())
+        version = client.manager.get_version()
+        version['edition'] = 'community'
+        self.assertEqual(self.version, client.manager.get_version())
+        self.assertEqual(1, len(self.requests))
+
+    def test_cached_for_other_processes(self):
+        self._client().manager.get_version()
+        self.assertEqual(self.version, self._client().manager.get_version())
+        self.assertEqual(1, len(self.requests))
+
+    def test_revalidated_when_stale(self):
+        self._client(ttl=0).manager.get_version()
+        self.assertEqual(self.version,
+                         self._client(ttl=0).manager.get_version())
+        self.assertEqual(2, len(self.requests))
+        self.assertEqual(self.etag, self.requests[1][1]['If-None-Match'])
+
+        self.etag = '"v2"'
+        self.version['version'] = '7.1.0'
+        self.assertEqual(self.version,
+                         self._client(ttl=0).manager.get_version())
+        with open(self.cache_path) as f:
+            entries = json.load(f)
+        self.assertEqual(['"v2"'],
+                         [entry['etag'] for entry in entries.values()])
+
+    def test_only_metadata_cached(self):
+        client = self._client()
+        client.blueprints.get('bp1')
+        client.blueprints.get('bp1')
+        self.assertEqual(2, len(self.requests))
+
+    def test_clear(self):
+        client = self._client()
+        client.manager.get_version()
+        client._client.metadata_cache.clear()
+        client.manager.get_version()
+        self.assertEqual(2, len(self.requests))
@@ -0,0 +1,92 @@
+import time
+import threading
+
+from testtools import TestCase
+
+from cloudify_rest_client.responses import ListResponse
+
+from .. import pagination
+
+
+class FakeListMethod(object):
+    """A list method of count items, recording its calls"""
+    def __init__(self, count):
+        self.items = [{'id': 'item{0}'.format(index)}
+                      for index in range(count)]
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, _offset=0, _size=1000, **kwargs):
+        with self._lock:
+            self.calls.append(dict(kwargs, _offset=_offset, _size=_size))
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            return ListResponse(
+                self.items[_offset:_offset + _size],
+                {'pagination': {'total': len(self.items),
+                                'offset': _offset, 'size': _size}})
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+class AllPagesTest(TestCase):
+    def test_single_page(self):
+        list_method = FakeListMethod(10)
+        items = pagination.list_items(list_method, _size=5)
+        self.assertIsInstance(items, ListResponse)
+        self.assertEqual(5, len(items))
+
+    def test_all_pages_in_order(self):
+        list_method = FakeListMethod(103)
+        items = pagination.list_items(list_method, all_pages=True, _size=10)
+        self.assertEqual(103, items.total)
+        self.assertEqual(list_method.items, list(items))
+        self.assertEqual(103, len(items))
+        self.assertEqual(11, len(list_method.calls))
+        self.assertLessEqual(list_method.max_running,
+                             pagination.PAGES_WORKERS)
+
+    def test_offset(self):
+        list_method = FakeListMethod(25)
+        items = pagination.list_items(
+            list_method, all_pages=True, _offset=5, _size=10)
+        self.assertEqual(list_method.items[5:], list(items))
+
+    def test_stable_sort(self):
+        list_method = FakeListMethod(3)
+        list(pagination.list_items(
+            list_method, all_pages=True, sort='created_at',
+            is_descending=True, _size=2))
+        self.assertEqual(['-created_at', '-id'],
+                         list_method.calls[0]['_sort'])
+        self.assertNotIn('sort', list_method.calls[0])
+
+    def test_pages_fetched_ahead(self):
+        list_method = FakeListMethod(100)
+        items = iter(pagination.list_items(
+            list_method, all_pages=True, _size=10))
+        next(items)
+        # the first page, and the next ones, fetched meanwhile
+        deadline = time.time() + 5
+        while len(list_method.calls) < 1 + pagination.PAGES_WORKERS and \
+                time.time() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.05)
+        self.assertEqual(1 + pagination.PAGES_WORKERS,
+                         len(list_method.calls))
+
+    def test_map_items(self):
+        list_method = FakeListMethod(5)
+
+        def _mark(item):
+            item['marked'] = True
+            return item
+
+        items = pagination.map_items(_mark, pagination.list_items(
+            list_method, all_pages=True, _size=2))
+        self.assertFalse(any('marked' in item for item in list_method.items))
+        self.assertTrue(all(item['marked'] for item in items))
@@ -0,0 +1,91 @@
+import os
+import stat
+import shutil
+import tempfile
+import threading
+from itertools import count
+
+from mock import Mock, patch
+from testtools import TestCase
+
+from cloudify_rest_client.tokens import Token
+
+from ..rest_client import CliClient
+from ..session_tokens import SessionToken
+
+
+class SessionTokenTest(TestCase):
+    def setUp(self):
+        super(SessionTokenTest, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.path = os.path.join(self.tmpdir, 'session_token')
+        self.token_client = Mock()
+        token_ids = count(1)
+        self.token_client.tokens.create.side_effect = \
+            lambda **kwargs: Token({'value': 'token-{0}'.format(
+                next(token_ids))})
+
+    def _session_token(self, credentials='admin:admin@localhost:80'):
+        return SessionToken(self.path, credentials,
+                            lambda: self.token_client)
+
+    def test_reused(self):
+        session_token = self._session_token()
+        self.assertEqual('token-1', session_token.get())
+        self.assertEqual('token-1', session_token.get())
+        # another cfy process uses the stored token
+        self.assertEqual('token-1', self._session_token().get())
+        self.assertEqual(1, self.token_client.tokens.create.call_count)
+
+    def test_encrypted(self):
+        self._session_token().get()
+        with open(self.path) as f:
+            self.assertNotIn('token-1', f.read())
+        self.assertEqual(0o600, stat.S_IMODE(os.stat(self.path).st_mode))
+        # a token of other credentials can't be used
+        self.assertEqual(
+            'token-2',
+            self._session_token('admin:changed@localhost:80').get())
+
+    def test_expired(self):
+        session_token = self._session_token()
+        session_token.lifetime = 60
+        self.assertEqual('token-1', session_token.get())
+        self.assertEqual('token-2', session_token.get())
+
+    def test_created_once_by_threads(self):
+        session_token = self._session_token()
+        threads = [threading.Thread(target=session_token.get)
+                   for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, self.token_client.tokens.create.call_count)
+
+    def test_refreshed_when_rejected(self):
+        client = CliClient(host='localhost', username='admin',
+                           password='admin')
+        client._client.session_token = self._session_token()
+        sent_tokens = []
+
+        def _mocked_get(request_url, headers=None, **kwargs):
+            self.assertNotIn('Authorization', headers)
+            sent_tokens.append(headers['Authentication-Token'])
+            response = Mock()
+            response.history = []
+            if sent_tokens[-1] == 'token-1':
+                response.status_code = 401
+                response.json.return_value = {
+                    'message': 'Token expired',
+                    'error_code': 'unauthorized_error'}
+            else:
+                response.status_code = 200
+                response.json.return_value = {'id': 'bp1'}
+            return response
+
+        with patch('requests.Session.get', side_effect=_mocked_get):
+            client.blueprints.get('bp1')
+            client.blueprints.get('bp1')
+        self.assertEqual(['token-1', 'token-2', 'token-2'], sent_tokens)
@@ -0,0 +1,147 @@
+"""Benchmark printing tables, with the streaming table and PrettyTable.
+
+Rows like the ones of `cfy node-instances list` are printed both by
+table.generate, which streams them, and by a PrettyTable which keeps them
+all, like table.generate used to. Run this module directly to print the
+number of rows per second, and the peak RSS, of each:
+
+    python -m cloudify_cli.tests.test_table_benchmark
+"""
+import os
+import copy
+import time
+import resource
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from mock import patch
+from testtools import TestCase
+
+from .. import table
+from ..prettytable import PrettyTable
+
+ROWS_COUNT = 1000
+COLUMNS = ['id', 'deployment_id', 'host_id', 'node_id', 'state',
+           'created_at', 'system', 'tenant_name', 'created_by']
+
+
+def generate_rows(count):
+    for index in range(count):
+        yield {
+            'id': 'vm_{0:06x}'.format(index),
+            'deployment_id': 'deployment{0}'.format(index % 7),
+            'host_id': 'vm_{0:06x}'.format(index - index % 3),
+            'node_id': 'vm',
+            'state': 'started' if index % 5 else 'creating',
+            'created_at': '2020-01-01T00:{0:02d}:00.000Z'.format(index % 60),
+            'system': index % 11 == 0,
+            'tenant_name': 'default_tenant',
+            'created_by': 'admin',
+        }
+
+
+def prettytable(cols, data, max_width=None):
+    """The table that table.generate used to make"""
+    pt = PrettyTable(cols)
+    for row in data:
+        pt.add_row([table.get_values_per_column(col, row, {})
+                    for col in cols])
+    if max_width:
+        pt.max_width = max_width
+    return pt
+
+
+class TableTest(TestCase):
+    def test_same_as_prettytable(self):
+        rows = list(generate_rows(ROWS_COUNT))
+        rows[3]['state'] = 'a very long state\nin two lines'
+        rows[5]['system'] = None
+        del rows[7]['host_id']
+        for max_width in (None, 10):
+            streamed = table.generate(COLUMNS, copy.deepcopy(rows))
+            streamed.max_width = max_width
+            self.assertEqual(
+                str(prettytable(COLUMNS, copy.deepcopy(rows), max_width)),
+                str(streamed))
+
+    def test_empty(self):
+        self.assertEqual(str(prettytable(COLUMNS, [])),
+                         str(table.generate(COLUMNS, [])))
+
+    def test_rows_printed_as_they_arrive(self):
+        read = []
+
+        def _rows():
+            for row in generate_rows(10):
+                read.append(row)
+                yield row
+
+        lines = table.StreamingTable(COLUMNS, _rows(), sample_size=2).lines()
+        # the border, header, and the first 3 rows
+        for _ in range(6):
+            next(lines)
+        self.assertEqual(3, len(read))
+
+    def test_long_values_after_sample_wrapped(self):
+        rows = list(generate_rows(3))
+        rows[2]['node_id'] = 'vm_with_a_long_name'
+        lines = list(table.StreamingTable(COLUMNS, rows, sample_size=2)
+                     .lines())
+        self.assertEqual(
+            ['| vm_with |', '| _a_long |', '|  _name  |'],
+            [line[40:51] for line in lines[-2].split('\n')])
+
+    def test_spill(self):
+        rows = list(generate_rows(3))
+        rows[2]['node_id'] = 'vm_with_a_long_name'
+        streamed = table.StreamingTable(COLUMNS, copy.deepcopy(rows),
+                                        sample_size=2, spill=True)
+        self.assertEqual(str(prettytable(COLUMNS, rows)), str(streamed))
+
+    def test_timestamp_column_detected_once(self):
+        with patch('cloudify_cli.table.get_timestamp',
+                   wraps=table.get_timestamp) as get_timestamp:
+            lines = list(table.generate(COLUMNS, generate_rows(100))
+                         .lines())
+        self.assertEqual(len(COLUMNS) - 1, get_timestamp.call_count)
+        self.assertIn(' 2020-01-01 00:01:00.000  ', lines[4])
+
+
+def _print_prettytable(rows_count):
+    with open(os.devnull, 'w') as f:
+        f.write(str(prettytable(COLUMNS, generate_rows(rows_count))))
+
+
+def _print_streamed(rows_count):
+    with open(os.devnull, 'w') as f:
+        for line in table.generate(COLUMNS, generate_rows(rows_count)) \
+                .lines():
+            f.write(line)
+
+
+def _measure(print_table, rows_count):
+    started = time.time()
+    print_table(rows_count)
+    elapsed = time.time() - started
+    # in KiB, on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rows_count / elapsed, peak_rss / 1024.0
+
+
+def main(rows_count=50 * ROWS_COUNT):
+    print('{0} rows of {1} columns'.format(rows_count, len(COLUMNS)))
+    print('{0:>12} {1:>12} {2:>14}'.format(
+        'table', 'rows/s', 'peak RSS (MB)'))
+    context = multiprocessing.get_context('spawn')
+    for name, print_table in (('prettytable', _print_prettytable),
+                              ('streamed', _print_streamed)):
+        # each in a new process, for the peak RSS to be its own
+        with ProcessPoolExecutor(1, mp_context=context) as executor:
+            rows_per_second, peak_rss = executor.submit(
+                _measure, print_table, rows_count).result()
+        print('{0:>12} {1:>12.0f} {2:>14.1f}'.format(
+            name, rows_per_second, peak_rss))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import os
+import json
+import shutil
+import datetime
+import tempfile
+
+import requests
+from testtools import TestCase
+
+from .. import timings
+from .commands.test_base import CliCommandTest
+
+
+def _response(method, url, status=200, latency=0.01, bytes_in=100):
+    request = requests.Request(method, url, data=b'x' * 10).prepare()
+    response = requests.Response()
+    response.request = request
+    response.url = url
+    response.status_code = status
+    response.elapsed = datetime.timedelta(seconds=latency)
+    response.headers['Content-Length'] = str(bytes_in)
+    return response
+
+
+class TimingsRecorderTest(TestCase):
+    def setUp(self):
+        super(TimingsRecorderTest, self).setUp()
+        self.recorder = timings.TimingsRecorder()
+        for index in range(20):
+            self.recorder._on_response(_response(
+                'GET',
+                'https://10.0.0.{0}:443/api/v3.1/nodes/n{1}?_size=1000'
+                .format(index % 2, index),
+                latency=(index + 1) / 1000.0))
+        self.recorder._on_response(_response(
+            'GET', 'https://10.0.0.1:443/api/version', status=304))
+
+    def test_requests(self):
+        request = self.recorder.requests[3]
+        self.assertEqual('GET', request['method'])
+        self.assertEqual('/api/v3.1/nodes/n3', request['path'])
+        self.assertEqual('10.0.0.1', request['node'])
+        self.assertEqual(10, request['bytes_out'])
+        self.assertEqual(100, request['bytes_in'])
+
+    def test_summary(self):
+        nodes, version, total = self.recorder.summary()
+        self.assertEqual('GET /nodes', nodes['endpoint'])
+        self.assertEqual(20, nodes['calls'])
+        self.assertEqual('10.0', nodes['p50_ms'])
+        self.assertEqual('19.0', nodes['p95_ms'])
+        self.assertEqual(2000, nodes['bytes_in'])
+        self.assertEqual('GET /version', version['endpoint'])
+        self.assertEqual(21, total['calls'])
+
+    def test_trace(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'trace.json')
+        self.recorder.write_trace(path)
+        with open(path) as f:
+            events = json.load(f)['traceEvents']
+        self.assertEqual(21, len(events))
+        self.assertEqual('GET /api/v3.1/nodes/n0', events[0]['name'])
+        self.assertEqual('X', events[0]['ph'])
+        self.assertEqual(1000, events[0]['dur'])
+
+
+class TimingsCommandTest(CliCommandTest):
+    def test_timings_file(self):
+        path = os.path.join(str(self.tmpdir), 'trace.json')
+        outcome = self.invoke(
+            'cfy --timings --timings-file {0} profiles list'.format(path))
+        self.assertIn('No REST requests were made', outcome.output)
+        with open(path) as f:
+            self.assertEqual([], json.load(f)['traceEvents'])
+        self.assertIsNone(timings.get_recorder())
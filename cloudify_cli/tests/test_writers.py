@@ -0,0 +1,117 @@
+import csv
+import sys
+import json
+import types
+import uuid
+from datetime import datetime, timezone
+
+from mock import MagicMock, patch
+from testtools import TestCase
+
+from .. import writers
+from .commands.mocks import MockListResponse
+from .commands.test_base import CliCommandTest
+
+COLUMNS = ['id', 'labels', 'created_at']
+
+
+def _rows(count):
+    for index in range(count):
+        yield {'id': 'd{0}'.format(index),
+               'labels': [{'key': 'a', 'value': 'b'}],
+               'created_at': None}
+
+
+class WritersTest(TestCase):
+    def _write(self, output_format, rows, **kwargs):
+        chunks = []
+        writer = writers.WRITERS[output_format](
+            COLUMNS, defaults={'created_at': 'never'}, write=chunks.append,
+            **kwargs)
+        writer.write_rows(rows)
+        return ''.join(chunks), chunks
+
+    def test_json(self):
+        output, _ = self._write('json', _rows(3), labels={'id': 'ID'})
+        rows = json.loads(output)
+        self.assertEqual(3, len(rows))
+        self.assertEqual({'ID': 'd0', 'labels': [{'key': 'a', 'value': 'b'}],
+                          'created_at': 'never'}, rows[0])
+        self.assertEqual(5, len(output.splitlines()))
+
+    def test_json_empty(self):
+        output, _ = self._write('json', [])
+        self.assertEqual([], json.loads(output))
+
+    def test_ndjson(self):
+        output, _ = self._write('ndjson', _rows(3))
+        self.assertEqual(['d0', 'd1', 'd2'],
+                         [json.loads(line)['id']
+                          for line in output.splitlines()])
+
+    def test_csv(self):
+        output, _ = self._write('csv', _rows(2))
+        lines = list(csv.reader(output.splitlines()))
+        self.assertEqual(COLUMNS, lines[0])
+        self.assertEqual(['d1', 'never'], [lines[2][0], lines[2][2]])
+        self.assertEqual([{'key': 'a', 'value': 'b'}], json.loads(lines[2][1]))
+
+    def test_json_encoder(self):
+        output, _ = self._write('json', _rows(1),
+                                encode=writers._json_encoder())
+        self.assertIn('"labels": [{"key": "a", "value": "b"}]', output)
+
+    def test_chunked(self):
+        output, chunks = self._write('ndjson', _rows(10000))
+        self.assertEqual(10000, len(output.splitlines()))
+        self.assertLess(len(chunks), 20)
+        self.assertTrue(all(len(chunk) < 2 * writers.OUTPUT_CHUNK_SIZE
+                            for chunk in chunks))
+
+    def test_orjson_encoder(self):
+        orjson = types.ModuleType('orjson')
+        orjson.OPT_NON_STR_KEYS = 1
+        orjson.OPT_PASSTHROUGH_DATETIME = 2
+        orjson.dumps = MagicMock(return_value=b'{"id":"d0"}')
+        with patch.dict(sys.modules, {'orjson': orjson}):
+            output, _ = self._write('ndjson', _rows(1))
+        self.assertEqual('{"id":"d0"}\n', output)
+        self.assertEqual(3, orjson.dumps.call_args[1]['option'])
+
+    def test_encoders_match(self):
+        orjson_encoder = writers._orjson_encoder()
+        if orjson_encoder is None:
+            self.skipTest('orjson is not installed')
+        row = {
+            'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'created_at': datetime(2020, 1, 2, 3, 4, 5, 6),
+            'ended_at': datetime(2020, 1, 2, tzinfo=timezone.utc),
+            'labels': ({'key': 'a', 'value': uuid.UUID(int=1)}, ),
+            'name': 'n\u00e9',
+            1: 2.5,
+        }
+        encoded = writers._json_encoder()(row)
+        self.assertEqual(json.loads(encoded), json.loads(orjson_encoder(row)))
+        self.assertIn('12345678123456781234567812345678', encoded)
+
+
+class OutputFormatTest(CliCommandTest):
+    def setUp(self):
+        super(OutputFormatTest, self).setUp()
+        self.client.blueprints.list = MagicMock(
+            return_value=MockListResponse(items=[
+                {'id': 'bp{0}'.format(index), 'description': None,
+                 'labels': []}
+                for index in range(3)]))
+
+    def test_ndjson(self):
+        outcome = self.invoke('cfy blueprints list --format ndjson')
+        lines = outcome.output.splitlines()
+        self.assertEqual(['bp0', 'bp1', 'bp2'],
+                         [json.loads(line)['id'] for line in lines])
+
+    def test_csv(self):
+        outcome = self.invoke('cfy blueprints list --format csv')
+        lines = outcome.output.splitlines()
+        self.assertTrue(lines[0].startswith('id,description,'))
+        self.assertEqual(4, len(lines))
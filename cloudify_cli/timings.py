@@ -0,0 +1,169 @@
+"""Record the REST requests a command makes, and how long they took.
+
+With `cfy --timings`, every request of the command is listed when it
+ends, followed by a summary of the requests to each endpoint. With
+`cfy --timings-file PATH`, the requests are also written as a Chrome
+trace (open it in chrome://tracing or https://ui.perfetto.dev), where
+requests sent at the same time by different threads are easy to see.
+"""
+import os
+import json
+import time
+import threading
+from urllib.parse import urlparse
+
+import click
+
+from cloudify_cli import table
+
+REQUEST_COLUMNS = ['method', 'path', 'status', 'bytes_out', 'bytes_in',
+                   'latency_ms', 'node']
+SUMMARY_COLUMNS = ['endpoint', 'calls', 'p50_ms', 'p95_ms', 'total_ms',
+                   'bytes_out', 'bytes_in']
+
+_recorder = None
+
+
+def get_recorder():
+    """The recorder of this command, or None if timings weren't asked for
+    """
+    return _recorder
+
+
+def start(print_report=False, trace_path=None):
+    """Start recording the requests.
+
+    :param print_report: print the requests and their summary at the end
+    :param trace_path: write a Chrome trace of the requests to this path
+        at the end
+    """
+    global _recorder
+    if _recorder is None:
+        _recorder = TimingsRecorder()
+    _recorder.print_report = _recorder.print_report or print_report
+    _recorder.trace_path = _recorder.trace_path or trace_path
+    return _recorder
+
+
+def stop():
+    """Stop recording, and report the recorded requests"""
+    global _recorder
+    recorder, _recorder = _recorder, None
+    if recorder is None:
+        return
+    if recorder.trace_path:
+        recorder.write_trace(recorder.trace_path)
+    if recorder.print_report:
+        recorder.report()
+
+
+class TimingsRecorder(object):
+    def __init__(self):
+        self.print_report = False
+        self.trace_path = None
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def instrument(self, session):
+        """Record the requests sent by the requests session"""
+        hooks = session.hooks.setdefault('response', [])
+        if self._on_response not in hooks:
+            hooks.append(self._on_response)
+
+    def _on_response(self, response, *args, **kwargs):
+        url = urlparse(response.url)
+        request = response.request
+        latency = response.elapsed.total_seconds()
+        body = request.body
+        # streamed uploads and downloads aren't read here, so their size
+        # is only known from the headers
+        bytes_out = request.headers.get('Content-Length') or (
+            len(body) if isinstance(body, (bytes, str)) else 0)
+        bytes_in = response.headers.get('Content-Length') or 0
+        with self._lock:
+            self.requests.append({
+                'method': request.method,
+                'path': url.path,
+                'status': response.status_code,
+                'bytes_out': int(bytes_out),
+                'bytes_in': int(bytes_in),
+                'latency_ms': latency * 1000,
+                'node': url.hostname,
+                'started': time.time() - latency,
+                'thread': threading.current_thread().ident,
+            })
+
+    def summary(self):
+        """The requests of each endpoint: their count, latency and size"""
+        endpoints = {}
+        for request in self.requests:
+            endpoints.setdefault(_endpoint(request), []).append(request)
+        rows = [_summarize(endpoint, requests)
+                for endpoint, requests in sorted(endpoints.items())]
+        if len(rows) > 1:
+            rows.append(_summarize('total', self.requests))
+        return rows
+
+    def report(self):
+        if not self.requests:
+            click.echo('No REST requests were made', err=True)
+            return
+        requests = [dict(request, latency_ms=_ms(request['latency_ms']))
+                    for request in self.requests]
+        click.echo('REST requests:', err=True)
+        click.echo(table.generate(REQUEST_COLUMNS, requests), err=True)
+        click.echo('Summary:', err=True)
+        click.echo(table.generate(SUMMARY_COLUMNS, self.summary()), err=True)
+
+    def write_trace(self, path):
+        """Write the requests as Chrome trace events"""
+        events = [{
+            'name': '{0} {1}'.format(request['method'], request['path']),
+            'cat': 'http',
+            'ph': 'X',
+            'ts': int(request['started'] * 1e6),
+            'dur': int(request['latency_ms'] * 1000),
+            'pid': os.getpid(),
+            'tid': request['thread'],
+            'args': {key: request[key] for key in
+                     ['status', 'bytes_out', 'bytes_in', 'node']},
+        } for request in self.requests]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events,
+                       'displayTimeUnit': 'ms'}, f)
+
+
+def _endpoint(request):
+    """The method and resource of the request, without the resource ID.
+
+    eg. `GET /nodes` for `GET /api/v3.1/nodes/vm?deployment_id=d1`.
+    """
+    parts = [part for part in request['path'].split('/') if part]
+    if parts[:1] == ['api']:
+        parts = parts[1:]
+        if parts and parts[0].startswith('v') and parts[0][1:2].isdigit():
+            parts = parts[1:]
+    return '{0} /{1}'.format(request['method'], parts[0] if parts else '')
+
+
+def _summarize(endpoint, requests):
+    latencies = sorted(request['latency_ms'] for request in requests)
+    return {
+        'endpoint': endpoint,
+        'calls': len(requests),
+        'p50_ms': _ms(_percentile(latencies, 50)),
+        'p95_ms': _ms(_percentile(latencies, 95)),
+        'total_ms': _ms(sum(latencies)),
+        'bytes_out': sum(request['bytes_out'] for request in requests),
+        'bytes_in': sum(request['bytes_in'] for request in requests),
+    }
+
+
+def _percentile(values, percent):
+    """The nearest-rank percentile of the sorted values"""
+    index = max(0, -(-len(values) * percent // 100) - 1)
+    return values[index]
+
+
+def _ms(value):
+    return '{0:.1f}'.format(value)
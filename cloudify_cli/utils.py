@@ -43,7 +43,11 @@ from urllib.parse import urlparse
 
 from cloudify_cli.constants import SUPPORTED_ARCHIVE_TYPES, DEFAULT_TIMEOUT
 from cloudify_cli.exceptions import CloudifyCliError, CloudifyTimeoutError
-from cloudify_cli.execution_events_fetcher import ExecutionEventsFetcher
+from cloudify_cli.execution_events_fetcher import (
+    ExecutionEventsFetcher,
+    PollingScheduler,
+    WAIT_EVENTS_PREFETCH,
+)
 from cloudify_cli.logger import get_logger, get_events_logger
 
 from cloudify.models_states import BlueprintUploadState
@@ -453,13 +457,18 @@ def wait_for_blueprint_upload(client, blueprint_id, logging_level):
 
     deadline = time.time() + DEFAULT_TIMEOUT
 
+    # the blueprint has the upload execution, so it needn't be fetched
     events_fetcher = ExecutionEventsFetcher(
-        client, execution_id=execution_id, include_logs=True)
+        client, execution=blueprint.upload_execution,
+        execution_id=execution_id, include_logs=True,
+        prefetch=WAIT_EVENTS_PREFETCH)
+    scheduler = PollingScheduler(
+        min_interval=WAIT_FOR_BLUEPRINT_UPLOAD_SLEEP_INTERVAL)
 
     # Poll for execution status and execution logs, until execution ends
     # and we receive an event of type in WORKFLOW_END_TYPES
     upload_ended = False
-    events_handler = get_events_logger(None)
+    events_handler = scheduler.events_handler(get_events_logger(None))
 
     # Poll for blueprint upload status, until the upload ends
     while True:
@@ -468,8 +477,9 @@ def wait_for_blueprint_upload(client, blueprint_id, logging_level):
                                        'out'.format(blueprint.id))
         timeout = deadline - time.time()  # update remaining timeout
 
-        if not upload_ended:
+        if not upload_ended and scheduler.should_fetch_status():
             blueprint = client.blueprints.get(blueprint.id)
+            scheduler.status_fetched()
             upload_ended = \
                 blueprint['state'] in BlueprintUploadState.END_STATES
 
@@ -479,7 +489,7 @@ def wait_for_blueprint_upload(client, blueprint_id, logging_level):
         if upload_ended:
             break
 
-        time.sleep(WAIT_FOR_BLUEPRINT_UPLOAD_SLEEP_INTERVAL)
+        scheduler.wait(timeout)
     blueprint = client.blueprints.get(blueprint_id)
     _handle_errors()
     return blueprint
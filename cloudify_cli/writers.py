@@ -0,0 +1,181 @@
+"""Write rows to stdout as JSON, NDJSON or CSV, as they arrive.
+
+The rows are serialized one by one, and written to stdout in chunks, so
+that the memory use doesn't depend on the number of rows: a listing can
+be piped to eg. jq, however large it is. The rows are serialized with
+orjson if it's installed, which is much faster, or with the json module
+otherwise. Either way, the values are the same as CloudifyJSONEncoder's.
+"""
+import io
+import csv
+import uuid
+
+import click
+
+from cloudify_cli.logger import CloudifyJSONEncoder, logfile_logger
+
+# the output is written to stdout in chunks of this size
+OUTPUT_CHUNK_SIZE = 64 * 1024
+
+
+def _orjson_encoder():
+    try:
+        import orjson
+    except ImportError:
+        return None
+    default = CloudifyJSONEncoder().default
+
+    def encode(obj):
+        return orjson.dumps(
+            _hex_uuids(obj), default=default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        ).decode('utf-8')
+    return encode
+
+
+def _hex_uuids(obj):
+    """Replace the UUIDs with their hex, like CloudifyJSONEncoder does.
+
+    orjson serializes UUIDs itself, hyphenated, without calling default.
+    """
+    if isinstance(obj, uuid.UUID):
+        return obj.hex
+    if isinstance(obj, dict):
+        return {key: _hex_uuids(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_hex_uuids(value) for value in obj]
+    return obj
+
+
+def _json_encoder():
+    return CloudifyJSONEncoder().encode
+
+
+def get_encoder():
+    """A function serializing an object to a JSON string"""
+    return _orjson_encoder() or _json_encoder()
+
+
+class RowsWriter(object):
+    """Write the cols of each row.
+
+    :param cols: the keys of the rows to write
+    :param defaults: the values of the keys that a row doesn't have
+    :param labels: the names to write the keys as
+    :param encode: serializes an object to a JSON string
+    :param write: writes the output, which is buffered to OUTPUT_CHUNK_SIZE
+    """
+    def __init__(self, cols, defaults=None, labels=None, encode=None,
+                 write=None):
+        self.cols = cols
+        self.defaults = defaults or {}
+        self.labels = labels or {}
+        self.encode = encode or get_encoder()
+        self.rows_count = 0
+        self._write = write or _echo
+        self._chunk = []
+        self._chunk_size = 0
+
+    def write_rows(self, rows):
+        self.start()
+        for row in rows:
+            self.write_row(row)
+        self.end()
+        self.flush()
+        logfile_logger.info('Wrote %d rows', self.rows_count)
+
+    def start(self):
+        pass
+
+    def write_row(self, row):
+        self.rows_count += 1
+
+    def end(self):
+        pass
+
+    def value(self, row, col):
+        value = row.get(col)
+        return value if value is not None else self.defaults.get(col)
+
+    def values(self, row):
+        """The values of the cols of the row, by their labels"""
+        return {self.labels.get(col, col): self.value(row, col)
+                for col in self.cols}
+
+    def write(self, text):
+        self._chunk.append(text)
+        self._chunk_size += len(text)
+        if self._chunk_size >= OUTPUT_CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self._chunk:
+            self._write(''.join(self._chunk))
+        self._chunk = []
+        self._chunk_size = 0
+
+
+class JSONWriter(RowsWriter):
+    """Write a JSON array, with a row on each line"""
+    def start(self):
+        self.write('[\n')
+
+    def write_row(self, row):
+        if self.rows_count:
+            self.write(',\n')
+        self.write(self.encode(self.values(row)))
+        super(JSONWriter, self).write_row(row)
+
+    def end(self):
+        self.write('\n]\n')
+
+
+class NDJSONWriter(RowsWriter):
+    """Write a JSON object per row, each on its own line"""
+    def write_row(self, row):
+        self.write(self.encode(self.values(row)))
+        self.write('\n')
+        super(NDJSONWriter, self).write_row(row)
+
+
+class CSVWriter(RowsWriter):
+    """Write a header line, and then a line for each row.
+
+    Lists and dicts are written as JSON.
+    """
+    def __init__(self, *args, **kwargs):
+        super(CSVWriter, self).__init__(*args, **kwargs)
+        self._line = io.StringIO()
+        self._csv = csv.writer(self._line, lineterminator='\n')
+
+    def start(self):
+        self._write_line([self.labels.get(col, col) for col in self.cols])
+
+    def write_row(self, row):
+        self._write_line([self._cell(self.value(row, col))
+                          for col in self.cols])
+        super(CSVWriter, self).write_row(row)
+
+    def _cell(self, value):
+        if value is None:
+            return ''
+        if isinstance(value, (list, dict)):
+            return self.encode(value)
+        return value
+
+    def _write_line(self, cells):
+        self._csv.writerow(cells)
+        self.write(self._line.getvalue())
+        self._line.seek(0)
+        self._line.truncate()
+
+
+WRITERS = {
+    'json': JSONWriter,
+    'ndjson': NDJSONWriter,
+    'csv': CSVWriter,
+}
+
+
+def _echo(text):
+    click.echo(text, nl=False)
@@ -42,6 +42,7 @@ setup(
     author='Cloudify',
     author_email='cosmo-admin@cloudify.co',
     packages=packages,
+    package_data={'cloudify_cli.cli': ['commands_manifest.json']},
     license='LICENSE',
     description="Cloudify's Command Line Interface",
     entry_points={